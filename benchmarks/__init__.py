@@ -0,0 +1,5 @@
+"""
+Offline performance benchmarks for the F1 prediction stack.
+
+    python -m benchmarks.run --scales 300,10000,100000
+"""
@@ -0,0 +1,231 @@
+"""
+Shared helpers for benchmark and load-test reports: latency summaries,
+run metadata, JSON results and baseline regression checks.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from src.config import settings
+from src.data import data_loader
+
+# Metric name → direction. "lower" means a larger value is a regression.
+METRIC_DIRECTIONS: dict[str, str] = {
+    "p50_ms": "lower",
+    "p95_ms": "lower",
+    "p99_ms": "lower",
+    "mean_ms": "lower",
+    "peak_mem_mb": "lower",
+    "error_rate": "lower",
+    "throughput_per_s": "higher",
+    "rps": "higher",
+}
+
+# Which threshold group each metric falls under
+_METRIC_GROUPS: dict[str, str] = {
+    "p50_ms": "latency", "p95_ms": "latency", "p99_ms": "latency", "mean_ms": "latency",
+    "peak_mem_mb": "memory",
+    "throughput_per_s": "throughput", "rps": "throughput",
+    "error_rate": "errors",
+}
+
+DEFAULT_THRESHOLDS: dict[str, float] = {
+    "latency": 0.20,
+    "throughput": 0.20,
+    "memory": 0.15,
+    "errors": 0.0,
+}
+
+
+def summarize_latencies(samples_s: list[float] | np.ndarray) -> dict:
+    """p50 / p95 / p99 / mean in milliseconds for a list of durations in seconds."""
+    arr = np.asarray(samples_s, dtype=float) * 1000.0
+    if arr.size == 0:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(arr.mean()), 4),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, check=True,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_metadata() -> dict:
+    """Environment details stored next to results so runs stay comparable."""
+    versions = {}
+    for mod in ("numpy", "pandas", "sklearn", "xgboost", "fastapi", "pydantic"):
+        try:
+            versions[mod] = __import__(mod).__version__
+        except Exception:
+            versions[mod] = None
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def write_results(path: str, payload: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(payload, fh, indent=2)
+    print(f"[OK] Results written -> {path}")
+
+
+def load_results(path: str) -> dict:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def parse_thresholds(raw: str | None) -> dict[str, float]:
+    """Parse ``latency=0.1,memory=0.2`` (or a bare ``0.1`` for every group)."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if not raw:
+        return thresholds
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            group, value = part.split("=", 1)
+            thresholds[group.strip()] = float(value)
+        else:
+            thresholds = {g: float(part) for g in thresholds}
+    return thresholds
+
+
+def compare_to_baseline(
+    current: list[dict], baseline: list[dict], thresholds: dict[str, float]
+) -> list[dict]:
+    """
+    Compare result rows keyed by ``name`` and return every metric delta.
+
+    Each delta is the relative change in the "worse" direction, so a positive
+    value is a regression and ``regressed`` is set when it exceeds the
+    threshold for the metric's group.
+    """
+    base_by_name = {row["name"]: row for row in baseline}
+    deltas: list[dict] = []
+    for row in current:
+        base = base_by_name.get(row["name"])
+        if base is None or row.get("skipped") or base.get("skipped"):
+            continue
+        for metric, direction in METRIC_DIRECTIONS.items():
+            new, old = row.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            if old == 0:
+                change = 0.0 if new == 0 else float("inf")
+            elif direction == "lower":
+                change = (new - old) / abs(old)
+            else:
+                change = (old - new) / abs(old)
+            limit = thresholds.get(_METRIC_GROUPS[metric], DEFAULT_THRESHOLDS["latency"])
+            deltas.append({
+                "name": row["name"],
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "threshold": limit,
+                "regressed": change > limit,
+            })
+    return deltas
+
+
+def print_table(rows: list[dict], columns: list[str]) -> None:
+    widths = {c: max([len(c)] + [len(_cell(r.get(c))) for r in rows]) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for r in rows:
+        print("  ".join(_cell(r.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def report_regressions(deltas: list[dict]) -> bool:
+    """Print the comparison; returns True when any metric regressed."""
+    if not deltas:
+        print("[WARN] No overlapping results with the baseline")
+        return False
+    regressed = [d for d in deltas if d["regressed"]]
+    print(f"\nBaseline comparison: {len(deltas)} metrics, {len(regressed)} regressions")
+    if regressed:
+        print_table(regressed, ["name", "metric", "baseline", "current", "change", "threshold"])
+    return bool(regressed)
+
+
+# ---------------------------------------------------------------------------
+# Run isolation
+# ---------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def override_settings(**overrides):
+    """Point settings at a scratch directory for the duration of a run."""
+    old = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            setattr(settings, key, value)
+
+
+@contextlib.contextmanager
+def offline():
+    """Disable FastF1 so schedule lookups and downloads never touch the network."""
+    available = data_loader.FASTF1_AVAILABLE
+    data_loader.FASTF1_AVAILABLE = False
+    try:
+        yield
+    finally:
+        data_loader.FASTF1_AVAILABLE = available
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Silence the loaders' prints and the pipeline's INFO logs."""
+    if not enabled:
+        yield
+        return
+    loggers = [logging.getLogger(name) for name in logging.root.manager.loggerDict if name.startswith("src")]
+    levels = [lg.level for lg in loggers]
+    for lg in loggers:
+        lg.setLevel(logging.ERROR)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        for lg, level in zip(loggers, levels):
+            lg.setLevel(level)
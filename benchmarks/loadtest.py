@@ -0,0 +1,280 @@
+"""
+Asyncio load generator for the prediction API.
+
+Drives ``src.api.main:app`` in-process over ASGI (default, no server needed)
+or a running uvicorn via ``--url``. Each concurrency level runs a closed loop
+of ``--concurrency`` workers for ``--duration`` seconds after a warm-up, so
+sweeping levels shows where throughput saturates and tail latency climbs.
+
+    python -m benchmarks.loadtest --concurrency 1,8,32 --duration 10
+    python -m benchmarks.loadtest --mix predict=70,batch=20,latest=10 --batch-size 40
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --output load.json
+    python -m benchmarks.loadtest --compare load_baseline.json
+
+In-process runs train on a deterministic synthetic history (``--synthetic-rows``)
+so numbers are comparable across commits; ``--app-lifespan`` uses the
+configured pipeline instead.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, ExitStack
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.common import (
+    compare_to_baseline,
+    load_results,
+    offline,
+    override_settings,
+    parse_thresholds,
+    print_table,
+    quiet,
+    report_regressions,
+    run_metadata,
+    summarize_latencies,
+    write_results,
+)
+from benchmarks.synthetic import make_race_history
+
+ROUTES = ("predict", "batch", "latest")
+WEATHERS = ("Dry", "Wet")
+
+
+# ---------------------------------------------------------------------------
+# Request plan
+# ---------------------------------------------------------------------------
+
+class RequestPlan:
+    """Builds randomized, seed-reproducible requests for the configured mix."""
+
+    def __init__(self, mix: dict[str, float], batch_size: int, catalog: dict):
+        self.routes = [r for r in ROUTES if mix.get(r, 0) > 0]
+        self.weights = [mix[r] for r in self.routes]
+        self.batch_size = batch_size
+        self.drivers = catalog["drivers"]
+        self.teams = catalog["teams"]
+        self.tracks = catalog["tracks"]
+
+    def _item(self, rng: random.Random) -> dict:
+        return {
+            "driver": rng.choice(self.drivers),
+            "team": rng.choice(self.teams),
+            "track": rng.choice(self.tracks),
+            "grid_position": rng.randint(1, 20),
+            "weather": rng.choice(WEATHERS),
+            "temperature": rng.randint(15, 40),
+        }
+
+    def next(self, rng: random.Random) -> tuple[str, str, str, dict | None]:
+        route = rng.choices(self.routes, self.weights)[0]
+        if route == "predict":
+            return route, "POST", "/predict", self._item(rng)
+        if route == "batch":
+            return route, "POST", "/predict/batch", {"drivers": [self._item(rng) for _ in range(self.batch_size)]}
+        return route, "GET", "/predict/latest", None
+
+
+# ---------------------------------------------------------------------------
+# Load loop
+# ---------------------------------------------------------------------------
+
+async def _worker(client, plan: RequestPlan, rng: random.Random, deadline: float, samples: dict) -> None:
+    while time.perf_counter() < deadline:
+        route, method, path, body = plan.next(rng)
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, path, json=body)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples[route].append((time.perf_counter() - t0, ok))
+
+
+async def run_level(client, plan: RequestPlan, concurrency: int, duration: float, warmup: float, seed: int) -> dict:
+    """Run one closed-loop concurrency level; returns raw samples per route."""
+    if warmup > 0:
+        discard: dict = defaultdict(list)
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(
+            _worker(client, plan, random.Random(seed - 1 - i), deadline, discard)
+            for i in range(concurrency)
+        ))
+
+    samples: dict = defaultdict(list)
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    await asyncio.gather(*(
+        _worker(client, plan, random.Random(seed + i), deadline, samples)
+        for i in range(concurrency)
+    ))
+    return {"elapsed": time.perf_counter() - t0, "samples": samples}
+
+
+def summarize_level(level: dict, concurrency: int, batch_size: int) -> list[dict]:
+    rows = []
+    elapsed = level["elapsed"]
+    everything = []
+    for route, samples in sorted(level["samples"].items()):
+        everything.extend(samples)
+        rows.append(_summary_row(f"{route}@c{concurrency}", route, concurrency, samples, elapsed, batch_size))
+    rows.append(_summary_row(f"all@c{concurrency}", "all", concurrency, everything, elapsed, batch_size))
+    return rows
+
+
+def _summary_row(name, route, concurrency, samples, elapsed, batch_size) -> dict:
+    latencies = [s for s, _ in samples]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "name": name,
+        "route": route,
+        "concurrency": concurrency,
+        "batch_size": batch_size if route in ("batch", "all") else None,
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "rps": round(len(samples) / elapsed, 2) if elapsed > 0 else None,
+        **summarize_latencies(latencies),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+
+def _train_synthetic(rows: int, workdir: str, seed: int) -> dict:
+    from src.models.pipeline import run_training_pipeline
+
+    history = os.path.join(workdir, "history.parquet")
+    make_race_history(rows, seed=seed).to_parquet(history, index=False)
+    artifacts = os.path.join(workdir, "artifacts")
+    with override_settings(
+        HISTORICAL_DATA_PATH=history,
+        ARTIFACTS_DIR=artifacts,
+        PIPELINE_ARTIFACT_PATH=os.path.join(artifacts, "pipeline.pkl"),
+    ):
+        return run_training_pipeline(force_retrain=True)
+
+
+async def _open_client(args, stack: AsyncExitStack, sync_stack: ExitStack) -> tuple[httpx.AsyncClient, dict]:
+    if args.url:
+        client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, timeout=args.timeout))
+        catalog = {}
+        for key, path in (("drivers", "/drivers"), ("teams", "/teams"), ("tracks", "/tracks")):
+            resp = await client.get(path)
+            resp.raise_for_status()
+            catalog[key] = resp.json()[key]
+        return client, catalog
+
+    from src.api.batching import coalescer_from_settings
+    from src.api.executor import InferenceExecutor
+    from src.api.main import app
+    from src.config import settings
+
+    sync_stack.enter_context(offline())
+    sync_stack.enter_context(quiet(not args.verbose))
+    if args.app_lifespan:
+        await stack.enter_async_context(app.router.lifespan_context(app))
+    else:
+        workdir = sync_stack.enter_context(tempfile.TemporaryDirectory(prefix="f1-load-"))
+        app.state.pipeline = _train_synthetic(args.synthetic_rows, workdir, args.seed)
+        app.state.executor = None
+        if settings.INFERENCE_WORKERS > 0:
+            registry_root = os.path.join(workdir, "artifacts", "registry")
+            app.state.executor = InferenceExecutor(settings.INFERENCE_WORKERS, registry_root)
+            sync_stack.callback(app.state.executor.shutdown)
+        app.state.coalescer = coalescer_from_settings(app.state.executor)
+    pipeline = app.state.pipeline
+    catalog = {"drivers": pipeline["drivers"], "teams": pipeline["teams"], "tracks": pipeline["tracks"]}
+    transport = httpx.ASGITransport(app=app)
+    client = await stack.enter_async_context(
+        httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+    )
+    return client, catalog
+
+
+async def run(args) -> list[dict]:
+    results: list[dict] = []
+    with ExitStack() as sync_stack:
+        async with AsyncExitStack() as stack:
+            client, catalog = await _open_client(args, stack, sync_stack)
+            plan = RequestPlan(args.mix, args.batch_size, catalog)
+            for concurrency in args.concurrency:
+                level = await run_level(client, plan, concurrency, args.duration, args.warmup, args.seed)
+                rows = summarize_level(level, concurrency, args.batch_size)
+                total = rows[-1]
+                print(
+                    f"  [OK] c={concurrency}: {total['rps']} req/s, p50 {total['p50_ms']} ms, "
+                    f"p99 {total['p99_ms']} ms, errors {total['error_rate']:.2%}",
+                    file=sys.stderr,
+                )
+                results.extend(rows)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _parse_mix(raw: str) -> dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route '{name}' (choose from {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of the in-process ASGI app")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        type=lambda s: [int(x) for x in s.split(",") if x.strip()],
+                        help="Comma-separated concurrency levels to sweep")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--mix", type=_parse_mix, default="predict=70,batch=20,latest=10",
+                        help="Route weights, e.g. predict=70,batch=20,latest=10")
+    parser.add_argument("--batch-size", type=int, default=20, help="Items per /predict/batch request")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--synthetic-rows", type=int, default=2000,
+                        help="History size for the in-process synthetic pipeline")
+    parser.add_argument("--app-lifespan", action="store_true",
+                        help="In-process: run the app lifespan (configured data + artifacts)")
+    parser.add_argument("--output", help="Write machine-readable JSON results here")
+    parser.add_argument("--compare", help="Baseline JSON from a previous --output to compare against")
+    parser.add_argument("--thresholds", help="Allowed regression per group, e.g. latency=0.2,throughput=0.2,errors=0")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline prints and logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    results = asyncio.run(run(args))
+
+    print_table(results, ["name", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"])
+    config = {k: v for k, v in vars(args).items() if k not in ("compare", "output")}
+    payload = {"meta": run_metadata(), "config": config, "results": results}
+    if args.output:
+        write_results(args.output, payload)
+    if args.compare:
+        deltas = compare_to_baseline(results, load_results(args.compare)["results"], parse_thresholds(args.thresholds))
+        return 1 if report_regressions(deltas) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
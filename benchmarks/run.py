@@ -0,0 +1,298 @@
+"""
+Benchmark suite: ingestion, feature engineering, training, inference and the
+/predict routes, on synthetic histories at several scales. Runs fully offline.
+
+    python -m benchmarks.run --scales 300,10000,100000
+    python -m benchmarks.run --output bench.json --save-baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json --thresholds latency=0.15
+
+Every stage is timed ``--repeat`` times for latency percentiles and throughput,
+then run once more under tracemalloc for peak Python/NumPy memory (kept apart
+so tracing overhead never skews the timings). Exit code is 1 when any metric
+regresses past its threshold against the baseline.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.common import (
+    compare_to_baseline,
+    load_results,
+    offline,
+    override_settings,
+    parse_thresholds,
+    print_table,
+    quiet,
+    report_regressions,
+    run_metadata,
+    summarize_latencies,
+    write_results,
+)
+from benchmarks.synthetic import make_race_history
+from src.data.data_loader import F1DataLoader
+from src.data.feature_engineer import F1FeatureEngineer
+from src.models.pipeline import build_feature_vector, run_inference, run_training_pipeline
+
+STAGES = ("ingest", "features", "train", "inference", "api")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+# ---------------------------------------------------------------------------
+# Harness helpers
+# ---------------------------------------------------------------------------
+
+def _time_calls(fn: Callable[[], object], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _peak_memory_mb(fn: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1e6, 3)
+
+
+def _row(stage: str, scale: int, rows: int, samples: list[float], per_call_rows: int, peak_mb: float | None) -> dict:
+    median = sorted(samples)[len(samples) // 2] if samples else 0.0
+    return {
+        "name": f"{stage}@{scale}",
+        "stage": stage,
+        "scale": scale,
+        "rows": rows,
+        "calls": len(samples),
+        "throughput_per_s": round(per_call_rows / median, 2) if median > 0 else None,
+        **summarize_latencies(samples),
+        "peak_mem_mb": peak_mb,
+        "skipped": False,
+    }
+
+
+def _skipped(stage: str, scale: int, reason: str) -> dict:
+    return {"name": f"{stage}@{scale}", "stage": stage, "scale": scale, "skipped": True, "reason": reason}
+
+
+def _sample_requests(df, n: int) -> list[dict]:
+    """Inference inputs drawn from the training history so every label is known."""
+    sample = df.sample(n=n, replace=len(df) < n, random_state=0)
+    return [
+        {
+            "driver": r.driver, "team": r.team, "track": r.track,
+            "grid_position": int(r.grid_position), "weather": r.weather,
+            "temperature": int(min(45, max(10, r.temperature))),
+        }
+        for r in sample.itertuples(index=False)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def bench_ingest(scale: int, parquet_path: str, args) -> dict:
+    loader = F1DataLoader(data_path=parquet_path)
+    fn = lambda: loader.load_historical_data()  # noqa: E731
+    with quiet(not args.verbose):
+        samples = _time_calls(fn, args.repeat)
+        peak = _peak_memory_mb(fn)
+    return _row("ingest", scale, scale, samples, scale, peak)
+
+
+def bench_features(scale: int, df, args, n_jobs: int = 1) -> dict:
+    fn = lambda: F1FeatureEngineer(df, n_jobs=n_jobs).get_processed_data()  # noqa: E731
+    with quiet(not args.verbose):
+        samples = _time_calls(fn, args.repeat)
+        peak = _peak_memory_mb(fn)
+    return _row("features" if n_jobs == 1 else "features_parallel", scale, len(df), samples, len(df), peak)
+
+
+def bench_train(scale: int, df, args) -> dict:
+    fn = lambda: run_training_pipeline(force_retrain=True)  # noqa: E731
+    with quiet(not args.verbose):
+        samples = _time_calls(fn, args.train_repeat)
+        peak = _peak_memory_mb(fn) if args.train_memory else None
+    return _row("train", scale, len(df), samples, len(df), peak)
+
+
+def bench_inference(scale: int, pipeline: dict, requests: list[dict], args) -> list[dict]:
+    rows = []
+    calls = iter(range(10**12))
+
+    def one(fn):
+        req = requests[next(calls) % len(requests)]
+        return fn(
+            req["driver"], req["team"], req["track"],
+            req["grid_position"], req["weather"], req["temperature"], pipeline,
+        )
+
+    with quiet(not args.verbose):
+        for stage, fn in (("feature_vector", build_feature_vector), ("inference", run_inference)):
+            one(fn)  # warm-up
+            samples = _time_calls(lambda: one(fn), args.calls)
+            peak = _peak_memory_mb(lambda: [one(fn) for _ in range(20)])
+            rows.append(_row(stage, scale, 1, samples, 1, peak))
+    return rows
+
+
+def bench_api(scale: int, pipeline: dict, requests: list[dict], args) -> list[dict]:
+    from fastapi.testclient import TestClient
+
+    from src.api.main import app
+
+    app.state.pipeline = pipeline
+    client = TestClient(app)  # no context manager → lifespan (training) is skipped
+    grid = requests[:20]
+
+    routes = {
+        "api_predict": lambda i: client.post("/predict", json=requests[i % len(requests)]),
+        "api_batch": lambda i: client.post("/predict/batch", json={"drivers": grid}),
+        "api_latest": lambda i: client.get("/predict/latest"),
+    }
+    rows = []
+    with quiet(not args.verbose):
+        for stage, call in routes.items():
+            resp = call(0)
+            if resp.status_code != 200:
+                rows.append(_skipped(stage, scale, f"HTTP {resp.status_code}: {resp.text[:200]}"))
+                continue
+            counter = iter(range(10**12))
+            samples = _time_calls(lambda: call(next(counter)), args.calls)
+            per_call = len(grid) if stage == "api_batch" else (20 if stage == "api_latest" else 1)
+            rows.append(_row(stage, scale, per_call, samples, per_call, None))
+    del app.state.pipeline
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run(args) -> list[dict]:
+    results: list[dict] = []
+    stages = set(args.stages)
+    trained: dict[int, dict] = {}
+
+    with tempfile.TemporaryDirectory(prefix="f1-bench-") as tmp, offline():
+        for scale in args.scales:
+            print(f"\n-> Scale {scale:,} rows")
+            df = make_race_history(scale, seed=args.seed)
+            parquet_path = os.path.join(tmp, f"history_{scale}.parquet")
+            df.to_parquet(parquet_path, index=False)
+
+            if "ingest" in stages:
+                results.append(bench_ingest(scale, parquet_path, args))
+            if "features" in stages:
+                results.append(bench_features(scale, df, args))
+                if args.feature_workers != 1:
+                    results.append(bench_features(scale, df, args, n_jobs=args.feature_workers))
+
+            # Training (and therefore inference) is capped — tree ensembles on
+            # millions of rows take far longer than a regression check should.
+            train_rows = min(len(df), args.train_max_rows)
+            train_df = df.iloc[:train_rows]
+            train_path = os.path.join(tmp, f"train_{train_rows}.parquet")
+            train_df.to_parquet(train_path, index=False)
+
+            artifacts = os.path.join(tmp, f"artifacts_{train_rows}")
+            with override_settings(
+                HISTORICAL_DATA_PATH=train_path,
+                ARTIFACTS_DIR=artifacts,
+                PIPELINE_ARTIFACT_PATH=os.path.join(artifacts, "pipeline.pkl"),
+            ):
+                if "train" in stages:
+                    if len(df) > args.train_max_rows:
+                        results.append(_skipped("train", scale, f"> --train-max-rows ({args.train_max_rows})"))
+                    else:
+                        results.append(bench_train(scale, df, args))
+
+                if stages & {"inference", "api"}:
+                    if train_rows not in trained:
+                        with quiet(not args.verbose):
+                            trained[train_rows] = run_training_pipeline(force_retrain="train" not in stages)
+                    pipeline = trained[train_rows]
+                    requests = _sample_requests(train_df, max(args.calls, 20))
+                    if "inference" in stages:
+                        results.extend(bench_inference(scale, pipeline, requests, args))
+                    if "api" in stages:
+                        results.extend(bench_api(scale, pipeline, requests, args))
+
+            for row in results:
+                if row.get("scale") == scale:
+                    status = "skipped" if row["skipped"] else f"p50 {row['p50_ms']} ms"
+                    print(f"  [OK] {row['name']}: {status}")
+    return results
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="300,10000,100000",
+                        type=lambda s: [int(x) for x in s.split(",") if x.strip()],
+                        help="Comma-separated synthetic history sizes in rows")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        type=lambda s: [x.strip() for x in s.split(",") if x.strip()],
+                        help=f"Subset of {','.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per bulk stage")
+    parser.add_argument("--train-repeat", type=int, default=1, help="Timed runs of the training stage")
+    parser.add_argument("--train-max-rows", type=int, default=20_000,
+                        help="Skip training above this size; inference uses a model trained on at most this many rows")
+    parser.add_argument("--train-memory", action="store_true",
+                        help="Also trace training memory (slow: tracemalloc doubles fit time)")
+    parser.add_argument("--feature-workers", type=int, default=1,
+                        help="Also time partition-parallel features with this many workers (0 = all cores)")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per inference / API stage")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write machine-readable JSON results here")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE,
+                        help="Baseline JSON to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument("--thresholds", help="Allowed regression per group, e.g. latency=0.2,memory=0.15,throughput=0.2")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help="Store these results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline prints and logs")
+    args = parser.parse_args(argv)
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    results = run(args)
+    payload = {"meta": run_metadata(), "config": {k: v for k, v in vars(args).items()}, "results": results}
+
+    print()
+    print_table(
+        [r for r in results if not r["skipped"]],
+        ["name", "rows", "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_mem_mb"],
+    )
+
+    if args.output:
+        write_results(args.output, payload)
+    if args.save_baseline:
+        write_results(args.save_baseline, payload)
+
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"[WARN] Baseline {args.compare} not found — nothing to compare")
+            return 0
+        deltas = compare_to_baseline(results, load_results(args.compare)["results"], parse_thresholds(args.thresholds))
+        return 1 if report_regressions(deltas) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Adaptive micro-batching for single POST /predict calls.
+
+Every single prediction pays the fixed cost of a scaler + model call, which
+dominates at one row. The coalescer queues concurrent requests and scores
+them with one run_batch_inference call:
+
+  - while fewer batches are running than there are scoring processes (one
+    without an inference executor), a request is dispatched on the next loop
+    iteration (picking up whatever arrived in the same tick), so an idle
+    server adds no delay,
+  - once every scorer is busy, arrivals collect for at most ``max_delay``
+    seconds or until ``max_batch`` are waiting, and are dispatched as soon
+    as either happens — so the batch size grows with load and the added
+    latency stays bounded by the window.
+
+Requests are grouped by pipeline snapshot, so a batch never mixes model
+versions across a hot swap. Dispatched batches are tracked so that shutdown
+can let them finish (``shutdown``).
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+import pandas as pd
+
+from src.api.executor import InferenceExecutor, offload
+from src.config import settings
+from src.models.pipeline import REQUEST_COLS, run_batch_inference, run_inference
+from src.utils.metrics import COALESCER_BATCH_SIZE, COALESCER_QUEUE_SECONDS
+
+
+class PredictionCoalescer:
+    """Merge concurrent single-row predictions into vectorized batches."""
+
+    def __init__(
+        self,
+        max_batch: int = 64,
+        max_delay: float = 0.002,
+        executor: Optional[InferenceExecutor] = None,
+    ):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self.executor = executor
+        self.max_in_flight = executor.workers if executor is not None else 1
+        # (row, pipeline, future, enqueued_at)
+        self._pending: list[tuple[dict, dict, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._in_flight = 0
+        # Running batches; the loop only keeps weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+
+    async def predict(self, row: dict, pipeline: dict) -> dict:
+        """Score one REQUEST_COLS row; returns the run_inference() result shape."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, pipeline, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            if self._in_flight < self.max_in_flight:
+                self._timer = loop.call_soon(self._flush)
+            else:
+                self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            groups: dict[int, list] = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+            for group in groups.values():
+                task = asyncio.ensure_future(self._run(group))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        """Dispatch what is queued, wait up to ``timeout`` seconds for running batches, cancel the rest."""
+        self._flush()
+        if not self._tasks:
+            return
+        _, late = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in late:
+            task.cancel()
+        await asyncio.gather(*late, return_exceptions=True)
+
+    async def _run(self, group: list) -> None:
+        dispatched = time.perf_counter()
+        live = [item for item in group if not item[2].done()]  # drop callers that went away
+        if not live:
+            return
+        self._in_flight += 1
+        try:
+            for *_, enqueued in live:
+                COALESCER_QUEUE_SECONDS.observe(dispatched - enqueued)
+            COALESCER_BATCH_SIZE.observe(len(live))
+            pipeline = live[0][1]
+            if len(live) == 1:
+                # A lone request: the scalar path skips the DataFrame round-trip
+                row = live[0][0]
+                single = await offload(self.executor, run_inference, *(row[c] for c in REQUEST_COLS), pipeline=pipeline)
+                result = {k: v if k == "model_used" else [v] for k, v in single.items()}
+            else:
+                frame = pd.DataFrame([item[0] for item in live], columns=REQUEST_COLS)
+                result = await offload(self.executor, run_batch_inference, frame, pipeline=pipeline)
+        except asyncio.CancelledError:
+            # Cancelled by shutdown: release the callers instead of leaving them waiting
+            for _, _, future, _ in live:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, _, future, _ in live:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._in_flight -= 1
+            # Whatever queued up during this batch goes out now rather than at the timer
+            if self._pending and self._in_flight < self.max_in_flight:
+                self._flush()
+
+        for i, (_, _, future, _) in enumerate(live):
+            if not future.done():
+                future.set_result({
+                    "predicted_position": int(result["predicted_position"][i]),
+                    "win_probability": round(float(result["win_probability"][i]), 4),
+                    "podium_probability": round(float(result["podium_probability"][i]), 4),
+                    "model_used": result["model_used"],
+                })
+
+
+def coalescer_from_settings(executor: Optional[InferenceExecutor] = None) -> Optional[PredictionCoalescer]:
+    """The configured coalescer, or None when PREDICT_COALESCE_ENABLED is off."""
+    if not settings.PREDICT_COALESCE_ENABLED:
+        return None
+    return PredictionCoalescer(
+        max_batch=settings.PREDICT_COALESCE_MAX_BATCH,
+        max_delay=settings.PREDICT_COALESCE_MAX_DELAY_MS / 1000,
+        executor=executor,
+    )
@@ -1,12 +1,37 @@
 """
 FastAPI dependency: injects the trained pipeline state into route handlers.
+
+Each request resolves ``app.state.pipeline`` exactly once, so a handler works
+against one consistent snapshot even if a new version is swapped in while it
+runs; the old snapshot stays alive until its last request finishes.
 """
 
-from fastapi import HTTPException, Request
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from src.api.executor import InferenceExecutor
+
+from src.utils.metrics import MODEL_GENERATION
 
 
-def get_pipeline(request: Request) -> dict:
+def get_pipeline(request: Request, response: Response) -> dict:
     pipeline = getattr(request.app.state, "pipeline", None)
     if pipeline is None or not pipeline.get("is_trained"):
         raise HTTPException(status_code=503, detail="Models not yet trained")
+    if pipeline.get("version"):
+        request.state.model_version = pipeline["version"]
+        response.headers["X-Model-Version"] = pipeline["version"]
     return pipeline
+
+
+def get_executor(request: Request) -> Optional[InferenceExecutor]:
+    """The process-pool inference executor, or None to score on the threadpool."""
+    return getattr(request.app.state, "executor", None)
+
+
+def set_pipeline(app: FastAPI, pipeline: dict) -> None:
+    """Swap a new pipeline into service and bump the model generation gauge."""
+    app.state.pipeline = pipeline
+    app.state.model_version = pipeline.get("version")
+    MODEL_GENERATION.inc()
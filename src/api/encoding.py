@@ -0,0 +1,80 @@
+"""
+Response encoding: fast JSON by default, MessagePack on request.
+
+orjson renders JSON several times faster than the standard library and
+handles NumPy scalars and arrays natively; msgpack is offered to clients
+that send ``Accept: application/msgpack``. Both are optional — without them
+the API falls back to ``json`` and JSON-only responses.
+
+Hot routes return ``negotiated(request, payload)`` with plain dicts /
+lists, which skips FastAPI's response_model validation and serialisation
+(the response_model stays on the route for the OpenAPI schema). Every other
+route keeps pydantic validation and is rendered by FastJSONResponse.
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _default(obj: Any):
+    """Fallback for types neither encoder knows (NumPy values, pydantic models)."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type {type(obj).__name__} is not serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes; NaN / inf become null with orjson."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return MSGPACK_AVAILABLE and any(t in accept for t in MSGPACK_TYPES)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson rendering when installed."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiated(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Render ``content`` as MessagePack or JSON according to the Accept header."""
+    if wants_msgpack(request):
+        body = msgpack.packb(content, default=_default, use_bin_type=True)
+        media_type = MSGPACK_TYPES[0]
+    else:
+        body = dumps(content)
+        media_type = "application/json"
+    headers = {"Vary": "Accept"}
+    # A returned Response bypasses the dependency-set headers, so carry this one over
+    version = getattr(request.state, "model_version", None)
+    if version:
+        headers["X-Model-Version"] = version
+    return Response(body, status_code=status_code, media_type=media_type, headers=headers)
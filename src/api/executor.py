@@ -0,0 +1,142 @@
+"""
+Process-pool inference executor.
+
+Scoring is CPU-bound NumPy / sklearn / XGBoost work. On the default
+threadpool it contends for the GIL, so one uvicorn worker cannot use more
+than about one core for inference. With INFERENCE_WORKERS > 0 the scoring
+calls are sent to a pool of worker processes instead:
+
+  - each worker loads pipeline snapshots from the model registry itself
+    (by version, keeping the most recent ones in memory), so only the
+    request frame and the result arrays cross the process boundary, never
+    the pipeline,
+  - a call carries the version of the snapshot its request resolved, so a
+    hot swap or rollback is followed by every worker without restarting
+    the pool,
+  - pipelines that are not in the registry (no ``version``) and a disabled
+    or broken pool fall back to the threadpool.
+
+Routes call ``offload(executor, fn, *args, pipeline=pipeline)`` with a
+module-level scoring function that accepts ``pipeline`` as a keyword.
+
+A worker's metrics registry is never rendered by /metrics. The inference
+stage and batch-size histograms a call observes in a worker are therefore
+returned with its result and recorded in the API process. Nothing else is
+forwarded.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.config import settings
+from src.models.registry import ModelRegistry, get_registry
+from src.utils.helpers import get_logger
+from src.utils.metrics import captured, export_samples, record_samples
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_worker_registry: Optional[ModelRegistry] = None
+
+
+def _init_worker(registry_root: str, keep_loaded: int) -> None:
+    global _worker_registry
+    _worker_registry = ModelRegistry(registry_root, keep_loaded=keep_loaded)
+    _worker_registry.load()  # the served version, before the first request arrives
+
+
+def _call(fn: Callable, version: str, args: tuple, kwargs: dict) -> tuple[Any, list]:
+    """``(result, histogram samples)`` of one scoring call; the samples are recorded by the caller."""
+    pipeline = _worker_registry.load(version)
+    if pipeline is None:
+        raise RuntimeError(f"Model version {version} is not in the registry")
+    with captured() as samples:
+        result = fn(*args, pipeline=pipeline, **kwargs)
+    return result, export_samples(samples)
+
+
+def _warm(version: str) -> int:
+    from src.api.readiness import warm_up  # deferred: readiness imports this module's importers
+
+    pipeline = _worker_registry.load(version)
+    if pipeline is not None:
+        warm_up(pipeline)  # untimed pass: lazy initialisation happens here, not on a request
+    return os.getpid()
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+class InferenceExecutor:
+    """A pool of scoring processes that follow the registry's versions."""
+
+    def __init__(self, workers: int, registry_root: str, keep_loaded: int = 2):
+        self.workers = workers
+        self.registry_root = registry_root
+        self.keep_loaded = keep_loaded
+        self._pool = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.registry_root, self.keep_loaded),
+        )
+
+    async def run(self, fn: Callable, version: str, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        result, samples = await loop.run_in_executor(self._pool, _call, fn, version, args, kwargs)
+        record_samples(samples)
+        return result
+
+    async def warm(self, version: str) -> None:
+        """Have every worker load and warm up ``version`` before requests for it arrive."""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(self._pool, _warm, version) for _ in range(self.workers)
+            ))
+        except Exception as exc:
+            logger.warning("Warming inference workers for %s failed: %s", version, exc)
+
+    def restart(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._start()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def executor_from_settings() -> Optional[InferenceExecutor]:
+    """The configured process pool, or None when INFERENCE_WORKERS is 0."""
+    if settings.INFERENCE_WORKERS <= 0:
+        return None
+    return InferenceExecutor(
+        settings.INFERENCE_WORKERS,
+        get_registry().root,
+        keep_loaded=settings.MODEL_REGISTRY_KEEP_LOADED,
+    )
+
+
+async def offload(executor: Optional[InferenceExecutor], fn: Callable, *args, pipeline: dict, **kwargs) -> Any:
+    """Run ``fn(*args, pipeline=pipeline, **kwargs)`` on the process pool, else the threadpool."""
+    version = pipeline.get("version")
+    if executor is not None and version:
+        try:
+            return await executor.run(fn, version, *args, **kwargs)
+        except BrokenProcessPool:
+            logger.error("Inference worker died — restarting the pool, serving this call in-process")
+            executor.restart()
+    return await run_in_threadpool(fn, *args, pipeline=pipeline, **kwargs)
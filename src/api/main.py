@@ -5,15 +5,27 @@ Run from project root:
     uvicorn src.api.main:app --host 0.0.0.0 --port 8000 --reload
 """
 
+import asyncio
 import os
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.api.routers import data, info, models, predict
+from src.api import readiness
+from src.api.batching import coalescer_from_settings
+from src.api.dependencies import set_pipeline
+from src.api.executor import executor_from_settings
+from src.api.encoding import FastJSONResponse
+from src.api.middleware import (
+    CompressionMiddleware, MetricsMiddleware, ProfiledCoalescer, ProfilingMiddleware, install_profiling,
+)
+from src.api.routers import bulk, data, info, live, metrics, models, predict, profiles, stats
 from src.config import settings
+from src.data.fastf1_cache import cache_manager_from_settings
 from src.models.pipeline import run_training_pipeline
+from src.models.registry import get_registry
 from src.utils.helpers import get_logger
 
 logger = get_logger(__name__, settings.LOG_LEVEL)
@@ -25,22 +37,65 @@ def _enable_fastf1_cache() -> None:
         os.makedirs(settings.FASTF1_CACHE_DIR, exist_ok=True)
         fastf1.Cache.enable_cache(settings.FASTF1_CACHE_DIR)
         logger.info("FastF1 cache enabled → %s", settings.FASTF1_CACHE_DIR)
+        cache_manager_from_settings().enforce()
     except ImportError:
         logger.warning("fastf1 not installed — real F1 data unavailable")
     except Exception as exc:
         logger.warning("FastF1 cache setup failed: %s", exc)
 
 
+async def _watch_registry(app: FastAPI) -> None:
+    """Follow the registry's CURRENT pointer so every worker serves the same version."""
+    registry = get_registry()
+    while True:
+        await asyncio.sleep(settings.MODEL_REGISTRY_POLL_SECONDS)
+        try:
+            version = registry.current_version()
+            # Already served, or being warmed by a swap (e.g. POST /models/train) right now
+            if version is None or version in (app.state.model_version, app.state.swapping_version):
+                continue
+            pipeline = await run_in_threadpool(registry.load, version)
+            if pipeline is not None:
+                report = await readiness.swap_in(app, pipeline)
+                if not report.get("superseded"):
+                    logger.info("Swapped in model version %s", version)
+        except Exception as exc:
+            logger.warning("Registry watch failed: %s", exc)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting %s v%s", settings.APP_NAME, settings.VERSION)
     _enable_fastf1_cache()
-    app.state.pipeline = run_training_pipeline(
+    app.state.readiness = readiness.Readiness()
+    app.state.swap_lock = asyncio.Lock()
+    app.state.swapping_version = None
+    set_pipeline(app, run_training_pipeline(
         force_retrain=settings.FORCE_RETRAIN,
         force_data_refresh=settings.FORCE_DATA_REFRESH,
-    )
-    logger.info("Ready. Docs → http://%s:%s/docs", settings.HOST, settings.PORT)
+    ))
+    app.state.executor = executor_from_settings()
+    if app.state.executor is not None:
+        logger.info("Inference executor: %d worker processes", app.state.executor.workers)
+    app.state.coalescer = coalescer_from_settings(app.state.executor)
+    if settings.PROFILING_TOKEN and app.state.coalescer is not None:
+        app.state.coalescer = ProfiledCoalescer(app.state.coalescer)
+    # Live from here on; /health/ready flips once the warm-up has passed the SLO
+    background = [asyncio.create_task(readiness.warm_serving(app))]
+    if settings.MODEL_REGISTRY_POLL_SECONDS > 0:
+        background.append(asyncio.create_task(_watch_registry(app)))
+    logger.info("Live. Docs → http://%s:%s/docs", settings.HOST, settings.PORT)
     yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await readiness.shutdown(app)
+    await live.shutdown()
+    if app.state.coalescer is not None:
+        await app.state.coalescer.shutdown()
+    if app.state.executor is not None:
+        app.state.executor.shutdown()
     del app.state.pipeline
     logger.info("Shutdown complete.")
 
@@ -50,19 +105,45 @@ app = FastAPI(
     description=settings.DESCRIPTION,
     version=settings.VERSION,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+if settings.PROFILING_TOKEN:
+    install_profiling()
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=settings.PROFILING_TOKEN,
+        directory=settings.PROFILING_DIR,
+        keep=settings.PROFILING_KEEP,
+        top_n=settings.PROFILING_TOP_FUNCTIONS,
+    )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(info.router)
 app.include_router(data.router)
 app.include_router(models.router)
 app.include_router(predict.router)
+app.include_router(bulk.router)
+app.include_router(live.router)
+app.include_router(stats.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+if settings.PROFILING_TOKEN:
+    app.include_router(profiles.router)
 
 
 if __name__ == "__main__":
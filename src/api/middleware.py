@@ -0,0 +1,337 @@
+"""
+ASGI middleware shared by the API.
+
+Written as raw ASGI callables rather than BaseHTTPMiddleware so they add no
+extra task or body buffering on the request path.
+"""
+
+import asyncio
+import functools
+import hmac
+import importlib
+import json
+import time
+import zlib
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+from src.api.executor import offload
+from src.config import settings
+from src.models.pipeline import REQUEST_COLS, run_inference
+from src.utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from src.utils.profiling import RequestProfile, SectionProxy, current_profile, profile_section, save_profile, sectioned
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Payloads that are already compressed gain nothing from another pass
+_INCOMPRESSIBLE = ("application/vnd.apache.parquet", "application/x-parquet", "application/zip", "image/")
+
+
+class MetricsMiddleware:
+    """Record per-route latency, status counts and in-flight requests.
+
+    Routes are labelled by their template (``/predict/batch``), never by the raw
+    path, so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the (shared) scope dict
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope.get("method", "")
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, status_code).inc()
+
+
+class ProfilingMiddleware:
+    """Profile requests that present the profiling token (see src/utils/profiling.py).
+
+    Opt in per request with an ``X-Profile: <token>`` header or a
+    ``profile=<token>`` query parameter; a wrong token is answered with 403.
+    The response carries ``X-Profile-Id`` and a ``Server-Timing`` header; the
+    full summary is stored under ``directory``. Only installed when
+    PROFILING_TOKEN is set (together with ``install_profiling``), so
+    unprofiled deployments pay nothing.
+    """
+
+    def __init__(self, app, token: str, directory: str, keep: int = 100, top_n: int = 25):
+        self.app = app
+        self.token = token.encode()
+        self.directory = directory
+        self.keep = keep
+        self.top_n = top_n
+
+    def _presented(self, scope) -> bytes | None:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return value
+        query = scope.get("query_string", b"")
+        if b"profile=" in query:
+            values = parse_qs(query.decode("latin-1")).get("profile")
+            if values:
+                return values[0].encode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        presented = self._presented(scope) if scope["type"] == "http" else None
+        if presented is None or scope["path"].startswith("/debug/profiles"):
+            await self.app(scope, receive, send)
+            return
+        if not hmac.compare_digest(presented, self.token):
+            body = json.dumps({"detail": "Invalid profiling token"}).encode()
+            await send({"type": "http.response.start", "status": 403,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        profile = RequestProfile(f"{scope.get('method', '')} {scope['path']}", top_n=self.top_n)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.response_start = time.perf_counter()
+                profile.status = message["status"]
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-Profile-Id"] = profile.id
+                timings = ", ".join(f"{name};dur={ms}" for name, ms in profile.spans().items())
+                if timings:
+                    headers["Server-Timing"] = timings
+            await send(message)
+
+        try:
+            with profile:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            await run_in_threadpool(save_profile, profile.summary(), self.directory, self.keep)
+
+
+def _profiled_endpoint(endpoint):
+    """Wrap an endpoint so its call is the ``handler`` section of a profiled request."""
+    if getattr(endpoint, "_profiled", False):
+        return endpoint  # include_router rebuilds routes from the already wrapped endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            with profile_section("handler"):
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            with profile_section("handler"):
+                return endpoint(*args, **kwargs)
+    wrapper._profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint marks the ``handler`` section when profiling is enabled.
+
+    Everything between the request arriving and that section starting is body
+    parsing, pydantic validation and dependencies; everything after it ends
+    until the response starts is response serialization.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if settings.PROFILING_TOKEN:
+            endpoint = _profiled_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+# Phases wrapped as sections by install_profiling: (module, attribute, section)
+_SECTIONS: list[tuple[str, str, str]] = [
+    ("src.models.pipeline", "build_feature_vector", "build_feature_vector"),
+    ("src.models.pipeline", "build_feature_matrix", "build_feature_matrix"),
+    ("src.models.pipeline", "_safe_encode", "label_encoding"),
+    ("src.models.pipeline", "_label_codes", "label_encoding"),
+    ("src.models.simulation", "build_feature_matrix", "build_feature_matrix"),
+    ("src.api.routers.predict", "get_next_race", "get_next_race"),
+    ("src.api.routers.predict", "negotiated", "response_encoding"),
+]
+_installed = False
+
+
+class _ProfiledModel:
+    """A pipeline model whose scaler and best-model calls are the scale / model sections."""
+
+    def __init__(self, model):
+        self._model = model
+        self.scaler = SectionProxy(model.scaler, "scale", ("transform",))
+        self.best_model = SectionProxy(model.best_model, "model", ("predict", "predict_proba"))
+
+    def __getattr__(self, attr):
+        return getattr(self._model, attr)
+
+
+async def _profiled_offload(executor, fn, *args, pipeline: dict, **kwargs):
+    """offload(), except that a profiled call scores in-process, where cProfile and the sections see it."""
+    profile = current_profile()
+    if profile is None:
+        return await offload(executor, fn, *args, pipeline=pipeline, **kwargs)
+    profiled = {**pipeline, "model": _ProfiledModel(pipeline["model"])}
+    return await run_in_threadpool(profile.run, fn, *args, pipeline=profiled, **kwargs)
+
+
+class ProfiledCoalescer:
+    """Front for the /predict coalescer that scores a profiled call on its own.
+
+    Its profile then covers only its own request, not a batch shared with others.
+    """
+
+    def __init__(self, coalescer):
+        self.coalescer = coalescer
+
+    async def predict(self, row: dict, pipeline: dict) -> dict:
+        if current_profile() is None:
+            return await self.coalescer.predict(row, pipeline)
+        return await _profiled_offload(None, run_inference, *(row[c] for c in REQUEST_COLS), pipeline=pipeline)
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        await self.coalescer.shutdown(timeout)
+
+
+def install_profiling() -> None:
+    """
+    Hook the profiled phases: section wrappers (``_SECTIONS``) and in-process
+    scoring for profiled /predict calls. Only called when PROFILING_TOKEN is
+    set, so the inference path is untouched otherwise.
+    """
+    global _installed
+    if _installed:
+        return
+    for module_name, attr, section in _SECTIONS:
+        module = importlib.import_module(module_name)
+        setattr(module, attr, sectioned(getattr(module, attr), section))
+    importlib.import_module("src.api.routers.predict").offload = _profiled_offload
+    _installed = True
+
+
+class CompressionMiddleware:
+    """Brotli / gzip response compression negotiated from Accept-Encoding.
+
+    Bodies below ``minimum_size`` go out untouched. Streaming responses are
+    compressed chunk by chunk with a sync flush after each one, so NDJSON
+    results still reach the client as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose(self, scope) -> str | None:
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1").lower()
+                break
+        offered = {part.split(";")[0].strip() for part in accept.split(",")}
+        if BROTLI_AVAILABLE and "br" in offered:
+            return "br"
+        if "gzip" in offered:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._choose(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                # Already encoded, already compressed, or event streams that must not be buffered
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith("text/event-stream")
+                    or content_type.startswith(_INCOMPRESSIBLE)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["content-length"]
+                if not more:
+                    payload = compressor.finish(body)
+                    headers["Content-Length"] = str(len(payload))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": payload})
+                    return
+                await send(start)
+
+            payload = compressor.finish(body) if not more else compressor.flush(body)
+            await send({"type": "http.response.body", "body": payload, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class _Compressor:
+    """Uniform chunk-flush / finish interface over gzip and brotli."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def flush(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
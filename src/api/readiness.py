@@ -0,0 +1,237 @@
+"""
+Readiness gate: warm a pipeline up and check it against the latency SLO.
+
+The first calls into a freshly loaded pipeline pay one-off costs: XGBoost /
+sklearn lazy initialisation, LabelEncoder lookups and the dense lookup
+tables and stats cube index built on first use. Serving real traffic through those calls is what
+shows up as p99 spikes right after a deploy or a model swap. So every
+pipeline goes through ``warm_up`` before it is reported ready:
+
+  - one untimed pass of single and batch inferences over representative
+    requests (the latest race's lineup across the known tracks and weather),
+  - then READINESS_WARMUP_SAMPLES timed single predictions and a few timed
+    batches of READINESS_WARMUP_BATCH rows, whose p99 is checked against
+    READINESS_SLO_SINGLE_MS / READINESS_SLO_BATCH_MS (0 disables a check).
+
+``GET /health/live`` only says the process is up. ``GET /health/ready``
+answers 503 until the served pipeline has passed the warm-up, so a load
+balancer keeps traffic away in the meantime. A swap (``swap_in``) warms the
+new pipeline *before* it replaces the old one, which keeps serving warm
+meanwhile. Swaps are serialised, and one that the registry has moved past
+by the time it is warm is dropped. A pipeline that misses the SLO is still served, but the worker
+stays unready and the check is retried every READINESS_RETRY_SECONDS.
+"""
+
+import asyncio
+import time
+from contextlib import suppress
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from src.api.dependencies import set_pipeline
+from src.config import settings
+from src.data.live_feed import latest_lineup
+from src.models.pipeline import REQUEST_COLS, run_batch_inference, run_inference
+from src.models.registry import get_registry
+from src.models.stats_cube import stats_cube
+from src.utils.helpers import get_logger
+from src.utils.metrics import MODEL_READY, captured
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+
+def representative_requests(pipeline: dict, n_rows: int) -> pd.DataFrame:
+    """``n_rows`` REQUEST_COLS rows: the latest lineup cycled over tracks and weather."""
+    lineup = latest_lineup(pipeline)
+    tracks = pipeline["tracks"]
+    weathers = list(pipeline["feature_engineer"].le_weather.classes_)
+    rows = [
+        {
+            **lineup[i % len(lineup)],
+            "track": tracks[(i // len(lineup)) % len(tracks)],
+            "weather": weathers[i % len(weathers)],
+            "temperature": 15 + i % 20,
+        }
+        for i in range(n_rows)
+    ]
+    return pd.DataFrame(rows, columns=REQUEST_COLS)
+
+
+def _p99_ms(seconds: list[float]) -> float:
+    return round(float(np.percentile(seconds, 99)) * 1000, 3)
+
+
+def warm_up(pipeline: dict, samples: int = 0, batch_rows: int = 0) -> dict:
+    """
+    Run the warm-up pass on ``pipeline`` and measure it against the SLO.
+
+    With ``samples=0`` only the untimed pass runs (used by inference workers).
+    Its inference calls are left out of the metrics.
+    Returns the readiness report: ``{"ready", "single_p99_ms", "batch_p99_ms", ...}``.
+    """
+    t0 = time.perf_counter()
+    batch_rows = batch_rows or settings.READINESS_WARMUP_BATCH
+    frame = representative_requests(pipeline, max(batch_rows, 1))
+
+    # Synthetic calls: their stage timings must not skew the served histograms
+    with captured():
+        # Untimed: pays every lazy initialisation once
+        for row in frame.head(min(len(frame), 20)).itertuples(index=False):
+            run_inference(*row, pipeline=pipeline)
+        run_batch_inference(frame, pipeline)
+        stats_cube(pipeline)
+
+        single: list[float] = []
+        rows = list(frame.itertuples(index=False))
+        for i in range(samples):
+            s = time.perf_counter()
+            run_inference(*rows[i % len(rows)], pipeline=pipeline)
+            single.append(time.perf_counter() - s)
+        batch: list[float] = []
+        for _ in range(min(samples, 5)):
+            s = time.perf_counter()
+            run_batch_inference(frame, pipeline)
+            batch.append(time.perf_counter() - s)
+
+    report = {
+        "model_version": pipeline.get("version"),
+        "checked_at": datetime.now().isoformat(),
+        "warmup_seconds": round(time.perf_counter() - t0, 3),
+        "single_samples": len(single),
+        "single_p99_ms": _p99_ms(single) if single else None,
+        "batch_rows": len(frame),
+        "batch_p99_ms": _p99_ms(batch) if batch else None,
+        "slo_single_ms": settings.READINESS_SLO_SINGLE_MS,
+        "slo_batch_ms": settings.READINESS_SLO_BATCH_MS,
+        "failures": [],
+    }
+    checks = (("single", report["single_p99_ms"], settings.READINESS_SLO_SINGLE_MS),
+              ("batch", report["batch_p99_ms"], settings.READINESS_SLO_BATCH_MS))
+    for name, p99, slo in checks:
+        if slo > 0 and p99 is not None and p99 > slo:
+            report["failures"].append(f"{name} p99 {p99:.1f} ms > SLO {slo:g} ms")
+    report["ready"] = not report["failures"]
+    return report
+
+
+class Readiness:
+    """Per-worker readiness state, kept on ``app.state.readiness``."""
+
+    def __init__(self):
+        self.report: Optional[dict] = None
+        self._retry: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.report and self.report["ready"])
+
+    def record(self, report: dict) -> None:
+        self.report = report
+        MODEL_READY.set(1 if report["ready"] else 0)
+        if report["ready"]:
+            logger.info(
+                "Model version %s ready (single p99 %s ms, batch p99 %s ms, warm-up %.2fs)",
+                report["model_version"], report["single_p99_ms"], report["batch_p99_ms"], report["warmup_seconds"],
+            )
+        else:
+            logger.warning("Model version %s not ready: %s", report["model_version"], "; ".join(report["failures"]))
+
+    def cancel_retry(self) -> None:
+        if self._retry is not None and not self._retry.done():
+            self._retry.cancel()
+        self._retry = None
+
+
+async def check(app: FastAPI, pipeline: dict) -> dict:
+    """Warm ``pipeline`` (and the inference workers) and return its readiness report."""
+    executor = getattr(app.state, "executor", None)
+    if executor is not None and pipeline.get("version"):
+        await executor.warm(pipeline["version"])
+    try:
+        return await run_in_threadpool(
+            warm_up, pipeline, settings.READINESS_WARMUP_SAMPLES, settings.READINESS_WARMUP_BATCH
+        )
+    except Exception as exc:
+        logger.exception("Warm-up failed: %s", exc)
+        return {"model_version": pipeline.get("version"), "ready": False, "failures": [f"warm-up failed: {exc}"]}
+
+
+async def _retry_until_ready(app: FastAPI, pipeline: dict) -> None:
+    readiness: Readiness = app.state.readiness
+    while True:
+        await asyncio.sleep(settings.READINESS_RETRY_SECONDS)
+        if app.state.pipeline is not pipeline:
+            return  # superseded by a newer swap, which runs its own check
+        report = await check(app, pipeline)
+        if app.state.pipeline is not pipeline:
+            return
+        readiness.record(report)
+        if report["ready"]:
+            return
+
+
+def _schedule_retry(app: FastAPI, pipeline: dict) -> None:
+    readiness: Readiness = app.state.readiness
+    readiness.cancel_retry()
+    if not readiness.ready and settings.READINESS_RETRY_SECONDS > 0:
+        readiness._retry = asyncio.create_task(_retry_until_ready(app, pipeline))
+
+
+async def _superseded(version: Optional[str]) -> bool:
+    """True when the registry's CURRENT has moved past ``version`` (unversioned pipelines never are)."""
+    if version is None:
+        return False
+    return await run_in_threadpool(get_registry().current_version) != version
+
+
+async def swap_in(app: FastAPI, pipeline: dict) -> dict:
+    """
+    Warm ``pipeline`` up, then serve it; readiness reflects its SLO check.
+
+    Swaps run one at a time (``app.state.swap_lock``), and the version being
+    warmed is kept on ``app.state.swapping_version`` so that the registry
+    watcher does not start the same swap again. A swap that CURRENT has moved
+    past, before or after its warm-up, is dropped with ``superseded`` in its
+    report, and the served pipeline is left alone.
+    """
+    version = pipeline.get("version")
+    async with app.state.swap_lock:
+        if await _superseded(version):
+            return {"model_version": version, "ready": False, "superseded": True, "failures": []}
+        served = app.state.readiness.report
+        if version is not None and version == app.state.model_version and served and served["model_version"] == version:
+            return served  # swapped in by another caller while this one waited for the lock
+        app.state.swapping_version = version
+        try:
+            report = await check(app, pipeline)
+            if await _superseded(version):
+                logger.info("Dropping swap to %s: the registry moved on during its warm-up", version)
+                return {**report, "superseded": True}
+            set_pipeline(app, pipeline)
+            app.state.readiness.record(report)
+            _schedule_retry(app, pipeline)
+            return report
+        finally:
+            app.state.swapping_version = None
+
+
+async def warm_serving(app: FastAPI) -> None:
+    """Startup: the pipeline is already set; flip readiness once it is warm."""
+    pipeline = app.state.pipeline
+    app.state.readiness.record(await check(app, pipeline))
+    if app.state.pipeline is pipeline:
+        _schedule_retry(app, pipeline)
+
+
+async def shutdown(app: FastAPI) -> None:
+    readiness: Readiness = app.state.readiness
+    task, readiness._retry = readiness._retry, None
+    if task is not None and not task.done():
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,180 @@
+"""
+Bulk scoring over Arrow IPC streams and Parquet files.
+
+The request body is a table with the PredictRequest columns (``weather`` and
+``temperature`` optional). It is read column-wise, scored in chunks of
+BULK_CHUNK_ROWS through the vectorized pipeline, and returned in the same
+(or the requested) format with the prediction columns appended — no per-row
+JSON parsing or pydantic objects anywhere on the path.
+"""
+
+import io
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from src.api.dependencies import get_pipeline
+from src.config import settings
+from src.models.pipeline import REQUEST_COLS, run_batch_inference
+
+router = APIRouter(prefix="/predict", tags=["Prediction"])
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+MEDIA_TYPES = {"arrow": ARROW_STREAM, "parquet": PARQUET}
+_PARQUET_ALIASES = (PARQUET, "application/x-parquet", "application/parquet")
+
+# Column → (arrow type, default when absent, inclusive bounds)
+_INPUT_COLUMNS: dict[str, tuple] = {
+    "driver": (pa.string(), None, None),
+    "team": (pa.string(), None, None),
+    "track": (pa.string(), None, None),
+    "grid_position": (pa.int64(), None, (1, 20)),
+    "weather": (pa.string(), "Dry", None),
+    "temperature": (pa.int64(), 25, (10, 45)),
+}
+_OUTPUT_FIELDS = [
+    pa.field("predicted_position", pa.int64()),
+    pa.field("win_probability", pa.float64()),
+    pa.field("podium_probability", pa.float64()),
+]
+
+
+def _input_format(request: Request, body: bytes) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in _PARQUET_ALIASES:
+        return "parquet"
+    if content_type == ARROW_STREAM:
+        return "arrow"
+    # application/octet-stream or missing: Parquet files start with the PAR1 magic
+    return "parquet" if body[:4] == b"PAR1" else "arrow"
+
+
+def _output_format(request: Request, requested: Optional[str], source: str) -> str:
+    if requested:
+        return requested
+    accept = request.headers.get("accept", "").lower()
+    if any(alias in accept for alias in _PARQUET_ALIASES):
+        return "parquet"
+    if ARROW_STREAM in accept:
+        return "arrow"
+    return source
+
+
+def _open(body: bytes, fmt: str, chunk_rows: int) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """Schema plus an iterator of record batches no longer than ``chunk_rows``."""
+    if fmt == "parquet":
+        reader = pq.ParquetFile(pa.BufferReader(body))
+        return reader.schema_arrow, reader.iter_batches(batch_size=chunk_rows)
+
+    reader = pa.ipc.open_stream(pa.BufferReader(body))
+
+    def batches():
+        for batch in reader:
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(offset, chunk_rows)
+
+    return reader.schema, batches()
+
+
+def _request_frame(batch: pa.RecordBatch, first_row: int) -> pd.DataFrame:
+    """Cast, default and bounds-check the request columns of one chunk."""
+    columns = {}
+    for name, (arrow_type, default, bounds) in _INPUT_COLUMNS.items():
+        if name not in batch.schema.names:
+            columns[name] = default
+            continue
+        col = batch.column(name)
+        if col.null_count:
+            raise HTTPException(status_code=422, detail=f"Column '{name}' contains nulls")
+        try:
+            col = pc.cast(col, arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exc:
+            raise HTTPException(status_code=422, detail=f"Column '{name}' is not {arrow_type}: {exc}")
+        values = col.to_numpy(zero_copy_only=False)
+        if bounds is not None:
+            bad = np.flatnonzero((values < bounds[0]) | (values > bounds[1]))
+            if bad.size:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Column '{name}' must be within [{bounds[0]}, {bounds[1]}] "
+                           f"({bad.size} rows out of range, first at row {first_row + int(bad[0])})",
+                )
+        columns[name] = values
+    return pd.DataFrame(columns, index=pd.RangeIndex(batch.num_rows), columns=REQUEST_COLS)
+
+
+def score_table(body: bytes, in_fmt: str, out_fmt: str, pipeline: dict, chunk_rows: int) -> tuple[bytes, int]:
+    """Score every chunk of the payload and serialise the augmented table."""
+    try:
+        schema, batches = _open(body, in_fmt, chunk_rows)
+    except (pa.ArrowInvalid, OSError) as exc:
+        raise HTTPException(status_code=400, detail=f"Unreadable {in_fmt} payload: {exc}")
+    missing = [c for c, (_, default, _) in _INPUT_COLUMNS.items() if default is None and c not in schema.names]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing required columns: {', '.join(missing)}")
+    clash = [f.name for f in _OUTPUT_FIELDS if f.name in schema.names]
+    if clash:
+        raise HTTPException(status_code=422, detail=f"Input already has output columns: {', '.join(clash)}")
+
+    out_schema = pa.schema(list(schema) + _OUTPUT_FIELDS).with_metadata({
+        "model_used": pipeline["model"].best_model_name,
+        "model_version": pipeline.get("version") or "",
+    })
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, out_schema) if out_fmt == "arrow" else pq.ParquetWriter(sink, out_schema)
+    rows = 0
+    with writer:
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            result = run_batch_inference(_request_frame(batch, rows), pipeline)
+            arrays = list(batch.columns) + [
+                pa.array(result["predicted_position"], pa.int64()),
+                pa.array(result["win_probability"], pa.float64()),
+                pa.array(result["podium_probability"], pa.float64()),
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=out_schema))
+            rows += batch.num_rows
+    return sink.getvalue(), rows
+
+
+@router.post(
+    "/bulk",
+    response_class=Response,
+    responses={200: {"content": {ARROW_STREAM: {}, PARQUET: {}}}},
+)
+async def bulk_predict(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(arrow|parquet)$",
+                                  description="Response format (default: Accept header, else the input format)"),
+    chunk_rows: int = Query(settings.BULK_CHUNK_ROWS, ge=1, le=1_000_000),
+    pipeline: dict = Depends(get_pipeline),
+):
+    """Score an Arrow IPC stream or Parquet file of PredictRequest columns.
+
+    Send the table as the raw body (``Content-Type: application/vnd.apache.arrow.stream``
+    or ``application/vnd.apache.parquet``). The response is the same table
+    with ``predicted_position``, ``win_probability`` and ``podium_probability``
+    appended; the model name and version are in the schema metadata.
+    """
+    declared = int(request.headers.get("content-length") or 0)
+    if declared > settings.BULK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Payload exceeds {settings.BULK_MAX_BYTES} bytes")
+    body = await request.body()
+    if len(body) > settings.BULK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Payload exceeds {settings.BULK_MAX_BYTES} bytes")
+
+    in_fmt = _input_format(request, body)
+    out_fmt = _output_format(request, format, in_fmt)
+    payload, rows = await run_in_threadpool(score_table, body, in_fmt, out_fmt, pipeline, chunk_rows)
+    headers = {"X-Rows-Scored": str(rows)}
+    if pipeline.get("version"):
+        headers["X-Model-Version"] = pipeline["version"]
+    return Response(payload, media_type=MEDIA_TYPES[out_fmt], headers=headers)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 
 from src.api.dependencies import get_pipeline
+from src.data.fastf1_cache import cache_manager_from_settings
 
 router = APIRouter(tags=["Data"])
 
@@ -18,3 +19,9 @@ def list_tracks(pipeline: dict = Depends(get_pipeline)):
 @router.get("/teams")
 def list_teams(pipeline: dict = Depends(get_pipeline)):
     return {"teams": pipeline["teams"]}
+
+
+@router.get("/fastf1-cache")
+def fastf1_cache_usage():
+    """FastF1 cache size, budget and per-season breakdown."""
+    return cache_manager_from_settings().usage()
@@ -1,9 +1,10 @@
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 
 from src.api.dependencies import get_pipeline
-from src.api.schemas import HealthResponse
+from src.api.schemas import HealthResponse, ReadinessResponse
 from src.config import settings
 from src.models.pipeline import FEATURE_COLS
 
@@ -23,19 +24,39 @@ def root():
 @router.get("/health", response_model=HealthResponse)
 def health(request: Request):
     pipeline = getattr(request.app.state, "pipeline", None)
+    readiness = getattr(request.app.state, "readiness", None)
     return HealthResponse(
         status="ok",
         models_trained=pipeline is not None and pipeline.get("is_trained", False),
+        ready=readiness is not None and readiness.ready,
+        model_version=pipeline.get("version") if pipeline is not None else None,
         version=settings.VERSION,
         timestamp=datetime.now().isoformat(),
     )
 
 
+@router.get("/health/live")
+def liveness():
+    """Liveness: the process is up and serving HTTP (restart it if this fails)."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+def readiness_probe(request: Request):
+    """Readiness: 200 once the served pipeline is warm and within the latency SLO, else 503."""
+    readiness = getattr(request.app.state, "readiness", None)
+    report = readiness.report if readiness is not None and readiness.report else {"ready": False, "failures": ["warming up"]}
+    body = ReadinessResponse(**report)
+    if not body.ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
+
 @router.get("/info")
 def model_info(pipeline: dict = Depends(get_pipeline)):
     """Model metadata consumed by the dashboard Model tab."""
     model = pipeline["model"]
-    best_acc = max(model.results.values())
+    best_acc = model.results[model.best_model_name]
     return {
         "model":           model.best_model_name,
         "version":         f"v{settings.VERSION}",
@@ -0,0 +1,267 @@
+"""
+Live in-race predictions over Server-Sent Events and WebSocket.
+
+A session replays a lap feed (src.data.live_feed) through a LiveRace. One
+background task per session applies each lap, scores the grid once and
+serialises the snapshot once; the bytes are then fanned out to every
+subscriber's bounded queue. A slow client only ever drops its own oldest
+buffered laps, it never holds up the race or other clients, and new
+subscribers immediately receive the latest snapshot.
+"""
+
+import asyncio
+import uuid
+from contextlib import suppress
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies import get_pipeline
+from src.api.encoding import dumps
+from src.api.schemas import LiveSessionInfo, LiveSessionRequest
+from src.config import settings
+from src.data.live_feed import LapReplay, fastf1_replay, latest_lineup, synthetic_replay
+from src.models.live import LiveRace
+from src.utils.helpers import get_logger
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+# Seconds of silence after which an SSE comment is sent to keep proxies from closing the stream
+_KEEPALIVE_SECONDS = 15.0
+
+
+class LiveSession:
+    """One replayed race and the clients following it."""
+
+    def __init__(self, replay: LapReplay, race: LiveRace, lap_interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.replay = replay
+        self.race = race
+        self.lap_interval = lap_interval
+        self.created_at = datetime.now().isoformat()
+        self.latest: Optional[bytes] = None
+        self.lap = 0
+        self.status = "pre-race"
+        self.subscribers: set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    # -- fan-out --------------------------------------------------------
+
+    def subscribe(self) -> asyncio.Queue:
+        # Room for at least the latest snapshot plus the end marker of a finished session
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(2, settings.LIVE_QUEUE_SIZE))
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        if self.finished:
+            queue.put_nowait(None)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def _publish(self, payload: Optional[bytes]) -> None:
+        for queue in self.subscribers:
+            if queue.full():
+                # Drop the client's oldest lap; the newest snapshot supersedes it anyway
+                with suppress(asyncio.QueueEmpty):
+                    queue.get_nowait()
+            queue.put_nowait(payload)
+
+    # -- replay ---------------------------------------------------------
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("finished", "failed")
+
+    async def run(self) -> None:
+        try:
+            snapshot = await run_in_threadpool(self.race.snapshot)
+            self.latest = dumps(snapshot)
+            self._publish(self.latest)
+            for update in self.replay.updates:
+                await asyncio.sleep(self.lap_interval)
+                snapshot = await run_in_threadpool(self.race.step, update)
+                self.lap, self.status = snapshot["lap"], "running"
+                self.latest = dumps(snapshot)
+                self._publish(self.latest)
+            self.status = "finished"
+        except asyncio.CancelledError:
+            self.status = "stopped"
+            raise
+        except Exception as exc:
+            logger.exception("Live session %s failed: %s", self.id, exc)
+            self.status = "failed"
+        finally:
+            # None tells every subscriber the stream is over
+            self._publish(None)
+
+    def info(self) -> LiveSessionInfo:
+        return LiveSessionInfo(
+            id=self.id,
+            source=self.replay.source,
+            track=self.replay.track,
+            lap=self.lap,
+            total_laps=self.replay.total_laps,
+            status=self.status,
+            subscribers=len(self.subscribers),
+            model_version=self.race.pipeline.get("version"),
+            created_at=self.created_at,
+            events_url=f"{router.prefix}/{self.id}/events",
+            websocket_url=f"{router.prefix}/{self.id}/ws",
+        )
+
+
+_sessions: dict[str, LiveSession] = {}
+
+
+def _get_session(session_id: str) -> LiveSession:
+    session = _sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown live session '{session_id}'")
+    return session
+
+
+def _make_room() -> None:
+    """Evict the oldest ended session when at LIVE_MAX_SESSIONS."""
+    if len(_sessions) < settings.LIVE_MAX_SESSIONS:
+        return
+    ended = [s for s in _sessions.values() if s.task is None or s.task.done()]
+    if not ended:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{settings.LIVE_MAX_SESSIONS} live sessions are already running",
+        )
+    oldest = min(ended, key=lambda s: s.created_at)
+    _sessions.pop(oldest.id, None)
+
+
+def _build_replay(req: LiveSessionRequest, pipeline: dict) -> LapReplay:
+    if req.source == "fastf1":
+        if req.year is None or req.round is None:
+            raise HTTPException(status_code=422, detail="year and round are required for source 'fastf1'")
+        try:
+            return fastf1_replay(req.year, req.round, settings.FASTF1_CACHE_DIR)
+        except (RuntimeError, ValueError) as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+        except Exception as exc:
+            raise HTTPException(status_code=502, detail=f"Could not load FastF1 session: {exc}")
+
+    if req.grid:
+        entries = [e.model_dump() for e in req.grid]
+    else:
+        entries = latest_lineup(pipeline)
+    if req.track:
+        track = req.track
+    else:
+        df = pipeline["feature_engineer"].df
+        track = str(df.loc[df["race_id"].idxmax(), "track"])
+    return synthetic_replay(
+        entries, track, req.total_laps, req.weather, req.temperature,
+        seed=req.seed if req.seed is not None else settings.SIMULATION_SEED,
+    )
+
+
+@router.post("/sessions", response_model=LiveSessionInfo, status_code=201)
+async def start_session(req: LiveSessionRequest, pipeline: dict = Depends(get_pipeline)):
+    """Start replaying a race lap by lap; follow it via ``events_url`` (SSE) or ``websocket_url``."""
+    _make_room()
+    replay = await run_in_threadpool(_build_replay, req, pipeline)
+    race = await run_in_threadpool(
+        LiveRace, pipeline, replay.track, replay.entries, replay.total_laps,
+        replay.weather, replay.temperature, settings.LIVE_SIMULATIONS, req.seed,
+    )
+    session = LiveSession(replay, race, req.lap_interval)
+    _sessions[session.id] = session
+    session.task = asyncio.create_task(session.run())
+    logger.info("Live session %s: %s %s, %d laps", session.id, replay.source, replay.track, replay.total_laps)
+    return session.info()
+
+
+@router.get("/sessions", response_model=list[LiveSessionInfo])
+def list_sessions():
+    return [s.info() for s in _sessions.values()]
+
+
+@router.get("/sessions/{session_id}", response_model=LiveSessionInfo)
+def get_session(session_id: str):
+    return _get_session(session_id).info()
+
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def stop_session(session_id: str):
+    """Stop a replay and disconnect its clients."""
+    session = _sessions.pop(session_id, None)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown live session '{session_id}'")
+    if session.task is not None and not session.task.done():
+        session.task.cancel()
+        with suppress(asyncio.CancelledError):
+            await session.task
+
+
+@router.get("/{session_id}/events")
+async def stream_events(session_id: str, request: Request):
+    """Server-Sent Events: one ``lap`` event per lap update, then ``end``."""
+    session = _get_session(session_id)
+    queue = session.subscribe()
+
+    async def events():
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if payload is None:
+                    yield b"event: end\ndata: {}\n\n"
+                    return
+                yield b"event: lap\ndata: " + payload + b"\n\n"
+        finally:
+            session.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{session_id}/ws")
+async def stream_websocket(websocket: WebSocket, session_id: str):
+    """WebSocket: one JSON text message per lap update; closed with code 1000 at the flag."""
+    session = _sessions.get(session_id)
+    if session is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    queue = session.subscribe()
+    try:
+        while True:
+            payload = await queue.get()
+            if payload is None:
+                await websocket.close(code=1000)
+                return
+            await websocket.send_text(payload.decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.unsubscribe(queue)
+
+
+async def shutdown() -> None:
+    """Cancel every running replay (called from the app lifespan)."""
+    for session in list(_sessions.values()):
+        if session.task is not None and not session.task.done():
+            session.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await session.task
+    _sessions.clear()
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from src.utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["Info"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of this worker's in-process metrics."""
+    return Response(content=REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
@@ -1,10 +1,13 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 
 from src.api.dependencies import get_pipeline
-from src.api.schemas import FeatureImportance, ModelPerformance
+from src.api.readiness import swap_in
+from src.api.schemas import FeatureImportance, ModelPerformance, ModelVersion
 from src.models.pipeline import run_training_pipeline
+from src.models.registry import get_registry
 
 router = APIRouter(prefix="/models", tags=["Models"])
 
@@ -23,24 +26,81 @@ def feature_importance(pipeline: dict = Depends(get_pipeline)):
     return [FeatureImportance(**f) for f in pipeline["feature_importances"]]
 
 
+@router.get("/distillation")
+def distillation_report(pipeline: dict = Depends(get_pipeline)):
+    """Teacher vs student accuracy, latency and size from the last training run."""
+    report = pipeline.get("distillation")
+    if report is None:
+        raise HTTPException(status_code=404, detail="Distillation did not run (set DISTILL_ENABLED=true)")
+    return report
+
+
 @router.post("/train")
-def retrain(
+async def retrain(
     request: Request,
     refresh_data: bool = Query(
         False,
         description="Re-download race data from FastF1 before retraining (slow on first run).",
     ),
 ):
-    """Retrain all models and hot-swap the active pipeline.
+    """Retrain all models, publish a new registry version and hot-swap it in once warm.
     Pass ?refresh_data=true to also re-fetch historical data from FastF1.
     """
-    new_pipeline = run_training_pipeline(force_retrain=True, force_data_refresh=refresh_data)
-    request.app.state.pipeline = new_pipeline
+    new_pipeline = await run_in_threadpool(
+        run_training_pipeline, force_retrain=True, force_data_refresh=refresh_data
+    )
+    report = await swap_in(request.app, new_pipeline)
     model = new_pipeline["model"]
     return {
         "message": "Models retrained successfully",
+        "version": new_pipeline.get("version"),
         "best_model": model.best_model_name,
         "results": {k: round(v, 4) for k, v in model.results.items()},
         "training_rows": new_pipeline.get("training_rows", 0),
         "data_source": new_pipeline.get("data_source", "unknown"),
+        "ready": report["ready"],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+async def _serve(request: Request, version: str) -> dict:
+    """Warm ``version`` up and swap it into this worker; others follow via the watcher."""
+    pipeline = await run_in_threadpool(get_registry().load, version)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    report = await swap_in(request.app, pipeline)
+    return {
+        "message": f"Now serving {version}",
+        "version": version,
+        "best_model": pipeline["model"].best_model_name,
+        "ready": report["ready"],
     }
+
+
+@router.get("/versions", response_model=List[ModelVersion])
+def list_versions():
+    """All published model versions, newest first."""
+    return get_registry().list_versions()
+
+
+@router.post("/versions/{version}/activate")
+async def activate_version(version: str, request: Request):
+    """Point every worker at an existing version."""
+    try:
+        await run_in_threadpool(get_registry().activate, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version '{version}'")
+    return await _serve(request, version)
+
+
+@router.post("/rollback")
+async def rollback(request: Request):
+    """Re-activate the previously served version."""
+    try:
+        version = await run_in_threadpool(get_registry().rollback)
+    except LookupError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return await _serve(request, version)
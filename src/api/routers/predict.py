@@ -1,19 +1,37 @@
 from datetime import datetime
+from math import prod
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends
+import anyio
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from src.api.dependencies import get_pipeline
+from src.api.dependencies import get_executor, get_pipeline
+from src.api.encoding import dumps, negotiated
+from src.api.executor import InferenceExecutor, offload
+from src.api.middleware import ProfiledRoute
 from src.api.schemas import (
-    BatchPredictItem,
     BatchPredictRequest,
     BatchPredictResponse,
+    IntRange,
     PredictRequest,
     PredictResponse,
+    SimulateRequest,
+    SimulateResponse,
+    SweepDriver,
+    SweepRequest,
+    SweepResponse,
 )
+from src.config import settings
 from src.data.data_loader import get_next_race
-from src.models.pipeline import run_inference
+from src.models.pipeline import REQUEST_COLS, run_batch_inference, run_inference
+from src.models.simulation import simulate_race
 
-router = APIRouter(prefix="/predict", tags=["Prediction"])
+router = APIRouter(prefix="/predict", tags=["Prediction"], route_class=ProfiledRoute)
 
 # ---------------------------------------------------------------------------
 # 2025 full driver lineup — used when no qualifying data is available yet
@@ -60,53 +78,128 @@ def _resolve_default_race() -> dict:
     return dynamic if dynamic is not None else dict(_FALLBACK_RACE)
 
 
+def _simulated_rows(entries: list[dict], summary: dict, include_distribution: bool = False) -> list[dict]:
+    """Zip grid entries with simulate_race() output, ordered by predicted position."""
+    rows = []
+    for i, entry in enumerate(entries):
+        row = {
+            **entry,
+            "predicted_position": int(summary["predicted_position"][i]),
+            "expected_position":  round(float(summary["expected_position"][i]), 2),
+            "win_probability":    round(float(summary["win_probability"][i]), 4),
+            "podium_probability": round(float(summary["podium_probability"][i]), 4),
+            "points_probability": round(float(summary["points_probability"][i]), 4),
+            "expected_points":    round(float(summary["expected_points"][i]), 2),
+        }
+        if include_distribution:
+            row["position_distribution"] = [
+                round(float(p), 4) for p in summary["position_probabilities"][i]
+            ]
+        rows.append(row)
+    rows.sort(key=lambda x: x["predicted_position"])
+    return rows
+
+
 @router.get("/latest", tags=["Prediction"])
-def predict_latest(pipeline: dict = Depends(get_pipeline)):
-    """Predict race outcomes for the next upcoming Grand Prix (full 20-car grid)."""
-    race = _resolve_default_race()
-
-    predictions = []
-    for entry in _GRID_2025:
-        result = run_inference(
-            entry["driver"], entry["team"], race["track"],
-            entry["grid_position"], race["weather"], race["temperature"],
-            pipeline,
-        )
-        predictions.append({
-            "driver":             entry["driver"],
-            "driver_code":        entry["driver"],
-            "driver_name":        entry["name"],
-            "team":               entry["team"],
-            "grid_position":      entry["grid_position"],
-            "predicted_position": result["predicted_position"],
-            "win_probability":    result["win_probability"],
-            "podium_probability": result["podium_probability"],
-        })
+async def predict_latest(
+    request: Request,
+    simulations: int = Query(settings.SIMULATION_RUNS, ge=100, le=settings.SIMULATION_MAX_RUNS),
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    """Predict race outcomes for the next upcoming Grand Prix (full 20-car grid).
+
+    Positions and probabilities come from a Monte Carlo simulation of complete
+    races, so predicted positions are unique and win / podium probabilities
+    sum to 1 / 3 across the grid.
+    """
+    race = await run_in_threadpool(_resolve_default_race)
+
+    frame = pd.DataFrame([
+        {**entry, "track": race["track"], "weather": race["weather"], "temperature": race["temperature"]}
+        for entry in _GRID_2025
+    ])
+    summary = await offload(
+        executor, simulate_race, frame, pipeline=pipeline, n_sims=simulations, seed=settings.SIMULATION_SEED
+    )
 
-    predictions.sort(key=lambda x: x["predicted_position"])
-    for i, p in enumerate(predictions):
-        p["position"] = i + 1
+    entries = [
+        {
+            "driver":        entry["driver"],
+            "driver_code":   entry["driver"],
+            "driver_name":   entry["name"],
+            "team":          entry["team"],
+            "grid_position": entry["grid_position"],
+        }
+        for entry in _GRID_2025
+    ]
+    predictions = _simulated_rows(entries, summary)
+    for p in predictions:
+        p["position"] = p["predicted_position"]
 
-    return {
+    return negotiated(request, {
         "race":        race["race"],
         "circuit":     race["circuit"],
         "season":      race["season"],
         "round":       race["round"],
         "timestamp":   datetime.now().isoformat(),
         "predictions": predictions,
-        "model_used":  pipeline["model"].best_model_name,
+        "model_used":  summary["model_used"],
+        "simulations": simulations,
         "data_source": pipeline.get("data_source", "unknown"),
         "training_rows": pipeline.get("training_rows", 0),
-    }
+    })
+
+
+@router.post("/simulate", response_model=SimulateResponse)
+async def simulate(
+    req: SimulateRequest,
+    request: Request,
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    """Monte Carlo simulation of a full race for any track, conditions and grid."""
+    frame = pd.DataFrame([
+        {
+            "driver": e.driver, "team": e.team, "grid_position": e.grid_position,
+            "track": req.track, "weather": req.weather, "temperature": req.temperature,
+        }
+        for e in req.grid
+    ])
+    seed = req.seed if req.seed is not None else settings.SIMULATION_SEED
+    summary = await offload(executor, simulate_race, frame, pipeline=pipeline, n_sims=req.simulations, seed=seed)
+
+    entries = [{"driver": e.driver, "team": e.team, "grid_position": e.grid_position} for e in req.grid]
+    rows = _simulated_rows(entries, summary, include_distribution=req.include_distribution)
+    return negotiated(request, {
+        "track": req.track,
+        "weather": req.weather,
+        "temperature": req.temperature,
+        "predictions": rows,
+        "simulations": req.simulations,
+        "model_used": summary["model_used"],
+        "timestamp": datetime.now().isoformat(),
+    })
 
 
 @router.post("", response_model=PredictResponse)
-def predict(req: PredictRequest, pipeline: dict = Depends(get_pipeline)):
-    result = run_inference(
-        req.driver, req.team, req.track,
-        req.grid_position, req.weather, req.temperature,
-        pipeline,
-    )
+async def predict(
+    req: PredictRequest,
+    request: Request,
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    """Single driver prediction. Concurrent calls are coalesced into one model call."""
+    coalescer = getattr(request.app.state, "coalescer", None)
+    if coalescer is not None:
+        result = await coalescer.predict(req.model_dump(), pipeline)
+    else:
+        result = await offload(
+            executor, run_inference,
+            req.driver, req.team, req.track,
+            req.grid_position, req.weather, req.temperature,
+            pipeline=pipeline,
+        )
     return PredictResponse(
         driver=req.driver,
         team=req.team,
@@ -121,29 +214,257 @@ def predict(req: PredictRequest, pipeline: dict = Depends(get_pipeline)):
 
 
 @router.post("/batch", response_model=BatchPredictResponse)
-def batch_predict(req: BatchPredictRequest, pipeline: dict = Depends(get_pipeline)):
-    items = []
-    for driver_req in req.drivers:
-        result = run_inference(
-            driver_req.driver, driver_req.team, driver_req.track,
-            driver_req.grid_position, driver_req.weather, driver_req.temperature,
-            pipeline,
-        )
-        items.append(
-            BatchPredictItem(
-                driver=driver_req.driver,
-                grid_position=driver_req.grid_position,
-                predicted_position=result["predicted_position"],
-                win_probability=result["win_probability"],
-                podium_probability=result["podium_probability"],
-            )
+async def batch_predict(
+    req: BatchPredictRequest,
+    request: Request,
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    frame = pd.DataFrame([d.model_dump() for d in req.drivers], columns=REQUEST_COLS)
+    result = await offload(executor, run_batch_inference, frame, pipeline=pipeline)
+
+    items = [
+        {
+            "driver": driver_req.driver,
+            "grid_position": driver_req.grid_position,
+            "predicted_position": int(result["predicted_position"][i]),
+            "win_probability": float(result["win_probability"][i]),
+            "podium_probability": float(result["podium_probability"][i]),
+        }
+        for i, driver_req in enumerate(req.drivers)
+    ]
+
+    items.sort(key=lambda x: x["predicted_position"])
+
+    return negotiated(request, {
+        "predictions": items,
+        "total_drivers": len(items),
+        "best_model": pipeline["model"].best_model_name,
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+def _axis_values(spec: IntRange | list | None, default, lo: int, hi: int, name: str) -> list[int]:
+    """Expand a range / list sweep axis (or the base value) and bounds-check it."""
+    if spec is None:
+        values = [default]
+    elif isinstance(spec, IntRange):
+        values = list(range(spec.start, spec.stop + 1, spec.step))
+    else:
+        values = list(dict.fromkeys(spec))
+    if not values or min(values) < lo or max(values) > hi:
+        raise HTTPException(status_code=422, detail=f"{name} values must be non-empty and within [{lo}, {hi}]")
+    return values
+
+
+@router.post("/sweep", response_model=SweepResponse)
+async def sweep(
+    req: SweepRequest,
+    request: Request,
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    """What-if grid: expand drivers × grid_position × weather × temperature around
+    a base scenario and score every combination in one vectorized batch.
+
+    Results are columnar and row-major over ``order``/``shape``: scenario ``k``
+    maps to ``numpy.unravel_index(k, shape)`` into ``dimensions``.
+    """
+    base = req.base
+    drivers = req.drivers or [SweepDriver(driver=base.driver, team=base.team)]
+    dimensions = {
+        "driver": [d.driver for d in drivers],
+        "grid_position": _axis_values(req.grid_position, base.grid_position, 1, 20, "grid_position"),
+        "weather": list(dict.fromkeys(req.weather)) if req.weather else [base.weather],
+        "temperature": _axis_values(req.temperature, base.temperature, 10, 45, "temperature"),
+    }
+    shape = [len(v) for v in dimensions.values()]
+    n_scenarios = prod(shape)
+    if n_scenarios > settings.SWEEP_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{n_scenarios} scenarios exceeds the limit of {settings.SWEEP_MAX_SCENARIOS}",
         )
 
-    items.sort(key=lambda x: x.predicted_position)
+    # Row-major Cartesian product as index arrays — no per-scenario Python objects
+    idx = np.indices(shape).reshape(len(shape), -1)
+    teams = np.array([d.team for d in drivers], dtype=object)
+    frame = pd.DataFrame({
+        "driver": np.array(dimensions["driver"], dtype=object)[idx[0]],
+        "team": teams[idx[0]],
+        "track": base.track,
+        "grid_position": np.array(dimensions["grid_position"])[idx[1]],
+        "weather": np.array(dimensions["weather"], dtype=object)[idx[2]],
+        "temperature": np.array(dimensions["temperature"])[idx[3]],
+    })
+    result = await offload(executor, run_batch_inference, frame, pipeline=pipeline)
 
-    return BatchPredictResponse(
-        predictions=items,
-        total_drivers=len(items),
-        best_model=pipeline["model"].best_model_name,
-        timestamp=datetime.now().isoformat(),
+    # NumPy arrays are encoded directly, without a per-value Python list
+    columns = {
+        "predicted_position": result["predicted_position"],
+        "win_probability": result["win_probability"],
+        "podium_probability": result["podium_probability"],
+    }
+    if req.include_inputs:
+        for name in dimensions:
+            columns[name] = frame[name].tolist()
+
+    return negotiated(request, {
+        "track": base.track,
+        "order": list(dimensions),
+        "shape": shape,
+        "dimensions": {**dimensions, "team": teams.tolist()},
+        "columns": columns,
+        "n_scenarios": n_scenarios,
+        "model_used": result["model_used"],
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+# ---------------------------------------------------------------------------
+# Streaming NDJSON
+# ---------------------------------------------------------------------------
+
+def _render_ndjson(rows: list[tuple[int, PredictRequest]], result: dict) -> bytes:
+    """Render one scored micro-batch as NDJSON result lines."""
+    lines = [
+        dumps({
+            "line": line_no,
+            "driver": req.driver,
+            "grid_position": req.grid_position,
+            "predicted_position": int(result["predicted_position"][i]),
+            "win_probability": float(result["win_probability"][i]),
+            "podium_probability": float(result["podium_probability"][i]),
+        })
+        for i, (line_no, req) in enumerate(rows)
+    ]
+    return b"\n".join(lines) + b"\n"
+
+
+async def _terminated(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield the non-empty body chunks followed by exactly one b"" end marker."""
+    async for chunk in body:
+        if chunk:
+            yield chunk
+    yield b""
+
+
+def _error_line(line_no: int, errors: list) -> bytes:
+    return dumps({"line": line_no, "error": errors}) + b"\n"
+
+
+async def _body_lines(body: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[list[Optional[bytes]]]:
+    """
+    The lines completed by each body chunk; a line over ``max_line_bytes`` comes out as None.
+
+    The unfinished last line is appended to in place, and once it exceeds the
+    cap the rest of it is skipped up to its newline, so neither a long line
+    nor a body without newlines is ever buffered whole.
+    """
+    partial = bytearray()
+    too_long = False
+    async for chunk in _terminated(body):
+        view = memoryview(chunk)
+        lines: list[Optional[bytes]] = []
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = view[start:] if end < 0 else view[start:end]
+            if not too_long:
+                if len(partial) + len(piece) > max_line_bytes:
+                    too_long = True
+                    partial.clear()
+                else:
+                    partial += piece
+            if end < 0:
+                break
+            lines.append(None if too_long else bytes(partial))
+            partial.clear()
+            too_long = False
+            start = end + 1
+        if not chunk and (partial or too_long):  # end of body: the unterminated last line is complete
+            lines.append(None if too_long else bytes(partial))
+        yield lines
+
+
+async def _stream_predictions(
+    body: AsyncIterator[bytes],
+    pipeline: dict,
+    chunk_size: int,
+    executor: Optional[InferenceExecutor] = None,
+    max_line_bytes: int = 0,
+) -> AsyncIterator[bytes]:
+    """
+    Parse NDJSON request lines as they arrive and yield results per micro-batch.
+
+    Only the unfinished current line (at most ``max_line_bytes``) and one
+    micro-batch are held in memory. Whatever is pending when a body chunk is
+    exhausted is flushed, so results flow back while the client is still
+    uploading.
+    """
+    max_line_bytes = max_line_bytes or settings.STREAM_MAX_LINE_BYTES
+    too_long = [{"type": "line_too_long", "loc": [], "msg": f"Line longer than {max_line_bytes} bytes"}]
+    pending: list[tuple[int, PredictRequest]] = []
+    line_no = n_ok = n_err = 0
+
+    async def flush() -> bytes:
+        nonlocal pending, n_ok
+        batch, pending = pending, []
+        n_ok += len(batch)
+        frame = pd.DataFrame([req.model_dump() for _, req in batch], columns=REQUEST_COLS)
+        result = await offload(executor, run_batch_inference, frame, pipeline=pipeline)
+        return _render_ndjson(batch, result)
+
+    async for lines in _body_lines(body, max_line_bytes):
+        for raw in lines:
+            line_no += 1
+            if raw is None:
+                n_err += 1
+                yield _error_line(line_no, too_long)
+                continue
+            if not raw.strip():
+                continue
+            try:
+                pending.append((line_no, PredictRequest.model_validate_json(raw)))
+            except ValidationError as exc:
+                n_err += 1
+                yield _error_line(line_no, exc.errors(include_url=False, include_context=False, include_input=False))
+                continue
+            if len(pending) >= chunk_size:
+                yield await flush()
+        if pending:
+            yield await flush()
+
+    summary = {"items": n_ok, "errors": n_err, "model_used": pipeline["model"].best_model_name}
+    yield dumps({"summary": summary}) + b"\n"
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves ``receive`` to the body generator.
+
+    The stock response listens for disconnects on ``receive`` while streaming,
+    which would swallow request-body messages the generator is still reading.
+    Disconnects surface through request.stream() instead.
+    """
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await anyio.sleep_forever()
+
+
+@router.post("/stream")
+async def predict_stream(
+    request: Request,
+    chunk_size: int = Query(settings.STREAM_CHUNK_SIZE, ge=1, le=10_000),
+    pipeline: dict = Depends(get_pipeline),
+    executor: Optional[InferenceExecutor] = Depends(get_executor),
+):
+    """Stream NDJSON predictions for an NDJSON body of PredictRequest objects.
+
+    One result line per input line (tagged with its 1-based ``line`` number,
+    emitted as micro-batches complete), ``{"line", "error"}`` for invalid lines,
+    and a final ``{"summary": ...}`` line. Memory stays flat in the input size.
+    """
+    return _DuplexStreamingResponse(
+        _stream_predictions(request.stream(), pipeline, chunk_size, executor),
+        media_type="application/x-ndjson",
     )
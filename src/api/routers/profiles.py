@@ -0,0 +1,34 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from src.config import settings
+from src.utils.profiling import list_profiles, load_profile
+
+router = APIRouter(prefix="/debug/profiles", tags=["Debug"])
+
+
+def require_profiling_token(
+    x_profile: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None),
+) -> None:
+    """Stored profiles are gated by the same token that requests them."""
+    presented = x_profile or profile or ""
+    if not hmac.compare_digest(presented.encode(), settings.PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("", dependencies=[Depends(require_profiling_token)])
+def get_profiles():
+    """Stored request profiles, newest first."""
+    return {"profiles": list_profiles(settings.PROFILING_DIR)}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def get_profile(profile_id: str):
+    """Full summary of one profiled request: section tree, spans and hotspots."""
+    summary = load_profile(profile_id, settings.PROFILING_DIR)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return summary
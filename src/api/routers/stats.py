@@ -0,0 +1,73 @@
+"""
+Historical aggregates served from the pipeline's precomputed stats cube.
+
+Every answer is read from the cube built at training time (see
+src/models/stats_cube.py); the historical dataset is never touched.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from src.api.dependencies import get_pipeline
+from src.api.encoding import negotiated
+from src.api.schemas import StatsInfoResponse, StatsResponse
+from src.models.stats_cube import GRAINS, StatsCube, stats_cube
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+def _cube(pipeline: dict) -> StatsCube:
+    cube = stats_cube(pipeline)
+    if cube is None:
+        raise HTTPException(
+            status_code=503, detail="The served model version has no stats cube — retrain to build one"
+        )
+    return cube
+
+
+@router.get("", response_model=StatsInfoResponse)
+async def stats_info(request: Request, pipeline: dict = Depends(get_pipeline)):
+    """Available grains, their dimensions and row counts, and the measures."""
+    return negotiated(request, {**_cube(pipeline).info(), "model_version": pipeline.get("version")})
+
+
+@router.get("/{grain}", response_model=StatsResponse)
+async def stats_query(
+    grain: str,
+    request: Request,
+    driver: Optional[str] = None,
+    team: Optional[str] = None,
+    track: Optional[str] = None,
+    season: Optional[int] = None,
+    sort: Optional[str] = Query(None, description="Measure to sort by; prefix with '-' for descending"),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    pipeline: dict = Depends(get_pipeline),
+):
+    """
+    Slice one grain of the cube, e.g. ``/stats/driver_track?track=Monaco&sort=-win_rate``.
+
+    Filters are exact matches on the grain's dimensions (driver code, team,
+    track, season).
+    """
+    if grain not in GRAINS:
+        raise HTTPException(status_code=404, detail=f"Unknown grain '{grain}' (grains: {', '.join(GRAINS)})")
+    cube = _cube(pipeline)
+    filters = {k: v for k, v in {"driver": driver, "team": team, "track": track, "season": season}.items() if v is not None}
+    try:
+        total, records = cube.query(grain, filters, sort=sort, limit=limit, offset=offset)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Grain '{grain}' is not in this model version's cube")
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return negotiated(request, {
+        "grain": grain,
+        "dimensions": GRAINS[grain],
+        "filters": filters,
+        "sort": sort,
+        "total": total,
+        "offset": offset,
+        "records": records,
+        "model_version": pipeline.get("version"),
+    })
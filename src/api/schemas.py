@@ -2,9 +2,11 @@
 Pydantic request/response schemas for the F1 Prediction API.
 """
 
-from typing import List
+from typing import Dict, List, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
+from src.config import settings
+
 
 # ---------------------------------------------------------------------------
 # Prediction
@@ -50,6 +52,163 @@ class BatchPredictResponse(BaseModel):
     timestamp: str
 
 
+# ---------------------------------------------------------------------------
+# Scenario sweep
+# ---------------------------------------------------------------------------
+
+class IntRange(BaseModel):
+    """Inclusive integer range, e.g. {"start": 1, "stop": 20} for P1..P20."""
+    start: int
+    stop: int
+    step: int = Field(1, ge=1)
+
+
+class SweepDriver(BaseModel):
+    driver: str = Field(..., examples=["LEC"])
+    team: str = Field(..., examples=["Ferrari"])
+
+
+class SweepRequest(BaseModel):
+    base: PredictRequest
+    drivers: Optional[List[SweepDriver]] = Field(None, description="Defaults to the base driver/team")
+    grid_position: Optional[Union[IntRange, List[int]]] = Field(None, examples=[{"start": 1, "stop": 20}])
+    weather: Optional[List[str]] = Field(None, examples=[["Dry", "Wet"]])
+    temperature: Optional[Union[IntRange, List[int]]] = Field(None, examples=[{"start": 15, "stop": 40, "step": 5}])
+    include_inputs: bool = Field(False, description="Also return one input column per dimension")
+
+
+class SweepResponse(BaseModel):
+    track: str
+    order: List[str]
+    shape: List[int]
+    dimensions: Dict[str, List[Union[str, int]]]
+    columns: Dict[str, List[Union[str, int, float]]]
+    n_scenarios: int
+    model_used: str
+    timestamp: str
+
+
+# ---------------------------------------------------------------------------
+# Race simulation
+# ---------------------------------------------------------------------------
+
+class RaceEntry(BaseModel):
+    driver: str = Field(..., examples=["VER"])
+    team: str = Field(..., examples=["Red Bull"])
+    grid_position: int = Field(..., ge=1, le=20, examples=[1])
+
+
+class SimulateRequest(BaseModel):
+    track: str = Field(..., examples=["Monza"])
+    weather: str = Field("Dry", examples=["Dry"])
+    temperature: int = Field(25, ge=10, le=45, examples=[28])
+    grid: List[RaceEntry] = Field(..., min_length=2)
+    simulations: int = Field(settings.SIMULATION_RUNS, ge=100, le=settings.SIMULATION_MAX_RUNS)
+    seed: Optional[int] = Field(None, description="Defaults to SIMULATION_SEED for reproducible results")
+    include_distribution: bool = Field(False, description="Add each driver's full finishing-position distribution")
+
+
+class SimulatedDriver(BaseModel):
+    driver: str
+    team: str
+    grid_position: int
+    predicted_position: int
+    expected_position: float
+    win_probability: float
+    podium_probability: float
+    points_probability: float
+    expected_points: float
+    position_distribution: Optional[List[float]] = None
+
+
+class SimulateResponse(BaseModel):
+    track: str
+    weather: str
+    temperature: int
+    predictions: List[SimulatedDriver]
+    simulations: int
+    model_used: str
+    timestamp: str
+
+
+# ---------------------------------------------------------------------------
+# Live race
+# ---------------------------------------------------------------------------
+
+class LiveSessionRequest(BaseModel):
+    source: Literal["synthetic", "fastf1"] = Field("synthetic", description="Lap feed to replay")
+    year: Optional[int] = Field(None, description="Season of the FastF1 race to replay", examples=[2024])
+    round: Optional[int] = Field(None, ge=1, description="Round of the FastF1 race to replay", examples=[16])
+    track: Optional[str] = Field(None, description="Synthetic races: defaults to the latest race in the data")
+    grid: Optional[List[RaceEntry]] = Field(None, min_length=2, description="Synthetic races: defaults to the latest lineup")
+    total_laps: int = Field(50, ge=1, le=100, description="Synthetic races only")
+    weather: str = Field("Dry", examples=["Dry"])
+    temperature: int = Field(25, ge=10, le=45)
+    lap_interval: float = Field(settings.LIVE_LAP_INTERVAL, ge=0, le=120, description="Seconds between laps")
+    seed: Optional[int] = None
+
+
+class LiveSessionInfo(BaseModel):
+    id: str
+    source: str
+    track: str
+    lap: int
+    total_laps: int
+    status: str
+    subscribers: int
+    model_version: Optional[str] = None
+    created_at: str
+    events_url: str
+    websocket_url: str
+
+
+# ---------------------------------------------------------------------------
+# Stats
+# ---------------------------------------------------------------------------
+
+class StatsRecord(BaseModel):
+    driver: Optional[str] = None
+    team: Optional[str] = None
+    track: Optional[str] = None
+    season: Optional[int] = None
+    races: int
+    wins: int
+    podiums: int
+    dnfs: int
+    best_finish: int
+    avg_finish: float
+    win_rate: float
+    podium_rate: float
+    dnf_rate: float
+    points: float
+    avg_points: float
+    avg_grid: float
+    avg_gain: float
+
+
+class StatsResponse(BaseModel):
+    grain: str
+    dimensions: List[str]
+    filters: Dict[str, Union[str, int]]
+    sort: Optional[str] = None
+    total: int
+    offset: int
+    records: List[StatsRecord]
+    model_version: Optional[str] = None
+
+
+class StatsGrain(BaseModel):
+    dimensions: List[str]
+    rows: int
+
+
+class StatsInfoResponse(BaseModel):
+    rows: int
+    grains: Dict[str, StatsGrain]
+    measures: List[str]
+    model_version: Optional[str] = None
+
+
 # ---------------------------------------------------------------------------
 # Models
 # ---------------------------------------------------------------------------
@@ -64,6 +223,19 @@ class FeatureImportance(BaseModel):
     importance: float
 
 
+class ModelVersion(BaseModel):
+    version: str
+    created_at: str
+    best_model: str
+    results: Dict[str, float]
+    training_rows: int
+    data_source: str
+    current: bool
+    schema_version: Optional[int] = None
+    artifact_bytes: Optional[Dict[str, int]] = None
+    serving_bytes: Optional[Dict[str, int]] = None
+
+
 # ---------------------------------------------------------------------------
 # Info
 # ---------------------------------------------------------------------------
@@ -71,5 +243,21 @@ class FeatureImportance(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     models_trained: bool
+    ready: bool = False
+    model_version: Optional[str] = None
     version: str
     timestamp: str
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    model_version: Optional[str] = None
+    checked_at: Optional[str] = None
+    warmup_seconds: Optional[float] = None
+    single_samples: int = 0
+    single_p99_ms: Optional[float] = None
+    batch_rows: int = 0
+    batch_p99_ms: Optional[float] = None
+    slo_single_ms: Optional[float] = None
+    slo_batch_ms: Optional[float] = None
+    failures: List[str] = []
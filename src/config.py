@@ -20,6 +20,8 @@ class Settings:
 
     # FastF1 / historical data
     FASTF1_CACHE_DIR: str = os.getenv("FASTF1_CACHE_DIR", "dataset/fastf1_cache")
+    # Disk budget for the FastF1 cache in MB (0 = unbounded); see src/data/fastf1_cache.py
+    FASTF1_CACHE_MAX_MB: float = float(os.getenv("FASTF1_CACHE_MAX_MB", "2048"))
     HISTORICAL_DATA_PATH: str = os.getenv("HISTORICAL_DATA_PATH", "dataset/historical_data.parquet")
     _data_years_raw: str = os.getenv("DATA_YEARS", "2021,2022,2023,2024,2025,2026")
     DATA_YEARS: list = [int(y.strip()) for y in _data_years_raw.split(",")]
@@ -32,8 +34,118 @@ class Settings:
     # Saved pipeline artifact (models + encoders + lookup tables)
     PIPELINE_ARTIFACT_PATH: str = os.getenv("PIPELINE_ARTIFACT_PATH", "artifacts/pipeline.pkl")
 
+    # Versioned model registry (empty dir → <ARTIFACTS_DIR>/registry)
+    MODEL_REGISTRY_DIR: str = os.getenv("MODEL_REGISTRY_DIR", "")
+    # Versions kept on disk (0 = keep all); the served version is never pruned
+    MODEL_REGISTRY_KEEP: int = int(os.getenv("MODEL_REGISTRY_KEEP", "10"))
+    # Snapshots kept in memory per worker so switching back is instant
+    MODEL_REGISTRY_KEEP_LOADED: int = int(os.getenv("MODEL_REGISTRY_KEEP_LOADED", "2"))
+    # How often each worker checks the CURRENT pointer (0 disables the watcher)
+    MODEL_REGISTRY_POLL_SECONDS: float = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "2"))
+    # Also keep each version's training state (full model + feature engineer) as training.pkl
+    MODEL_REGISTRY_TRAINING_ARTIFACT: bool = os.getenv("MODEL_REGISTRY_TRAINING_ARTIFACT", "true").lower() == "true"
+
+    # Content-addressed training stage outputs (empty dir → <ARTIFACTS_DIR>/stages)
+    STAGE_CACHE_DIR: str = os.getenv("STAGE_CACHE_DIR", "")
+    # Entries kept per stage (0 = keep all)
+    STAGE_CACHE_KEEP: int = int(os.getenv("STAGE_CACHE_KEEP", "3"))
+
+    # Memory profiling of ingestion + training (tracemalloc and RSS per stage).
+    # Budgets are peak RSS in MB (0 = none); a run over budget fails with the report.
+    MEMORY_PROFILE: bool = os.getenv("MEMORY_PROFILE", "false").lower() == "true"
+    MEMORY_BUDGET_MB: float = float(os.getenv("MEMORY_BUDGET_MB", "0"))
+    MEMORY_STAGE_BUDGETS: str = os.getenv("MEMORY_STAGE_BUDGETS", "")  # e.g. "features=800,train=1500"
+    MEMORY_TOP_ALLOCATORS: int = int(os.getenv("MEMORY_TOP_ALLOCATORS", "10"))
+    # Empty → <ARTIFACTS_DIR>/memory_report.json
+    MEMORY_REPORT_PATH: str = os.getenv("MEMORY_REPORT_PATH", "")
+
+    # Out-of-core training: a Parquet dataset directory partitioned by year=YYYY
+    # (src/models/out_of_core.py). Empty → train in memory from HISTORICAL_DATA_PATH.
+    OUT_OF_CORE_DIR: str = os.getenv("OUT_OF_CORE_DIR", "")
+    # Where feature chunks and XGBoost's external-memory pages are spooled (empty → system temp)
+    OUT_OF_CORE_SPOOL_DIR: str = os.getenv("OUT_OF_CORE_SPOOL_DIR", "")
+    OUT_OF_CORE_CHUNK_ROWS: int = int(os.getenv("OUT_OF_CORE_CHUNK_ROWS", "100000"))
+    OUT_OF_CORE_MAX_BIN: int = int(os.getenv("OUT_OF_CORE_MAX_BIN", "256"))
+
+    # Readiness gate (GET /health/ready): warm-up pass + p99 latency SLO on every new pipeline
+    READINESS_WARMUP_SAMPLES: int = int(os.getenv("READINESS_WARMUP_SAMPLES", "50"))
+    READINESS_WARMUP_BATCH: int = int(os.getenv("READINESS_WARMUP_BATCH", "256"))
+    # p99 budgets in ms (0 = no check); batch is per READINESS_WARMUP_BATCH-row call
+    READINESS_SLO_SINGLE_MS: float = float(os.getenv("READINESS_SLO_SINGLE_MS", "50"))
+    READINESS_SLO_BATCH_MS: float = float(os.getenv("READINESS_SLO_BATCH_MS", "500"))
+    # How often an unready worker re-runs the check (0 = never)
+    READINESS_RETRY_SECONDS: float = float(os.getenv("READINESS_RETRY_SECONDS", "10"))
+
+    # In-process Prometheus metrics served at GET /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # On-demand request profiling: requests presenting this token (X-Profile header or
+    # ?profile=) are profiled; empty disables profiling entirely
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", os.path.join(ARTIFACTS_DIR, "profiles"))
+    PROFILING_KEEP: int = int(os.getenv("PROFILING_KEEP", "100"))
+    PROFILING_TOP_FUNCTIONS: int = int(os.getenv("PROFILING_TOP_FUNCTIONS", "25"))
+
+    # Monte Carlo race simulation (/predict/latest, /predict/simulate)
+    SIMULATION_RUNS: int = int(os.getenv("SIMULATION_RUNS", "10000"))
+    SIMULATION_MAX_RUNS: int = int(os.getenv("SIMULATION_MAX_RUNS", "100000"))
+    SIMULATION_SEED: int = int(os.getenv("SIMULATION_SEED", "42"))
+
+    # Upper bound on scenarios expanded by POST /predict/sweep
+    SWEEP_MAX_SCENARIOS: int = int(os.getenv("SWEEP_MAX_SCENARIOS", "50000"))
+
+    # Rows scored per micro-batch by POST /predict/stream
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", "256"))
+    # Longest accepted NDJSON line; longer lines get an error entry and are skipped
+    STREAM_MAX_LINE_BYTES: int = int(os.getenv("STREAM_MAX_LINE_BYTES", "16384"))
+
+    # Worker processes for CPU-bound scoring (0 = in-process threadpool)
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))
+
+    # Coalesce concurrent POST /predict calls into one model call: a batch is
+    # dispatched at once when idle, else after the window or when full
+    PREDICT_COALESCE_ENABLED: bool = os.getenv("PREDICT_COALESCE_ENABLED", "true").lower() == "true"
+    PREDICT_COALESCE_MAX_BATCH: int = int(os.getenv("PREDICT_COALESCE_MAX_BATCH", "64"))
+    PREDICT_COALESCE_MAX_DELAY_MS: float = float(os.getenv("PREDICT_COALESCE_MAX_DELAY_MS", "2"))
+
+    # POST /predict/bulk (Arrow / Parquet): rows scored per chunk and body size cap
+    BULK_CHUNK_ROWS: int = int(os.getenv("BULK_CHUNK_ROWS", "50000"))
+    BULK_MAX_BYTES: int = int(os.getenv("BULK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    # Live in-race predictions (/live): seconds between replayed laps, Monte Carlo
+    # races per lap update, buffered updates per client and concurrent sessions
+    LIVE_LAP_INTERVAL: float = float(os.getenv("LIVE_LAP_INTERVAL", "1.0"))
+    LIVE_SIMULATIONS: int = int(os.getenv("LIVE_SIMULATIONS", "2000"))
+    LIVE_QUEUE_SIZE: int = int(os.getenv("LIVE_QUEUE_SIZE", "8"))
+    LIVE_MAX_SESSIONS: int = int(os.getenv("LIVE_MAX_SESSIONS", "8"))
+
+    # Response compression (brotli when installed, else gzip) above a size threshold
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "*").split(",")
 
+    # Model families fitted by train_all_models (keys of MODEL_FACTORIES); the best one is served.
+    # "Gradient Boosting" is sklearn's exact-split engine, far slower than the hist one;
+    # drop it from the list to skip it.
+    _train_models_raw: str = os.getenv(
+        "TRAIN_MODELS", "Random Forest,XGBoost,Gradient Boosting,Hist Gradient Boosting"
+    )
+    TRAIN_MODELS: list = [m.strip() for m in _train_models_raw.split(",") if m.strip()]
+
+    # dtype of the feature matrix end to end (training, scaler output, lookup tables,
+    # inference inputs): "float32" halves its memory but can move Random Forest split
+    # thresholds, so it is opt-in
+    FEATURE_DTYPE: str = os.getenv("FEATURE_DTYPE", "float64")
+
+    # Feature engineering: 1 = pandas groupby path; otherwise group features are computed
+    # on hash partitions of the history by this many processes (0 = all cores)
+    FEATURE_WORKERS: int = int(os.getenv("FEATURE_WORKERS", "1"))
+    # Below this many rows the partitioned kernel runs in-process (pool start-up outweighs it)
+    FEATURE_PARALLEL_MIN_ROWS: int = int(os.getenv("FEATURE_PARALLEL_MIN_ROWS", "2000000"))
+
     # Model hyper-parameters
     RF_N_ESTIMATORS: int = int(os.getenv("RF_N_ESTIMATORS", "100"))
     XGB_N_ESTIMATORS: int = int(os.getenv("XGB_N_ESTIMATORS", "100"))
@@ -41,5 +153,14 @@ class Settings:
     TEST_SIZE: float = float(os.getenv("TEST_SIZE", "0.2"))
     RANDOM_STATE: int = int(os.getenv("RANDOM_STATE", "42"))
 
+    # Distillation: fit a small student to the best model's probabilities
+    DISTILL_ENABLED: bool = os.getenv("DISTILL_ENABLED", "false").lower() == "true"
+    # Serve the fastest student whose test accuracy is at most this far below the teacher's
+    DISTILL_SERVE: bool = os.getenv("DISTILL_SERVE", "true").lower() == "true"
+    DISTILL_MAX_ACCURACY_LOSS: float = float(os.getenv("DISTILL_MAX_ACCURACY_LOSS", "0.01"))
+    # Teacher probabilities below this are dropped from the soft-label set
+    DISTILL_MIN_PROB: float = float(os.getenv("DISTILL_MIN_PROB", "0.001"))
+    DISTILL_MAX_ROWS: int = int(os.getenv("DISTILL_MAX_ROWS", "50000"))
+
 
 settings = Settings()
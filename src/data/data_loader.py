@@ -14,6 +14,9 @@ import os
 import pandas as pd
 import numpy as np
 
+from src.data.fastf1_cache import cache_manager_from_settings
+from src.utils.memory import memory_stage
+
 try:
     import fastf1
     FASTF1_AVAILABLE = True
@@ -150,7 +153,8 @@ class F1DataLoader:
         Falls back to synthetic data if FastF1 is unavailable or fails.
         """
         if not force_refresh and os.path.exists(self.data_path):
-            df = pd.read_parquet(self.data_path)
+            with memory_stage("read_parquet"):
+                df = pd.read_parquet(self.data_path)
             print(f"[OK] Loaded {len(df)} race records from cache ({self.data_path})")
             self.results_df = df
             return df
@@ -160,7 +164,8 @@ class F1DataLoader:
             return self.load_sample_data()
 
         try:
-            return self._fetch_from_fastf1(years or [2021, 2022, 2023, 2024])
+            with memory_stage("fastf1"):
+                return self._fetch_from_fastf1(years or [2021, 2022, 2023, 2024])
         except Exception as exc:
             print(f"[WARN] FastF1 fetch failed ({exc}) -- falling back to synthetic data")
             return self.load_sample_data()
@@ -174,6 +179,7 @@ class F1DataLoader:
         os.makedirs(self.cache_dir, exist_ok=True)
         os.makedirs(os.path.dirname(os.path.abspath(self.data_path)), exist_ok=True)
         fastf1.Cache.enable_cache(self.cache_dir)
+        cache = cache_manager_from_settings(self.cache_dir)
 
         records: list[dict] = []
 
@@ -196,6 +202,7 @@ class F1DataLoader:
                     # laps=True is required: Position/GridPosition/Status are NaN in FastF1
                     # v3.x (Ergast deprecated). We derive all result fields from lap timing.
                     session.load(laps=True, telemetry=False, weather=True, messages=False)
+                    cache.record_use(year, event_name)
 
                     # Weather summary
                     wd = session.weather_data
@@ -232,6 +239,9 @@ class F1DataLoader:
                     print(f"  [WARN] {year} R{round_num:02d} ({_safe_track}): {exc}")
                     continue
 
+            # A full refresh downloads every season; keep the cache bounded as it goes
+            cache.enforce()
+
         if not records:
             print("[WARN] No data fetched from FastF1 -- using synthetic data")
             return self.load_sample_data()
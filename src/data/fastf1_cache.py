@@ -0,0 +1,293 @@
+"""
+Size-bounded FastF1 cache.
+
+FastF1 keeps one directory per session under its cache root:
+
+    <root>/<year>/<date>_<Event_Name>/<date>_<Session_Name>/*.ff1pkl
+
+plus ``fastf1_http_cache.sqlite``, its HTTP response cache. Nothing is ever
+removed, so the cache grows with every season loaded and fills the volume
+it shares with the artifacts. FastF1CacheManager keeps it within
+FASTF1_CACHE_MAX_MB:
+
+  - every session directory is an entry with its size and last use (the
+    newest of its files' access / modification times and the uses recorded
+    by our loaders in ``.f1_cache_index.json``),
+  - when over budget, entries are evicted oldest-use first, but sessions of
+    events already captured in our derived datasets (HISTORICAL_DATA_PATH,
+    OUT_OF_CORE_DIR) go before everything else — their data lives on in the
+    parquet and they are only needed again for a full refresh,
+  - ``compact`` purges expired HTTP responses, VACUUMs the sqlite file and
+    removes empty directories,
+  - ``usage`` reports the totals (GET /fastf1-cache, f1_fastf1_cache_* metrics).
+
+    python -m src.data.fastf1_cache usage
+    python -m src.data.fastf1_cache enforce --max-mb 1024
+    python -m src.data.fastf1_cache compact
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pyarrow.dataset as ds
+
+from src.config import settings
+from src.utils.metrics import FASTF1_CACHE_BYTES, FASTF1_CACHE_EVICTIONS
+
+INDEX_FILE = ".f1_cache_index.json"
+HTTP_CACHE_FILE = "fastf1_http_cache.sqlite"
+# Entries written this recently may belong to a session FastF1 is still loading
+_IN_USE_SECONDS = 60.0
+
+
+@dataclass
+class CacheEntry:
+    """One cached FastF1 session."""
+
+    key: str          # "2023/2023-03-05_Bahrain_Grand_Prix/2023-03-05_Race"
+    year: int
+    event: str        # "Bahrain Grand Prix"
+    session: str      # "Race"
+    size: int
+    last_used: float
+    captured: bool    # the event is already in a derived dataset
+
+
+def _split_dated(name: str) -> str:
+    """'2023-03-05_Bahrain_Grand_Prix' -> 'Bahrain Grand Prix'."""
+    return name.split("_", 1)[1].replace("_", " ") if "_" in name else name
+
+
+def _track(event: str) -> str:
+    """Track name as the data loader derives it from an event name."""
+    return event.replace(" Grand Prix", "").strip()
+
+
+def captured_events(paths: list[str]) -> set[tuple[int, str]]:
+    """``(year, track)`` pairs present in the given Parquet files / datasets."""
+    events: set[tuple[int, str]] = set()
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            table = ds.dataset(path, format="parquet", partitioning="hive").to_table(columns=["year", "track"])
+        except Exception as exc:
+            print(f"[WARN] Could not read derived dataset {path}: {exc}")
+            continue
+        pairs = table.group_by(["year", "track"]).aggregate([])
+        events.update(zip(pairs.column("year").to_pylist(), pairs.column("track").to_pylist()))
+    return events
+
+
+class FastF1CacheManager:
+    """Track, bound and compact one FastF1 cache directory."""
+
+    def __init__(self, root: str, max_bytes: int = 0, derived_paths: list[str] | None = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.derived_paths = derived_paths or []
+
+    # -- index ----------------------------------------------------------
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"last_used": {}, "last_enforce": None}
+
+    def _write_index(self, index: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self._index_path)
+
+    def record_use(self, year: int, event_name: str, session_name: str = "Race") -> None:
+        """Mark a session as just used (call after ``session.load``)."""
+        pattern = os.path.join(
+            self.root, str(year), f"*_{event_name.replace(' ', '_')}", f"*_{session_name.replace(' ', '_')}"
+        )
+        index = self._read_index()
+        now = time.time()
+        for path in glob.glob(pattern):
+            index["last_used"][os.path.relpath(path, self.root)] = now
+        self._write_index(index)
+
+    # -- scan -----------------------------------------------------------
+
+    def entries(self) -> list[CacheEntry]:
+        """Every cached session, with size, last use and captured flag."""
+        last_used = self._read_index()["last_used"]
+        captured = captured_events(self.derived_paths)
+        found = []
+        for path in glob.glob(os.path.join(self.root, "[0-9][0-9][0-9][0-9]", "*", "*")):
+            if not os.path.isdir(path):
+                continue
+            key = os.path.relpath(path, self.root)
+            year_dir, event_dir, session_dir = key.split(os.sep)
+            size, newest = 0, 0.0
+            for dirpath, _, files in os.walk(path):
+                for name in files:
+                    st = os.stat(os.path.join(dirpath, name))
+                    size += st.st_size
+                    newest = max(newest, st.st_atime, st.st_mtime)
+            event = _split_dated(event_dir)
+            found.append(CacheEntry(
+                key=key,
+                year=int(year_dir),
+                event=event,
+                session=_split_dated(session_dir),
+                size=size,
+                last_used=max(newest, last_used.get(key, 0.0)),
+                captured=(int(year_dir), _track(event)) in captured,
+            ))
+        return found
+
+    def _http_cache_bytes(self) -> int:
+        path = os.path.join(self.root, HTTP_CACHE_FILE)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def usage(self) -> dict:
+        """Cache totals for reporting."""
+        entries = self.entries()
+        session_bytes = sum(e.size for e in entries)
+        http_bytes = self._http_cache_bytes()
+        by_year: dict[int, dict] = {}
+        for e in entries:
+            year = by_year.setdefault(e.year, {"sessions": 0, "bytes": 0})
+            year["sessions"] += 1
+            year["bytes"] += e.size
+        total = session_bytes + http_bytes
+        FASTF1_CACHE_BYTES.labels("sessions").set(session_bytes)
+        FASTF1_CACHE_BYTES.labels("http").set(http_bytes)
+        return {
+            "root": self.root,
+            "max_bytes": self.max_bytes,
+            "total_bytes": total,
+            "session_bytes": session_bytes,
+            "http_cache_bytes": http_bytes,
+            "utilization": round(total / self.max_bytes, 4) if self.max_bytes else None,
+            "sessions": len(entries),
+            "captured_sessions": sum(e.captured for e in entries),
+            "by_year": {str(y): by_year[y] for y in sorted(by_year)},
+            "last_enforce": self._read_index().get("last_enforce"),
+        }
+
+    # -- eviction / compaction -----------------------------------------
+
+    def enforce(self, max_bytes: int | None = None) -> dict:
+        """Evict sessions until the cache fits ``max_bytes`` (default: the configured budget)."""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e.size for e in entries) + self._http_cache_bytes()
+        evicted: list[dict] = []
+        freed = 0
+        if budget and total > budget:
+            now = time.time()
+            # Captured events first, then least recently used
+            candidates = sorted(
+                (e for e in entries if now - e.last_used > _IN_USE_SECONDS),
+                key=lambda e: (not e.captured, e.last_used),
+            )
+            for entry in candidates:
+                if total - freed <= budget:
+                    break
+                shutil.rmtree(os.path.join(self.root, entry.key), ignore_errors=True)
+                freed += entry.size
+                evicted.append({k: v for k, v in asdict(entry).items() if k in ("key", "size", "captured")})
+                FASTF1_CACHE_EVICTIONS.labels("captured" if entry.captured else "lru").inc()
+            self._remove_empty_dirs()
+
+        report = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "max_bytes": budget,
+            "before_bytes": total,
+            "after_bytes": total - freed,
+            "freed_bytes": freed,
+            "evicted": evicted,
+        }
+        index = self._read_index()
+        index["last_used"] = {k: v for k, v in index["last_used"].items() if os.path.isdir(os.path.join(self.root, k))}
+        index["last_enforce"] = {k: v for k, v in report.items() if k != "evicted"} | {"evicted_sessions": len(evicted)}
+        self._write_index(index)
+        if evicted:
+            print(f"[OK] FastF1 cache: evicted {len(evicted)} sessions, freed {freed / 1e6:.1f} MB "
+                  f"({report['after_bytes'] / 1e6:.1f} / {budget / 1e6:.0f} MB)")
+        if budget and report["after_bytes"] > budget:
+            print(f"[WARN] FastF1 cache still over budget ({report['after_bytes'] / 1e6:.1f} MB) — "
+                  "remaining sessions are in use or the HTTP cache needs compacting")
+        self.usage()
+        return report
+
+    def compact(self) -> dict:
+        """Purge expired HTTP responses, VACUUM the sqlite cache and drop empty directories."""
+        path = os.path.join(self.root, HTTP_CACHE_FILE)
+        before = self._http_cache_bytes()
+        if before:
+            try:
+                import requests_cache
+                requests_cache.SQLiteCache(path).delete(expired=True)
+            except ImportError:
+                pass
+            except Exception as exc:
+                print(f"[WARN] Could not purge expired FastF1 HTTP responses: {exc}")
+            with sqlite3.connect(path) as conn:
+                conn.execute("VACUUM")
+        removed = self._remove_empty_dirs()
+        after = self._http_cache_bytes()
+        print(f"[OK] FastF1 cache compacted: HTTP cache {before / 1e6:.1f} -> {after / 1e6:.1f} MB, "
+              f"{removed} empty directories removed")
+        self.usage()
+        return {"http_cache_before_bytes": before, "http_cache_after_bytes": after, "empty_dirs_removed": removed}
+
+    def _remove_empty_dirs(self) -> int:
+        removed = 0
+        for dirpath, _, _ in sorted(os.walk(self.root), key=lambda w: -len(w[0])):
+            if dirpath != self.root and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+                removed += 1
+        return removed
+
+
+def cache_manager_from_settings(root: str | None = None) -> FastF1CacheManager:
+    return FastF1CacheManager(
+        root or settings.FASTF1_CACHE_DIR,
+        max_bytes=int(settings.FASTF1_CACHE_MAX_MB * 1024 * 1024),
+        derived_paths=[settings.HISTORICAL_DATA_PATH, settings.OUT_OF_CORE_DIR],
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["usage", "enforce", "compact"])
+    parser.add_argument("--max-mb", type=float, help="Budget for enforce (default FASTF1_CACHE_MAX_MB)")
+    args = parser.parse_args(argv)
+
+    manager = cache_manager_from_settings()
+    if args.command == "enforce":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        result = manager.enforce(max_bytes)
+    elif args.command == "compact":
+        result = manager.compact()
+    else:
+        result = manager.usage()
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
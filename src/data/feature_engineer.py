@@ -7,11 +7,16 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
 
+from src.data.parallel_features import OUTPUT_COLS, compute_group_features
+
 class F1FeatureEngineer:
     """Advanced feature engineering for F1 predictions"""
     
-    def __init__(self, df):
+    def __init__(self, df, n_jobs=1, parallel_min_rows=0):
         self.df = df.copy()
+        # n_jobs != 1: group features computed partition-parallel (0 = all cores)
+        self.n_jobs = n_jobs
+        self.parallel_min_rows = parallel_min_rows
         
     def create_driver_features(self):
         """Create driver performance metrics using only past races to avoid leakage."""
@@ -62,6 +67,15 @@ class F1FeatureEngineer:
         )
 
         print("[OK] Created qualifying features")
+
+    def create_group_features_parallel(self):
+        """All driver, track and qualifying features at once, partitioned over a process pool."""
+        features = compute_group_features(self.df, self.n_jobs, self.parallel_min_rows)
+        self.df[OUTPUT_COLS] = features
+        # Same row order as the serial path leaves behind
+        self.df = self.df.sort_values(['driver', 'race_id'])
+
+        print(f"[OK] Created driver, track and qualifying features ({self.n_jobs or 'all'} workers)")
         
     def encode_categorical(self):
         """Encode categorical variables"""
@@ -77,14 +91,18 @@ class F1FeatureEngineer:
         
         print("[OK] Encoded categorical variables")
         
-    def get_processed_data(self):
-        """Return fully processed dataset"""
-        self.create_driver_features()
-        self.create_track_features()
-        self.create_qualifying_impact()
+    def get_processed_data(self, fill_missing=True):
+        """Return fully processed dataset (fill_missing=False leaves NaNs for the caller to fill)"""
+        if getattr(self, 'n_jobs', 1) == 1:
+            self.create_driver_features()
+            self.create_track_features()
+            self.create_qualifying_impact()
+        else:
+            self.create_group_features_parallel()
         self.encode_categorical()
 
         # Handle missing values
-        self.df.fillna(self.df.mean(numeric_only=True), inplace=True)
+        if fill_missing:
+            self.df.fillna(self.df.mean(numeric_only=True), inplace=True)
 
         return self.df
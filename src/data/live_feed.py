@@ -0,0 +1,171 @@
+"""
+Lap-by-lap race feeds for live predictions.
+
+A feed is a ``LapReplay``: the starting lineup plus one update per lap in
+the shape LiveRace.apply_lap() consumes:
+
+    {"lap": 12, "total_laps": 57,
+     "drivers": {"VER": {"position": 1, "gap": 0.0}, "HAM": {"position": 2, "gap": 3.4}, ...},
+     "retired": ["SAR"],
+     "weather": "Dry", "temperature": 27}
+
+Two sources are provided: a replay of a cached FastF1 race session (offline
+once the session is in the FastF1 cache) and a seeded synthetic race for
+testing without any data.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.data.data_loader import FASTF1_AVAILABLE, F1DataLoader
+from src.data.fastf1_cache import cache_manager_from_settings
+
+if FASTF1_AVAILABLE:
+    import fastf1
+
+
+@dataclass
+class LapReplay:
+    track: str
+    total_laps: int
+    entries: list[dict]          # {"driver", "team", "grid_position"}
+    updates: list[dict] = field(default_factory=list)
+    weather: str = "Dry"
+    temperature: int = 25
+    source: str = "synthetic"
+
+
+def _secs(value) -> float:
+    return F1DataLoader._timedelta_secs(value)
+
+
+def fastf1_replay(year: int, round_num: int, cache_dir: str) -> LapReplay:
+    """Build a replay from a FastF1 race session (served from the FastF1 cache when present)."""
+    if not FASTF1_AVAILABLE:
+        raise RuntimeError("fastf1 is not installed")
+    fastf1.Cache.enable_cache(cache_dir)
+    session = fastf1.get_session(year, round_num, "R")
+    session.load(laps=True, telemetry=False, weather=True, messages=False)
+    cache = cache_manager_from_settings(cache_dir)
+    cache.record_use(year, str(session.event["EventName"]))
+    cache.enforce()
+
+    laps = session.laps
+    if laps is None or len(laps) == 0:
+        raise ValueError(f"No lap data for {year} round {round_num}")
+
+    # Lineup, teams and DNF flags exactly as the training data derives them
+    rows = F1DataLoader()._build_race_rows(session)
+    entries = [
+        {"driver": r["driver"], "team": r["team"], "grid_position": int(r["grid_position"])}
+        for r in sorted(rows, key=lambda r: r["grid_position"])
+    ]
+    dnf = {r["driver"] for r in rows if r["dnf"]}
+    last_lap = laps.groupby("Driver")["LapNumber"].max().astype(int).to_dict()
+    total_laps = int(laps["LapNumber"].max())
+
+    wd = session.weather_data
+    weather_times = wd["Time"].map(_secs).to_numpy() if wd is not None and len(wd) else np.array([])
+
+    def conditions(at_secs: float) -> tuple[str | None, int | None]:
+        if not len(weather_times):
+            return None, None
+        i = min(np.searchsorted(weather_times, at_secs), len(weather_times) - 1)
+        row = wd.iloc[i]
+        return ("Wet" if bool(row["Rainfall"]) else "Dry"), int(round(float(row["AirTemp"])))
+
+    updates = []
+    retired: set[str] = set()
+    for lap_no, lap in laps.groupby("LapNumber"):
+        lap_no = int(lap_no)
+        times = lap["Time"].map(_secs)
+        order = lap.assign(_t=times).sort_values(["Position", "_t"], na_position="last")
+        leader_time = times.min()
+        drivers = {
+            str(r.Driver): {
+                "position": i,
+                "gap": None if np.isinf(r._t) else round(float(r._t - leader_time), 3),
+            }
+            for i, r in enumerate(order.itertuples(index=False), start=1)
+        }
+        newly_retired = [d for d in dnf if last_lap.get(d, 0) < lap_no and d not in retired]
+        retired.update(newly_retired)
+        weather, temperature = conditions(float(times[np.isfinite(times)].max()) if np.isfinite(times).any() else 0.0)
+        updates.append({
+            "lap": lap_no,
+            "total_laps": total_laps,
+            "drivers": drivers,
+            "retired": sorted(newly_retired),
+            "weather": weather,
+            "temperature": temperature,
+        })
+
+    event = session.event
+    track = str(event["EventName"]).replace(" Grand Prix", "").strip()
+    first = updates[0]
+    print(f"[OK] Replay ready: {year} R{round_num:02d} {track} ({total_laps} laps, {len(entries)} drivers)")
+    return LapReplay(
+        track=track,
+        total_laps=total_laps,
+        entries=entries,
+        updates=updates,
+        weather=first["weather"] or "Dry",
+        temperature=first["temperature"] or 25,
+        source="fastf1",
+    )
+
+
+def synthetic_replay(
+    entries: list[dict],
+    track: str,
+    total_laps: int = 50,
+    weather: str = "Dry",
+    temperature: int = 25,
+    seed: int | None = None,
+) -> LapReplay:
+    """A seeded random race: lap-time noise, occasional retirements and a chance of rain."""
+    rng = np.random.default_rng(seed)
+    n = len(entries)
+    codes = [e["driver"] for e in entries]
+    grid = np.array([e["grid_position"] for e in entries], dtype=float)
+
+    # Cumulative race time; the grid order starts ~0.25 s per place apart
+    elapsed = (grid - 1) * 0.25
+    pace = rng.normal(90.0, 0.35, n)
+    out_lap = np.where(rng.random(n) < 0.12, rng.integers(1, total_laps + 1, n), total_laps + 1)
+    rain_from = rng.integers(total_laps // 3, total_laps) if rng.random() < 0.2 else total_laps + 1
+
+    updates = []
+    for lap in range(1, total_laps + 1):
+        wet = lap >= rain_from
+        elapsed = elapsed + pace + rng.normal(0.0, 0.6 if wet else 0.3, n) + (4.0 if wet else 0.0)
+        running = out_lap > lap
+        order = [i for i in np.argsort(elapsed) if running[i]]
+        leader = elapsed[order[0]] if order else 0.0
+        updates.append({
+            "lap": lap,
+            "total_laps": total_laps,
+            "drivers": {
+                codes[i]: {"position": pos, "gap": round(float(elapsed[i] - leader), 3)}
+                for pos, i in enumerate(order, start=1)
+            },
+            "retired": [codes[i] for i in range(n) if out_lap[i] == lap],
+            "weather": "Wet" if wet else weather,
+            "temperature": int(temperature + rng.integers(-1, 2)),
+        })
+    return LapReplay(
+        track=track, total_laps=total_laps, entries=entries, updates=updates,
+        weather=weather, temperature=temperature, source="synthetic",
+    )
+
+
+def latest_lineup(pipeline: dict) -> list[dict]:
+    """Driver / team / grid of the most recent race in the training data."""
+    df: pd.DataFrame = pipeline["feature_engineer"].df
+    last = df[df["race_id"] == df["race_id"].max()].sort_values("grid_position")
+    return [
+        {"driver": r.driver, "team": r.team, "grid_position": int(r.grid_position)}
+        for r in last.itertuples(index=False)
+    ]
@@ -0,0 +1,234 @@
+"""
+Partition-parallel computation of the F1FeatureEngineer group features.
+
+Every history feature is a function of one group's past races: the driver
+(recent_form, driver_win_rate, dnf_rate, quali_strength), the (driver,
+track) pair (driver_track_avg) or the (team, track) pair (team_track_avg).
+Groups never interact, so the history is hash-partitioned twice — by
+driver, which also covers (driver, track), and by (team, track) — and the
+partitions are computed independently:
+
+  - the parent encodes the needed columns once into a float64 matrix in
+    shared memory, together with each scheme's row order grouped by
+    partition; workers attach to it by name, so the history is never
+    pickled or copied per task,
+  - each worker sorts its partition's rows by (group, race_id) and computes
+    prior-race means with group-wise cumulative sums (exact for the integer
+    positions and flags involved, so results equal the pandas path),
+  - results go straight into a shared output block at the rows' original
+    positions; partitions are disjoint, so there is no concatenation or
+    re-sorting of partial frames and the parent reads them back in one pass.
+
+Teammates in the same race are ordered by driver, as the serial path's
+stable sorts order them, so team_track_avg matches it exactly as well.
+
+Histories below FEATURE_PARALLEL_MIN_ROWS run the same kernel in-process:
+there, starting the pool costs more than it saves.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+# Input matrix columns
+_DRIVER, _TEAM, _TRACK, _RACE, _FINISH, _DNF, _GRID = range(7)
+# Output columns, in the order the serial path creates them
+OUTPUT_COLS: list[str] = [
+    "recent_form", "driver_win_rate", "dnf_rate", "driver_track_avg", "team_track_avg", "quali_strength",
+]
+_BY_DRIVER, _BY_TEAM_TRACK = 0, 1
+_PARTITIONS_PER_WORKER = 4
+
+# Worker state: set by _attach (pool) or directly (in-process)
+_inputs: np.ndarray | None = None
+_orders: np.ndarray | None = None
+_outputs: np.ndarray | None = None
+_segments: list[SharedMemory] = []
+
+
+# ---------------------------------------------------------------------------
+# Kernel
+# ---------------------------------------------------------------------------
+
+def _group_positions(*keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """For rows sorted by ``keys``: each row's group start index and position in its group."""
+    n = len(keys[0])
+    new = np.zeros(n, dtype=bool)
+    if n:
+        new[0] = True
+        for key in keys:
+            new[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(new)
+    start = starts[np.cumsum(new) - 1]
+    return start, np.arange(n) - start
+
+
+def _prior_sums(values: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Sum of the earlier values in each row's group (0 for a group's first row)."""
+    excl = np.cumsum(values) - values
+    return excl - excl[start]
+
+
+def _prior_mean(values: np.ndarray, start: np.ndarray, pos: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(pos > 0, _prior_sums(values, start) / pos, np.nan)
+
+
+def _driver_partition(rows: np.ndarray) -> None:
+    block = _inputs[rows]
+    driver, track, race = block[:, _DRIVER], block[:, _TRACK], block[:, _RACE]
+    finish = block[:, _FINISH]
+
+    order = np.lexsort((race, driver))
+    start, pos = _group_positions(driver[order])
+    f = finish[order]
+    idx = np.arange(len(order))
+
+    # Last five earlier races: prior sum minus the prior sum five races back
+    prior = _prior_sums(f, start)
+    back = np.maximum(idx - 5, start)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        recent = np.where(pos > 0, (prior - prior[back]) / (idx - back), np.nan)
+    win_rate = _prior_sums((f == 1).astype(np.float64), start) / (pos + 1)
+    dnf_rate = _prior_mean(block[order, _DNF], start, pos)
+    quali = _prior_mean(block[order, _GRID], start, pos)
+
+    target = rows[order]
+    _outputs[0, target] = recent
+    _outputs[1, target] = win_rate
+    _outputs[2, target] = dnf_rate
+    _outputs[5, target] = quali
+
+    order = np.lexsort((race, track, driver))
+    start, pos = _group_positions(driver[order], track[order])
+    _outputs[3, rows[order]] = _prior_mean(finish[order], start, pos)
+
+
+def _team_track_partition(rows: np.ndarray) -> None:
+    block = _inputs[rows]
+    team, track = block[:, _TEAM], block[:, _TRACK]
+    order = np.lexsort((block[:, _DRIVER], block[:, _RACE], track, team))
+    start, pos = _group_positions(team[order], track[order])
+    _outputs[4, rows[order]] = _prior_mean(block[order, _FINISH], start, pos)
+
+
+def _compute(task: tuple[int, int, int]) -> int:
+    scheme, lo, hi = task
+    rows = _orders[scheme, lo:hi]
+    (_driver_partition if scheme == _BY_DRIVER else _team_track_partition)(rows)
+    return hi - lo
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+class _Segment:
+    """A NumPy array in a named shared-memory segment owned by this process."""
+
+    def __init__(self, shape: tuple, dtype):
+        self.shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self) -> tuple[str, tuple, str]:
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def release(self) -> None:
+        self.array = None  # the view must go before the segment can close
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(specs: list[tuple[str, tuple, str]]) -> None:
+    global _inputs, _orders, _outputs, _segments
+    arrays = []
+    for name, shape, dtype in specs:
+        # Workers share the parent's resource tracker, which the parent's unlink settles
+        shm = SharedMemory(name=name)
+        _segments.append(shm)
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    _inputs, _orders, _outputs = arrays
+
+
+# ---------------------------------------------------------------------------
+# Parent
+# ---------------------------------------------------------------------------
+
+def _encode(df: pd.DataFrame, out: np.ndarray) -> tuple[int, int]:
+    """Fill ``out`` with the input matrix; returns the team / track label counts."""
+    # Sorted codes, so ordering ties by driver code orders them by driver name
+    codes = {col: pd.factorize(df[col], sort=True) for col in ("driver", "team", "track")}
+    out[:, _DRIVER] = codes["driver"][0]
+    out[:, _TEAM] = codes["team"][0]
+    out[:, _TRACK] = codes["track"][0]
+    out[:, _RACE] = df["race_id"].to_numpy(dtype=np.float64)
+    out[:, _FINISH] = df["finish_position"].to_numpy(dtype=np.float64)
+    out[:, _DNF] = df["dnf"].to_numpy(dtype=np.float64)
+    out[:, _GRID] = df["grid_position"].to_numpy(dtype=np.float64)
+    return len(codes["team"][1]), len(codes["track"][1])
+
+
+def _plan(inputs: np.ndarray, orders: np.ndarray, n_tracks: int, partitions: int) -> list[tuple[int, int, int]]:
+    """Hash-partition rows per scheme; fills ``orders`` and returns (scheme, lo, hi) tasks."""
+    keys = {
+        _BY_DRIVER: inputs[:, _DRIVER].astype(np.int64),
+        _BY_TEAM_TRACK: inputs[:, _TEAM].astype(np.int64) * n_tracks + inputs[:, _TRACK].astype(np.int64),
+    }
+    tasks = []
+    for scheme, key in keys.items():
+        part = key % partitions
+        orders[scheme] = np.argsort(part, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(part, minlength=partitions))])
+        tasks += [(scheme, int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    # Largest partitions first so the pool does not end on a straggler
+    return sorted(tasks, key=lambda t: t[1] - t[2])
+
+
+def compute_group_features(df: pd.DataFrame, workers: int = 0, min_rows: int = 0) -> pd.DataFrame:
+    """
+    The six history features of ``df`` (columns OUTPUT_COLS, same index as ``df``).
+
+    ``workers`` processes (0 = all cores) share the partitions; below
+    ``min_rows`` rows or with one worker the kernel runs in-process.
+    """
+    global _inputs, _orders, _outputs
+    n = len(df)
+    workers = workers or os.cpu_count() or 1
+    in_process = workers == 1 or n < min_rows
+    partitions = 1 if in_process else workers * _PARTITIONS_PER_WORKER
+
+    if in_process:
+        inputs = np.empty((n, 7))
+        _, n_tracks = _encode(df, inputs)
+        _inputs, _orders, _outputs = inputs, np.empty((2, n), dtype=np.int64), np.empty((len(OUTPUT_COLS), n))
+        try:
+            for task in _plan(_inputs, _orders, n_tracks, partitions):
+                _compute(task)
+            values = _outputs
+        finally:
+            _inputs = _orders = _outputs = None
+        return pd.DataFrame(values.T, index=df.index, columns=OUTPUT_COLS)
+
+    segments: list[_Segment] = []
+    try:
+        segments = [_Segment((n, 7), np.float64), _Segment((2, n), np.int64),
+                    _Segment((len(OUTPUT_COLS), n), np.float64)]
+        inputs, orders, outputs = segments
+        _, n_tracks = _encode(df, inputs.array)
+        tasks = _plan(inputs.array, orders.array, n_tracks, partitions)
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)), mp_context=get_context("spawn"),
+            initializer=_attach, initargs=([seg.spec for seg in segments],),
+        ) as pool:
+            list(pool.map(_compute, tasks))
+        # One read of the shared block; the segments are released right after
+        values = outputs.array.copy()
+    finally:
+        for seg in segments:
+            seg.release()
+    return pd.DataFrame(values.T, index=df.index, columns=OUTPUT_COLS)
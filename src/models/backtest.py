@@ -0,0 +1,280 @@
+"""
+Walk-forward backtesting.
+
+F1PredictionModel reports accuracy from one 80/20 chronological split. This
+module replays history instead: at every season (or race) boundary a fresh
+model is trained on everything before it and scored on the races that follow
+until the next refit, so every prediction is made without seeing the future.
+
+The feature matrix is built once (features are already computed from past
+races only) and written to ``.npy`` files that every worker memory-maps
+read-only, so folds run in parallel on a process pool without copying or
+re-pickling the data per fold. Missing values are left in it and filled per
+fold from the training rows only, and label codes the training rows never
+saw fall back to 0 as serving does for unseen labels.
+
+    python -m src.models.backtest --refit season --test-seasons 5
+    python -m src.models.backtest --refit race --model "Random Forest" --workers 8
+    python -m src.models.backtest --data dataset/historical_data.parquet --output backtest.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.config import settings
+from src.data.data_loader import F1DataLoader
+from src.data.feature_engineer import F1FeatureEngineer
+from src.models.pipeline import FEATURE_COLS
+from src.models.train_models import MODEL_FACTORIES, categorical_mask, fit_scaler
+from src.utils.helpers import get_logger
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+# Per-race metric columns, aggregated by season and overall
+METRICS: list[str] = ["accuracy", "mae", "within_3", "winner_hit", "podium_hit", "spearman"]
+
+
+# ---------------------------------------------------------------------------
+# Shared feature matrix
+# ---------------------------------------------------------------------------
+
+def build_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Engineer features once and order rows chronologically (race, then grid).
+
+    Missing values stay NaN: get_processed_data fills them with whole-history
+    means, which would leak the test seasons into every fold (see ``_past_only``).
+    """
+    processed = F1FeatureEngineer(
+        df, n_jobs=settings.FEATURE_WORKERS, parallel_min_rows=settings.FEATURE_PARALLEL_MIN_ROWS
+    ).get_processed_data(fill_missing=False)
+    return processed.sort_values(["race_id", "grid_position"]).reset_index(drop=True)
+
+
+def plan_folds(processed: pd.DataFrame, refit: str, test_seasons: int) -> list[tuple[int, int]]:
+    """
+    Row ranges ``(train_end, test_end)``: train on rows [0, train_end),
+    predict rows [train_end, test_end). Rows are sorted by race_id, so each
+    boundary is a plain row index.
+    """
+    seasons = np.sort(processed["year"].unique())
+    if len(seasons) < 2:
+        raise ValueError("Walk-forward backtesting needs at least two seasons of history")
+    test_years = seasons[-min(test_seasons, len(seasons) - 1):]
+
+    race_ids = processed["race_id"].to_numpy()
+    years = processed["year"].to_numpy()
+    # First row of every race (rows are contiguous per race)
+    race_starts = np.flatnonzero(np.r_[True, race_ids[1:] != race_ids[:-1]])
+    race_ends = np.r_[race_starts[1:], len(race_ids)]
+
+    folds = []
+    if refit == "season":
+        for year in test_years:
+            rows = np.flatnonzero(years == year)
+            folds.append((int(rows[0]), int(rows[-1]) + 1))
+    else:
+        for start, end in zip(race_starts, race_ends):
+            if years[start] >= test_years[0]:
+                folds.append((int(start), int(end)))
+    return folds
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+_shared: dict = {}
+# Label-encoded feature columns
+_CODE_COLS = np.flatnonzero([col.endswith("_encoded") for col in FEATURE_COLS])
+
+
+def _init_worker(data_dir: str, model_name: str) -> None:
+    """Map the shared arrays once per worker process."""
+    _shared["X"] = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    _shared["y"] = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+    _shared["race"] = np.load(os.path.join(data_dir, "race.npy"), mmap_mode="r")
+    _shared["model_name"] = model_name
+
+
+def _past_only(X_train: np.ndarray, X_test: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fill a fold from its training rows alone: NaNs take the training column
+    means, and test codes absent from training fall back to 0 (``_safe_encode``).
+    """
+    means = pd.DataFrame(X_train).mean().fillna(0.0).to_numpy(dtype=X_train.dtype)
+    X_train = np.where(np.isnan(X_train), means, X_train)
+    X_test = np.where(np.isnan(X_test), means, X_test)
+    for i in _CODE_COLS:
+        X_test[~np.isin(X_test[:, i], X_train[:, i]), i] = 0
+    return X_train, X_test
+
+
+def _run_fold(fold: tuple[int, int]) -> list[dict]:
+    """Train on rows before the fold, score each race inside it."""
+    train_end, test_end = fold
+    X, y, race = _shared["X"], _shared["y"], _shared["race"]
+    X_train, y_train = np.asarray(X[:train_end]), np.asarray(y[:train_end])
+    X_test, y_test = np.asarray(X[train_end:test_end]), np.asarray(y[train_end:test_end])
+    X_train, X_test = _past_only(X_train, X_test)
+
+    # Early windows may not contain every finishing position; XGBoost needs
+    # contiguous labels, so train on indices into the observed classes.
+    classes, y_idx = np.unique(y_train, return_inverse=True)
+    scaler = fit_scaler(X_train, FEATURE_COLS)
+    X_train = scaler.transform(X_train)
+    model = MODEL_FACTORIES[_shared["model_name"]](
+        n_jobs=1, categorical_features=categorical_mask(FEATURE_COLS, X_train)
+    )
+    t0 = time.perf_counter()
+    model.fit(X_train, y_idx)
+    fit_s = time.perf_counter() - t0
+
+    proba = model.predict_proba(scaler.transform(X_test))
+    classes = classes[np.asarray(model.classes_, dtype=int)]
+    pred = classes[proba.argmax(axis=1)]
+
+    rows = []
+    test_race = np.asarray(race[train_end:test_end])
+    for race_id in np.unique(test_race):
+        m = test_race == race_id
+        rows.append(score_race(int(race_id), y_test[m], pred[m], proba[m], classes, train_end, fit_s))
+    return rows
+
+
+def score_race(race_id, actual, pred, proba, classes, train_rows, fit_s) -> dict:
+    """Metrics for one race; positions are 0-indexed throughout."""
+    expected = proba @ classes
+    win = proba[:, classes == 0].sum(axis=1)
+    podium = proba[:, classes <= 2].sum(axis=1)
+    top3 = np.argsort(-podium)[:3]
+    # Rank correlation between expected and actual finishing order
+    if len(actual) > 1 and np.std(actual) > 0:
+        spearman = float(np.corrcoef(pd.Series(expected).rank(), pd.Series(actual).rank())[0, 1])
+    else:
+        spearman = float("nan")
+    return {
+        "race_id": race_id,
+        "drivers": int(len(actual)),
+        "train_rows": int(train_rows),
+        "fit_seconds": round(fit_s, 3),
+        "accuracy": float(np.mean(pred == actual)),
+        "mae": float(np.mean(np.abs(pred - actual))),
+        "within_3": float(np.mean(np.abs(pred - actual) <= 3)),
+        "winner_hit": float(actual[np.argmax(win)] == 0),
+        "podium_hit": float(np.mean(actual[top3] <= 2)),
+        "spearman": spearman,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run_backtest(
+    df: pd.DataFrame,
+    model_name: str = "XGBoost",
+    refit: str = "season",
+    test_seasons: int = 5,
+    workers: int | None = None,
+) -> dict:
+    """
+    Walk-forward backtest over the last ``test_seasons`` seasons of ``df``.
+
+    Returns ``{"races": [...], "seasons": [...], "overall": {...}, "config": {...}}``.
+    """
+    if model_name not in MODEL_FACTORIES:
+        raise ValueError(f"Unknown model '{model_name}' (choose from {', '.join(MODEL_FACTORIES)})")
+    t0 = time.perf_counter()
+    processed = build_matrix(df)
+    folds = plan_folds(processed, refit, test_seasons)
+    workers = workers or os.cpu_count() or 1
+    logger.info("Backtest: %s, refit per %s, %d folds on %d workers", model_name, refit, len(folds), workers)
+
+    races: list[dict] = []
+    with tempfile.TemporaryDirectory(prefix="f1-backtest-") as data_dir:
+        np.save(os.path.join(data_dir, "X.npy"), processed[FEATURE_COLS].to_numpy(dtype=settings.FEATURE_DTYPE))
+        np.save(os.path.join(data_dir, "y.npy"), (processed["finish_position"] - 1).to_numpy(dtype=int))
+        np.save(os.path.join(data_dir, "race.npy"), processed["race_id"].to_numpy(dtype=np.int64))
+
+        # Largest training windows first so the pool does not end on a straggler
+        ordered = sorted(folds, key=lambda f: -f[0])
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(data_dir, model_name)
+        ) as pool:
+            for fold_rows in pool.map(_run_fold, ordered):
+                races.extend(fold_rows)
+
+    per_race = pd.DataFrame(races).sort_values("race_id")
+    years = processed.drop_duplicates("race_id").set_index("race_id")["year"]
+    per_race.insert(1, "year", per_race["race_id"].map(years).astype(int))
+
+    seasons = (
+        per_race.groupby("year")
+        .agg(races=("race_id", "size"), **{m: (m, "mean") for m in METRICS})
+        .reset_index()
+    )
+    overall = {"races": int(len(per_race)), **{m: float(per_race[m].mean()) for m in METRICS}}
+    elapsed = time.perf_counter() - t0
+    logger.info("Backtest finished in %.1fs — overall accuracy %.4f", elapsed, overall["accuracy"])
+
+    return {
+        "config": {"model": model_name, "refit": refit, "test_seasons": test_seasons,
+                   "folds": len(folds), "workers": workers, "seconds": round(elapsed, 2)},
+        "races": _records(per_race),
+        "seasons": _records(seasons),
+        "overall": {k: round(v, 4) if isinstance(v, float) else v for k, v in overall.items()},
+    }
+
+
+def _records(frame: pd.DataFrame) -> list[dict]:
+    out = frame.round(4).astype(object).where(frame.notna(), None)
+    return out.to_dict("records")
+
+
+def _print_report(report: dict) -> None:
+    cols = ["year", "races"] + METRICS
+    print("  ".join(f"{c:>10}" for c in cols))
+    for row in report["seasons"] + [{"year": "overall", **report["overall"]}]:
+        print("  ".join(f"{_fmt(row.get(c)):>10}" for c in cols))
+
+
+def _fmt(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=settings.HISTORICAL_DATA_PATH, help="Historical results parquet")
+    parser.add_argument("--model", default="XGBoost", choices=list(MODEL_FACTORIES))
+    parser.add_argument("--refit", default="season", choices=["season", "race"],
+                        help="Retrain at every season or every race boundary")
+    parser.add_argument("--test-seasons", type=int, default=5, help="Most recent seasons to walk forward over")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help="Write the full per-race / per-season report as JSON")
+    args = parser.parse_args(argv)
+
+    df = F1DataLoader(data_path=args.data).load_historical_data(years=settings.DATA_YEARS)
+    report = run_backtest(df, args.model, args.refit, args.test_seasons, args.workers)
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"[OK] Backtest report written -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Knowledge distillation: a small student model for the serving path.
+
+The teacher (the best model from F1PredictionModel) evaluates hundreds to
+thousands of trees per call. A student is fitted to the teacher's full
+probability output on the training set: each training row is expanded into
+one row per finishing position the teacher gives noticeable mass, weighted
+by that probability, so the student's cross-entropy loss is the
+distillation loss. Every candidate is then scored on the chronological test
+set (accuracy against the true results and agreement with the teacher),
+timed for single-row and per-row batch latency, and sized as a pickle.
+
+The fastest candidate whose accuracy loss stays within
+DISTILL_MAX_ACCURACY_LOSS can replace the teacher as ``best_model``.
+"""
+
+import pickle
+import time
+from typing import Callable
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.tree import DecisionTreeClassifier
+
+from src.config import settings
+from src.models.train_models import F1PredictionModel
+from src.utils.helpers import get_logger
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+# Student name → factory. Both accept sample weights, which carry the soft labels.
+STUDENTS: dict[str, Callable[[], object]] = {
+    "Logistic Regression": lambda: LogisticRegression(max_iter=1000, C=1.0),
+    "Decision Tree": lambda: DecisionTreeClassifier(
+        max_depth=8,
+        min_samples_leaf=20,
+        random_state=settings.RANDOM_STATE,
+    ),
+}
+
+
+def soft_label_dataset(
+    X: np.ndarray, proba: np.ndarray, classes: np.ndarray, min_prob: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Expand rows into (row, class) pairs weighted by the teacher's probability."""
+    rows, cols = np.nonzero(proba >= min_prob)
+    return X[rows], classes[cols], proba[rows, cols]
+
+
+def _profile(model, X: np.ndarray, single_calls: int = 50) -> dict:
+    """Median single-row latency, per-row batch latency and pickled size."""
+    single = []
+    for i in range(single_calls):
+        row = X[i % len(X)][None, :]
+        t0 = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - t0
+    return {
+        "single_row_ms": round(float(np.median(single)) * 1000, 4),
+        "batch_row_us": round(batch / len(X) * 1e6, 4),
+        "size_kb": round(len(pickle.dumps(model)) / 1024, 1),
+    }
+
+
+def distill_student(model: F1PredictionModel) -> dict:
+    """
+    Fit every STUDENTS candidate to the teacher and report the trade-offs.
+
+    When DISTILL_SERVE is set and a candidate is within the accuracy-loss
+    budget, the fastest such student is registered in ``model.models`` /
+    ``model.results`` and becomes ``model.best_model``. Returns the report.
+    """
+    teacher_name = model.best_model_name
+    teacher = model.best_model
+    X_train, X_test = np.asarray(model.X_train_scaled), np.asarray(model.X_test_scaled)
+    y_test = np.asarray(model.y_test)
+
+    # Bound the expanded soft-label set on large histories
+    if len(X_train) > settings.DISTILL_MAX_ROWS:
+        keep = np.random.default_rng(settings.RANDOM_STATE).choice(
+            len(X_train), settings.DISTILL_MAX_ROWS, replace=False
+        )
+        X_train = X_train[np.sort(keep)]
+
+    teacher_acc = float(model.results[teacher_name])
+    teacher_pred = teacher.predict(X_test)
+    X_soft, y_soft, w_soft = soft_label_dataset(
+        X_train, teacher.predict_proba(X_train), np.asarray(teacher.classes_), settings.DISTILL_MIN_PROB
+    )
+    logger.info(
+        "Distilling %s into %d student(s) on %d soft-label rows",
+        teacher_name, len(STUDENTS), len(X_soft),
+    )
+
+    report = {
+        "teacher": {"name": teacher_name, "accuracy": round(teacher_acc, 4), **_profile(teacher, X_test)},
+        "students": [],
+        "budget": settings.DISTILL_MAX_ACCURACY_LOSS,
+        "served": teacher_name,
+    }
+    fitted = {}
+    for name, factory in STUDENTS.items():
+        t0 = time.perf_counter()
+        student = factory()
+        student.fit(X_soft, y_soft, sample_weight=w_soft)
+        fit_s = time.perf_counter() - t0
+
+        pred = student.predict(X_test)
+        acc = float(accuracy_score(y_test, pred))
+        entry = {
+            "name": name,
+            "accuracy": round(acc, 4),
+            "accuracy_loss": round(teacher_acc - acc, 4),
+            "teacher_agreement": round(float(np.mean(pred == teacher_pred)), 4),
+            "fit_seconds": round(fit_s, 2),
+            **_profile(student, X_test),
+        }
+        entry["within_budget"] = entry["accuracy_loss"] <= settings.DISTILL_MAX_ACCURACY_LOSS
+        report["students"].append(entry)
+        fitted[name] = student
+        logger.info(
+            "Student %s: accuracy %.4f (loss %+.4f), %.3f ms/row, %.1f KB vs teacher %.3f ms, %.1f KB",
+            name, acc, entry["accuracy_loss"], entry["single_row_ms"], entry["size_kb"],
+            report["teacher"]["single_row_ms"], report["teacher"]["size_kb"],
+        )
+
+    eligible = [s for s in report["students"] if s["within_budget"]]
+    if settings.DISTILL_SERVE and eligible:
+        chosen = min(eligible, key=lambda s: s["single_row_ms"])
+        served = f"{chosen['name']} (distilled)"
+        model.models[served] = fitted[chosen["name"]]
+        model.results[served] = chosen["accuracy"]
+        model.best_model_name = served
+        model.best_model = fitted[chosen["name"]]
+        report["served"] = served
+        logger.info("Serving distilled student %s in place of %s", served, teacher_name)
+    elif not eligible:
+        logger.info("No student within the %.4f accuracy budget — serving %s",
+                    settings.DISTILL_MAX_ACCURACY_LOSS, teacher_name)
+    return report
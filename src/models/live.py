@@ -0,0 +1,181 @@
+"""
+Live in-race predictions.
+
+A LiveRace holds one race's feature matrix for the whole session. It is
+built once from the starting grid; every lap update then only rewrites the
+columns that change during a race and scores the still-running drivers with
+one predict_position_proba call:
+
+  - ``grid_position`` ← the driver's current running position, the
+    strongest signal the model has once the race is under way,
+  - ``weather_encoded`` / ``temperature`` ← the latest track conditions.
+
+The model's distribution is blended with the current order in proportion to
+race progress (on the last lap the running order *is* the result), then a
+small Monte Carlo pass turns it into grid-consistent win / podium / points
+probabilities. Retired drivers drop to the back with zero probability.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.config import settings
+from src.models.pipeline import _lookup_tables, build_feature_matrix, predict_position_proba
+from src.models.simulation import position_distribution, sample_finishing_orders, summarize_orders
+from src.utils.helpers import get_logger
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+
+class LiveRace:
+    """Running state and predictions for one race, updated lap by lap."""
+
+    def __init__(
+        self,
+        pipeline: dict,
+        track: str,
+        entries: list[dict],
+        total_laps: int,
+        weather: str = "Dry",
+        temperature: int = 25,
+        n_sims: int = settings.LIVE_SIMULATIONS,
+        seed: int | None = None,
+    ):
+        self.pipeline = pipeline
+        self.track = track
+        self.entries = [dict(e) for e in sorted(entries, key=lambda e: e["grid_position"])]
+        self.codes = [e["driver"] for e in self.entries]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.total_laps = max(int(total_laps), 1)
+        self.n_sims = n_sims
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+        n = len(self.entries)
+        self.lap = 0
+        self.weather = weather
+        self.temperature = int(temperature)
+        self.position = np.array([e["grid_position"] for e in self.entries], dtype=int)
+        self.gap = np.full(n, np.nan)
+        self.retired = np.zeros(n, dtype=bool)
+        self._rerank()
+
+        frame = pd.DataFrame(
+            [{**e, "track": track, "weather": weather, "temperature": temperature} for e in self.entries]
+        )
+        self.X = build_feature_matrix(frame, pipeline)
+        self._weather_codes = {
+            label: i for i, label in enumerate(_lookup_tables(pipeline)["labels"]["weather"])
+        }
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def apply_lap(self, update: dict) -> None:
+        """Fold one lap update (see src.data.live_feed) into the running state."""
+        with self._lock:
+            self.lap = int(update.get("lap", self.lap + 1))
+            self.total_laps = int(update.get("total_laps") or self.total_laps)
+            for code in update.get("retired", ()):
+                if code in self.index:
+                    self.retired[self.index[code]] = True
+            for code, state in update.get("drivers", {}).items():
+                i = self.index.get(code)
+                if i is None or self.retired[i]:
+                    continue
+                if state.get("position") is not None:
+                    self.position[i] = int(state["position"])
+                gap = state.get("gap")
+                self.gap[i] = np.nan if gap is None else float(gap)
+            if update.get("weather"):
+                self.weather = update["weather"]
+            if update.get("temperature") is not None:
+                self.temperature = int(update["temperature"])
+
+            self._rerank()
+            # Written in place so X keeps the pipeline's feature dtype and layout
+            self.X.loc[:, "grid_position"] = np.clip(self.position, 1, 20)
+            self.X.loc[:, "temperature"] = self.temperature
+            self.X.loc[:, "weather_encoded"] = self._weather_codes.get(self.weather, 0)
+
+    def _rerank(self) -> None:
+        """Renumber the running drivers 1..n so positions stay dense after retirements."""
+        active = np.flatnonzero(~self.retired)
+        ranked = active[np.argsort(self.position[active], kind="stable")]
+        self.position[ranked] = np.arange(1, len(ranked) + 1)
+
+    # ------------------------------------------------------------------
+    # Predictions
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Full-grid prediction for the current lap."""
+        with self._lock:
+            t0 = time.perf_counter()
+            n = len(self.codes)
+            active = np.flatnonzero(~self.retired)
+            summary = None
+            if len(active):
+                proba, classes = predict_position_proba(self.X.iloc[active], self.pipeline)
+                n_slots = max(len(active), int(classes.max()) + 1)
+                dist = position_distribution(proba, classes, n_slots)
+                progress = min(self.lap / self.total_laps, 1.0)
+                running = np.zeros_like(dist)
+                running[np.arange(len(active)), self.position[active] - 1] = 1.0
+                dist = (1.0 - progress) * dist + progress * running
+                summary = summarize_orders(sample_finishing_orders(dist, self.n_sims, self.rng))
+
+            rows = []
+            for i in range(n):
+                row = {
+                    **self.entries[i],
+                    "position": int(self.position[i]) if not self.retired[i] else None,
+                    "gap": None if np.isnan(self.gap[i]) else round(float(self.gap[i]), 3),
+                    "retired": bool(self.retired[i]),
+                    "predicted_position": None,
+                    "expected_position": None,
+                    "win_probability": 0.0,
+                    "podium_probability": 0.0,
+                    "points_probability": 0.0,
+                    "expected_points": 0.0,
+                }
+                rows.append(row)
+            for k, i in enumerate(active):
+                rows[i].update({
+                    "predicted_position": int(summary["predicted_position"][k]),
+                    "expected_position": round(float(summary["expected_position"][k]), 2),
+                    "win_probability": round(float(summary["win_probability"][k]), 4),
+                    "podium_probability": round(float(summary["podium_probability"][k]), 4),
+                    "points_probability": round(float(summary["points_probability"][k]), 4),
+                    "expected_points": round(float(summary["expected_points"][k]), 2),
+                })
+            # Retired drivers are classified behind every running car
+            retired_rows = [rows[i] for i in np.flatnonzero(self.retired)]
+            for offset, row in enumerate(retired_rows, start=len(active) + 1):
+                row["predicted_position"] = offset
+            rows.sort(key=lambda r: r["predicted_position"])
+
+            return {
+                "lap": self.lap,
+                "total_laps": self.total_laps,
+                "status": "finished" if self.lap >= self.total_laps else ("running" if self.lap else "pre-race"),
+                "track": self.track,
+                "weather": self.weather,
+                "temperature": self.temperature,
+                "predictions": rows,
+                "simulations": self.n_sims,
+                "model_used": self.pipeline["model"].best_model_name,
+                "model_version": self.pipeline.get("version"),
+                "compute_ms": round((time.perf_counter() - t0) * 1000, 2),
+                "timestamp": datetime.now().isoformat(),
+            }
+
+    def step(self, update: dict) -> dict:
+        """apply_lap() followed by snapshot()."""
+        self.apply_lap(update)
+        return self.snapshot()
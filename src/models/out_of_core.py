@@ -0,0 +1,481 @@
+"""
+Out-of-core training on partitioned Parquet histories.
+
+The in-memory pipeline holds the whole history, its engineered copy and the
+scaled train / test arrays at once. This path only ever holds one chunk of
+about OUT_OF_CORE_CHUNK_ROWS rows (whole seasons) at a time:
+
+  1. features — seasons are streamed from the partitioned dataset in
+     chronological order. Every F1FeatureEngineer feature is a function of
+     a group's *earlier* rows, so running per-driver / per-track / per-team
+     sums and counts (plus each driver's last five finishes) carried from
+     chunk to chunk reproduce it exactly, given that rows within a race are
+     taken in driver order, as the group-feature kernel takes them. Rows are spooled to disk with the
+     features still unfilled, while column sums, vocabularies, the row
+     count and the /stats cube's partial sums are accumulated.
+  2. scale — the spool is re-read in chunks. Missing values are filled with
+     the global means (as get_processed_data does), categoricals encoded and
+     the StandardScaler fitted incrementally (``partial_fit``) on the
+     training rows. The inference lookup tables are aggregated on the way.
+  3. train — XGBoost trains from an iterator over scaled spool chunks into
+     an external-memory DMatrix whose quantised pages live on disk, then is
+     scored on the held-out tail chunk by chunk.
+
+Peak memory is bounded by OUT_OF_CORE_CHUNK_ROWS plus one season; the
+history itself is bounded by disk. Only XGBoost trains this way — the
+forests and sklearn gradient boosting need the full matrix in memory.
+
+    python -m src.models.out_of_core partition dataset/historical_data.parquet dataset/history
+    OUT_OF_CORE_DIR=dataset/history python -m src.models.out_of_core train
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.config import settings
+from src.data.feature_engineer import F1FeatureEngineer
+from src.models.pipeline import FEATURE_COLS, load_cached_pipeline, run_training_pipeline, save_pipeline
+from src.models import serving as serving_module
+from src.models import stats_cube as stats_cube_module
+from src.models.registry import get_registry
+from src.models.stages import code_version, digest
+from src.models.stats_cube import CubeBuilder
+from src.models.train_models import F1PredictionModel, exclude_from_scaling, make_xgboost
+from src.utils.helpers import get_logger
+from src.utils.memory import memory_stage
+from src.utils.metrics import TRAINING_SECONDS, record_cache
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+RAW_COLS: list[str] = [
+    "race_id", "year", "track", "driver", "team", "grid_position",
+    "finish_position", "fastest_lap", "dnf", "weather", "temperature", "points",
+]
+# Features computed from history; NaN until a group has earlier rows
+HISTORY_COLS: list[str] = [
+    "recent_form", "driver_win_rate", "dnf_rate", "driver_track_avg", "team_track_avg", "quali_strength",
+]
+CATEGORICAL: dict[str, str] = {
+    "driver": "driver_encoded", "team": "team_encoded", "track": "track_encoded", "weather": "weather_encoded",
+}
+
+
+# ---------------------------------------------------------------------------
+# Dataset
+# ---------------------------------------------------------------------------
+
+def open_dataset(path: str) -> ds.Dataset:
+    """A Parquet file or directory (hive ``year=YYYY/`` partitions or plain files)."""
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def dataset_signature(path: str) -> str:
+    """Cheap content key: every file's relative path, size and mtime."""
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.endswith(".parquet")]
+    entries = []
+    for file in sorted(files):
+        st = os.stat(file)
+        entries.append((os.path.relpath(file, path), st.st_size, st.st_mtime_ns))
+    return digest(entries)
+
+
+def partition_history(source: str, dest: str) -> int:
+    """Rewrite a single history Parquet file as a ``year=``-partitioned dataset."""
+    table = pq.read_table(source)
+    pq.write_to_dataset(table, dest, partition_cols=["year"], existing_data_behavior="delete_matching")
+    print(f"[OK] Partitioned {table.num_rows} rows by year -> {dest}")
+    return table.num_rows
+
+
+def iter_seasons(dataset: ds.Dataset, min_rows: int):
+    """
+    Yield whole consecutive seasons, oldest first, rows ordered by race, then driver.
+
+    Seasons are merged until a chunk holds at least ``min_rows`` rows, which
+    amortises the per-chunk pandas overhead over many small seasons.
+    """
+    pending: list[pd.DataFrame] = []
+    rows = 0
+    for year in _unique_sorted(dataset, "year"):
+        season = dataset.to_table(columns=RAW_COLS, filter=ds.field("year") == year).to_pandas()
+        pending.append(season.sort_values(["race_id", "driver"], kind="stable"))
+        rows += len(season)
+        if rows >= min_rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def _unique_sorted(dataset: ds.Dataset, column: str) -> list:
+    values = set()
+    for batch in dataset.to_batches(columns=[column]):
+        values.update(batch.column(0).unique().to_pylist())
+    return sorted(values)
+
+
+# ---------------------------------------------------------------------------
+# Pass 1: streaming feature computation
+# ---------------------------------------------------------------------------
+
+class _Running:
+    """Sum / count per group carried across chunks."""
+
+    def __init__(self):
+        self.sum: dict = defaultdict(float)
+        self.count: dict = defaultdict(int)
+
+    def prior_mean(self, keys: pd.Series, values: pd.Series) -> np.ndarray:
+        """Mean of each group's earlier values (NaN for a group's first row), then absorb ``values``."""
+        frame = pd.DataFrame({"k": keys.to_numpy(), "v": values.to_numpy(dtype=float)})
+        grouped = frame.groupby("k", sort=False)["v"]
+        before_sum = grouped.cumsum().to_numpy() - frame["v"].to_numpy()
+        before_count = grouped.cumcount().to_numpy()
+        carried_sum = frame["k"].map(self.sum).fillna(0.0).to_numpy()
+        carried_count = frame["k"].map(self.count).fillna(0).to_numpy()
+        total_count = before_count + carried_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(total_count > 0, (before_sum + carried_sum) / total_count, np.nan)
+        totals = frame.groupby("k", sort=False)["v"].agg(["sum", "count"])
+        for key, s, c in zip(totals.index, totals["sum"], totals["count"]):
+            self.sum[key] += s
+            self.count[key] += int(c)
+        return mean
+
+
+class StreamingFeatures:
+    """F1FeatureEngineer's history features, computed one chunk of races at a time."""
+
+    def __init__(self):
+        self.finish = _Running()          # per driver
+        self.dnf = _Running()             # per driver
+        self.wins = _Running()            # per driver
+        self.grid = _Running()            # per driver
+        self.driver_track = _Running()    # per (driver, track)
+        self.team_track = _Running()      # per (team, track)
+        self.last_five: dict[str, deque] = defaultdict(lambda: deque(maxlen=5))
+
+    def transform(self, races: pd.DataFrame) -> pd.DataFrame:
+        """History features for ``races``, which must follow every race seen so far."""
+        out = races.copy()
+        driver = out["driver"]
+        finish = out["finish_position"].astype(float)
+
+        # driver_win_rate: (shift(1) == 1).expanding().mean() — the first row's
+        # shifted NaN counts as a non-win, so the denominator includes the current row
+        wins_before = self.wins.prior_mean(driver, (finish == 1).astype(float))
+        count_before = self._prior_counts(driver)
+        out["driver_win_rate"] = np.nan_to_num(wins_before) * count_before / (count_before + 1)
+
+        out["dnf_rate"] = self.dnf.prior_mean(driver, out["dnf"])
+        out["quali_strength"] = self.grid.prior_mean(driver, out["grid_position"])
+        out["recent_form"] = self._recent_form(driver, finish)
+        self.finish.prior_mean(driver, finish)
+        out["driver_track_avg"] = self.driver_track.prior_mean(driver + "\x1f" + out["track"], finish)
+        out["team_track_avg"] = self.team_track.prior_mean(out["team"] + "\x1f" + out["track"], finish)
+        return out
+
+    def _prior_counts(self, driver: pd.Series) -> np.ndarray:
+        carried = driver.map(self.finish.count).fillna(0).to_numpy()
+        return carried + driver.groupby(driver, sort=False).cumcount().to_numpy()
+
+    def _recent_form(self, driver: pd.Series, finish: pd.Series) -> np.ndarray:
+        """shift(1).rolling(5, min_periods=1).mean() per driver, carrying the last five finishes."""
+        form = np.empty(len(driver))
+        for i, (code, pos) in enumerate(zip(driver.to_numpy(), finish.to_numpy())):
+            window = self.last_five[code]
+            form[i] = sum(window) / len(window) if window else np.nan
+            window.append(pos)
+        return form
+
+
+# ---------------------------------------------------------------------------
+# Training
+# ---------------------------------------------------------------------------
+
+class _ChunkIter(xgb.DataIter):
+    """Feeds scaled spool chunks to XGBoost's external-memory DMatrix."""
+
+    def __init__(self, chunks, cache_prefix: str):
+        self._chunks = chunks
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._it is None:
+            self._it = iter(self._chunks())
+        try:
+            X, y = next(self._it)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self) -> None:
+        self._it = None
+
+
+class OutOfCoreTrainer:
+    """Runs the three passes over one dataset, spooling to ``workdir``."""
+
+    def __init__(self, dataset_path: str, workdir: str, chunk_rows: int, test_size: float):
+        self.dataset = open_dataset(dataset_path)
+        self.workdir = workdir
+        self.spool_dir = os.path.join(workdir, "features")
+        self.chunk_rows = chunk_rows
+        self.test_size = test_size
+
+    # -- pass 1 ---------------------------------------------------------
+
+    def build_features(self) -> None:
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        os.makedirs(self.spool_dir)
+        features = StreamingFeatures()
+        self.n_rows = 0
+        self.max_label = 0
+        self.vocab: dict[str, set] = {col: set() for col in CATEGORICAL}
+        sums = pd.Series(0.0, index=HISTORY_COLS)
+        counts = pd.Series(0, index=HISTORY_COLS)
+        self.last_season = None
+        cube = CubeBuilder()
+
+        for part, batch in enumerate(iter_seasons(self.dataset, self.chunk_rows)):
+            cube.add(batch)
+            processed = features.transform(batch)
+            sums += processed[HISTORY_COLS].sum()
+            counts += processed[HISTORY_COLS].count()
+            for col in CATEGORICAL:
+                self.vocab[col].update(processed[col].unique())
+            self.n_rows += len(processed)
+            self.max_label = max(self.max_label, int(processed["finish_position"].max()) - 1)
+            processed.to_parquet(os.path.join(self.spool_dir, f"part-{part:05d}.parquet"), index=False)
+            self.last_season = processed[processed["year"] == processed["year"].max()]
+            logger.info("Features: seasons %s-%s (%d rows)", batch["year"].iloc[0], batch["year"].iloc[-1], len(batch))
+
+        if not self.n_rows:
+            raise ValueError("Out-of-core dataset is empty")
+        self.fill_values = (sums / counts.replace(0, np.nan)).fillna(0.0).to_dict()
+        self.stats_cube = cube.build()
+        self.encoders = {col: LabelEncoder().fit(sorted(values)) for col, values in self.vocab.items()}
+        self.n_train = int(self.n_rows * (1 - self.test_size))
+        print(f"[OK] Streamed features for {self.n_rows} rows ({len(os.listdir(self.spool_dir))} chunks)")
+
+    # -- shared chunk reader ----------------------------------------------
+
+    def _prepared(self, frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.fillna(self.fill_values)
+        for col, encoded in CATEGORICAL.items():
+            frame[encoded] = pd.Categorical(frame[col], categories=self.encoders[col].classes_).codes
+        return frame
+
+    def chunks(self, start: int = 0, stop: int | None = None):
+        """Prepared spool rows [start, stop) in chunks of at most chunk_rows."""
+        stop = self.n_rows if stop is None else stop
+        offset = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            reader = pq.ParquetFile(os.path.join(self.spool_dir, name))
+            for batch in reader.iter_batches(batch_size=self.chunk_rows):
+                lo, hi = offset, offset + batch.num_rows
+                offset = hi
+                if hi <= start or lo >= stop:
+                    continue
+                frame = batch.slice(max(start - lo, 0), min(stop, hi) - max(start, lo)).to_pandas()
+                yield self._prepared(frame)
+
+    def _xy(self, start: int, stop: int | None):
+        for frame in self.chunks(start, stop):
+            X = np.ascontiguousarray(self.scaler.transform(frame[FEATURE_COLS].astype(settings.FEATURE_DTYPE)))
+            yield X, (frame["finish_position"].to_numpy() - 1)
+
+    # -- pass 2 ---------------------------------------------------------
+
+    def fit_scaler_and_lookups(self) -> dict:
+        self.scaler = StandardScaler()
+        driver_stats = []
+        driver_track = []
+        team_track = []
+        feature_sums = pd.Series(0.0, index=FEATURE_COLS)
+        offset = 0
+        for frame in self.chunks():
+            train_rows = max(0, min(len(frame), self.n_train - offset))
+            if train_rows:
+                self.scaler.partial_fit(frame[FEATURE_COLS].iloc[:train_rows])
+            offset += len(frame)
+            feature_sums += frame[FEATURE_COLS].sum()
+            stat_cols = ["recent_form", "driver_win_rate", "dnf_rate", "quali_strength"]
+            driver_stats.append(frame.groupby("driver")[stat_cols].agg(["sum", "count"]))
+            driver_track.append(frame.groupby(["driver", "track"])["driver_track_avg"].agg(["sum", "count"]))
+            team_track.append(frame.groupby(["team", "track"])["team_track_avg"].agg(["sum", "count"]))
+            # Collapse the partial aggregates as we go so they stay O(groups)
+            driver_stats = [pd.concat(driver_stats).groupby(level=0).sum()]
+            driver_track = [pd.concat(driver_track).groupby(level=[0, 1]).sum()]
+            team_track = [pd.concat(team_track).groupby(level=[0, 1]).sum()]
+
+        exclude_from_scaling(self.scaler, [col.endswith("_encoded") for col in FEATURE_COLS])
+
+        stats = driver_stats[0]
+        means = pd.DataFrame({
+            col: stats[(col, "sum")] / stats[(col, "count")] for col in ["recent_form", "driver_win_rate", "dnf_rate", "quali_strength"]
+        })
+        dt, tt = driver_track[0], team_track[0]
+        print(f"[OK] Scaler fitted incrementally on {self.n_train} training rows")
+        return {
+            "driver_stats": means.to_dict("index"),
+            "track_driver_avgs": (dt["sum"] / dt["count"]).to_dict(),
+            "track_team_avgs": (tt["sum"] / tt["count"]).to_dict(),
+            "global_means": (feature_sums / self.n_rows).to_dict(),
+            "drivers": sorted(self.vocab["driver"]),
+            "tracks": sorted(self.vocab["track"]),
+            "teams": sorted(self.vocab["team"]),
+        }
+
+    # -- pass 3 ---------------------------------------------------------
+
+    def train(self) -> F1PredictionModel:
+        template = make_xgboost()
+        params = {
+            **{k: v for k, v in template.get_xgb_params().items() if v is not None},
+            "objective": "multi:softprob",
+            "num_class": self.max_label + 1,
+            "tree_method": "hist",
+            "max_bin": settings.OUT_OF_CORE_MAX_BIN,
+        }
+        it = _ChunkIter(lambda: self._xy(0, self.n_train), os.path.join(self.workdir, "xgb-cache"))
+        dmatrix_cls = getattr(xgb, "ExtMemQuantileDMatrix", None)
+        dtrain = dmatrix_cls(it, max_bin=settings.OUT_OF_CORE_MAX_BIN) if dmatrix_cls else xgb.DMatrix(it)
+        t0 = time.perf_counter()
+        booster = xgb.train(params, dtrain, num_boost_round=template.n_estimators)
+        logger.info("XGBoost trained out of core in %.1fs", time.perf_counter() - t0)
+
+        # Wrap the booster in the sklearn estimator the inference path expects
+        model_path = os.path.join(self.workdir, "xgb.json")
+        booster.save_model(model_path)
+        clf = xgb.XGBClassifier()
+        clf.load_model(model_path)
+
+        correct = total = 0
+        for X, y in self._xy(self.n_train, None):
+            correct += int((clf.predict(X) == y).sum())
+            total += len(y)
+        accuracy = correct / total if total else float("nan")
+
+        model = F1PredictionModel(None, None)
+        model.scaler = self.scaler
+        model.models = {"XGBoost": clf}
+        model.results = {"XGBoost": accuracy}
+        model.best_model_name = "XGBoost"
+        model.best_model = clf
+        print(f"[OK] XGBoost Accuracy: {accuracy:.4f} ({total} held-out rows)")
+        return model
+
+    def feature_engineer(self) -> F1FeatureEngineer:
+        """Encoders plus the latest season's rows (what the live lineup reads)."""
+        fe = F1FeatureEngineer(self._prepared(self.last_season))
+        for col, attr in (("driver", "le_driver"), ("team", "le_team"), ("track", "le_track"), ("weather", "le_weather")):
+            setattr(fe, attr, self.encoders[col])
+        return fe
+
+
+_OOC_SETTINGS: list[str] = ["TEST_SIZE", "RANDOM_STATE", "OUT_OF_CORE_MAX_BIN", "FEATURE_DTYPE"]
+
+
+def train_out_of_core(force_retrain: bool = False) -> dict:
+    """Out-of-core counterpart of run_training_pipeline over OUT_OF_CORE_DIR."""
+    registry = get_registry()
+    path = settings.OUT_OF_CORE_DIR
+    key = digest(
+        "out_of_core", dataset_signature(path),
+        code_version(StreamingFeatures, OutOfCoreTrainer, make_xgboost, stats_cube_module, serving_module),
+        {k: getattr(settings, k) for k in _OOC_SETTINGS},
+    )
+    if not force_retrain:
+        cached = load_cached_pipeline()
+        hit = cached is not None and (registry.is_pinned() or cached.get("stage_key") == key)
+        record_cache("pipeline_artifact", hit)
+        if hit:
+            return cached
+
+    t0 = time.perf_counter()
+    logger.info("Out-of-core training over %s", path)
+    spool_root = settings.OUT_OF_CORE_SPOOL_DIR or None
+    if spool_root:
+        os.makedirs(spool_root, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="f1-ooc-", dir=spool_root) as workdir:
+        trainer = OutOfCoreTrainer(path, workdir, settings.OUT_OF_CORE_CHUNK_ROWS, settings.TEST_SIZE)
+        with memory_stage("features"):
+            trainer.build_features()
+        with memory_stage("lookups"):
+            lookups = trainer.fit_scaler_and_lookups()
+        with memory_stage("train"):
+            model = trainer.train()
+        fe = trainer.feature_engineer()
+
+    booster = model.best_model.get_booster()
+    scores = booster.get_score(importance_type="gain")
+    total = sum(scores.values()) or 1.0
+    importances = sorted(
+        [{"feature": col, "importance": round(scores.get(f"f{i}", 0.0) / total, 4)} for i, col in enumerate(FEATURE_COLS)],
+        key=lambda x: x["importance"], reverse=True,
+    )
+    state = {
+        "model": model,
+        "feature_importances": importances,
+        "distillation": None,
+        **lookups,
+        "feature_engineer": fe,
+        "stats_cube": trainer.stats_cube,
+        "is_trained": True,
+        "training_rows": trainer.n_rows,
+        "feature_dtype": settings.FEATURE_DTYPE,
+        "data_source": "out-of-core",
+        "stage_key": key,
+        "stage_keys": {"out_of_core": key},
+    }
+    with memory_stage("export"):
+        served = save_pipeline(state)
+    TRAINING_SECONDS.observe(time.perf_counter() - t0)
+    return served
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    part = sub.add_parser("partition", help="Split a history Parquet file into year= partitions")
+    part.add_argument("source")
+    part.add_argument("dest")
+    train = sub.add_parser("train", help="Train from OUT_OF_CORE_DIR (or --data) and publish to the registry")
+    train.add_argument("--data", help="Partitioned dataset directory (overrides OUT_OF_CORE_DIR)")
+    train.add_argument("--force-retrain", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "partition":
+        partition_history(args.source, args.dest)
+        return 0
+    if args.data:
+        settings.OUT_OF_CORE_DIR = args.data
+    if not settings.OUT_OF_CORE_DIR:
+        parser.error("set OUT_OF_CORE_DIR or pass --data")
+    state = run_training_pipeline(force_retrain=args.force_retrain)
+    print(f"[OK] Serving version {state['version']} ({state['training_rows']} rows)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
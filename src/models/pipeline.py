@@ -4,20 +4,43 @@ ML pipeline: training orchestration, persistence, and inference helpers.
 
 import os
 import sys
+import time
 
 import joblib
+import numpy as np
 import pandas as pd
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 from src.config import settings
 from src.data.data_loader import F1DataLoader
+from src.data import parallel_features
 from src.data.feature_engineer import F1FeatureEngineer
+from src.models import distill as distill_module
+from src.models import serving as serving_module
+from src.models import stats_cube as stats_cube_module
+from src.models import train_models as train_models_module
+from src.models.distill import distill_student
+from src.models.registry import get_registry
+from src.models.stats_cube import build_cube
+from src.models.stages import code_version, digest, frame_fingerprint, get_stage_cache
 from src.models.train_models import F1PredictionModel
 from src.utils.helpers import get_logger, timed
+from src.utils.memory import memory_stage, profile_from_settings
+from src.utils.metrics import (
+    INFERENCE_BATCH_SIZE,
+    INFERENCE_STAGE_SECONDS,
+    TRAINING_SECONDS,
+    record_cache,
+)
 
 logger = get_logger(__name__, settings.LOG_LEVEL)
 
+# Pre-bound histogram children keep the per-request recording cost minimal
+_FEATURE_BUILD_SECONDS = INFERENCE_STAGE_SECONDS.labels("feature_build")
+_SCALE_SECONDS = INFERENCE_STAGE_SECONDS.labels("scale")
+_MODEL_SECONDS = INFERENCE_STAGE_SECONDS.labels("model")
+
 FEATURE_COLS: list[str] = [
     "grid_position",
     "temperature",
@@ -34,20 +57,37 @@ FEATURE_COLS: list[str] = [
     "weather_encoded",
 ]
 
+# Raw request columns accepted by the vectorized helpers (PredictRequest fields)
+REQUEST_COLS: list[str] = ["driver", "team", "track", "grid_position", "weather", "temperature"]
+
 
 # ---------------------------------------------------------------------------
 # Persistence
 # ---------------------------------------------------------------------------
 
-def save_pipeline(state: dict) -> None:
-    """Persist the trained pipeline dict to disk."""
-    os.makedirs(settings.ARTIFACTS_DIR, exist_ok=True)
-    joblib.dump(state, settings.PIPELINE_ARTIFACT_PATH)
-    logger.info("Pipeline saved → %s", settings.PIPELINE_ARTIFACT_PATH)
+def save_pipeline(state: dict) -> dict:
+    """Publish the trained pipeline as a new registry version; returns its inference-only state."""
+    registry = get_registry()
+    return registry.load(registry.publish(state, activate=True))
 
 
 def load_cached_pipeline() -> dict | None:
-    """Load a previously saved pipeline from disk. Returns None if not found or stale."""
+    """
+    Load the registry's current pipeline. Returns None if not found or stale.
+
+    A pre-registry PIPELINE_ARTIFACT_PATH is imported as the first version so
+    every worker converges on the same snapshot.
+    """
+    registry = get_registry()
+    try:
+        state = registry.load()
+        if state is not None and state.get("is_trained"):
+            logger.info("Loaded pipeline version %s from %s", state["version"], registry.root)
+            return state
+    except Exception as exc:
+        logger.warning("Could not load registry version (%s) — will retrain", exc)
+        return None
+
     path = settings.PIPELINE_ARTIFACT_PATH
     if not os.path.exists(path):
         return None
@@ -55,8 +95,8 @@ def load_cached_pipeline() -> dict | None:
         state = joblib.load(path)
         if not isinstance(state, dict) or not state.get("is_trained"):
             return None
-        logger.info("Loaded cached pipeline from %s", path)
-        return state
+        logger.info("Importing legacy pipeline %s into the registry", path)
+        return save_pipeline(state)
     except Exception as exc:
         logger.warning("Could not load cached pipeline (%s) — will retrain", exc)
         return None
@@ -66,57 +106,39 @@ def load_cached_pipeline() -> dict | None:
 # Training
 # ---------------------------------------------------------------------------
 
-@timed(logger)
-def run_training_pipeline(
-    force_retrain: bool = False,
-    force_data_refresh: bool = False,
-) -> dict:
-    """
-    Build or restore the full prediction pipeline.
-
-    - If a saved pipeline exists and force_retrain is False, loads it from disk.
-    - Otherwise loads data (from parquet cache or FastF1), engineers features,
-      trains all models, selects the best, saves the pipeline, and returns it.
-    """
-    if not force_retrain:
-        cached = load_cached_pipeline()
-        if cached is not None:
-            return cached
-
-    logger.info(
-        "Training pipeline (force_retrain=%s, force_data_refresh=%s)",
-        force_retrain,
-        force_data_refresh,
-    )
+def _engineer_features(df: pd.DataFrame) -> tuple[F1FeatureEngineer, pd.DataFrame]:
+    fe = F1FeatureEngineer(df, n_jobs=settings.FEATURE_WORKERS, parallel_min_rows=settings.FEATURE_PARALLEL_MIN_ROWS)
+    processed = fe.get_processed_data()
+    # One dtype for every model input, so no later stage has to upcast
+    processed[FEATURE_COLS] = processed[FEATURE_COLS].astype(settings.FEATURE_DTYPE)
+    return fe, processed
 
-    loader = F1DataLoader(
-        cache_dir=settings.FASTF1_CACHE_DIR,
-        data_path=settings.HISTORICAL_DATA_PATH,
-    )
-    df = loader.load_historical_data(
-        years=settings.DATA_YEARS,
-        force_refresh=force_data_refresh,
-    )
 
-    fe = F1FeatureEngineer(df)
-    processed = fe.get_processed_data()
+def _build_lookups(processed: pd.DataFrame) -> dict:
+    """Lookup tables used at inference time to fill per-driver / per-track stats."""
+    return {
+        "driver_stats": (
+            processed.groupby("driver")[
+                ["recent_form", "driver_win_rate", "dnf_rate", "quali_strength"]
+            ]
+            .mean()
+            .to_dict("index")
+        ),
+        "track_driver_avgs": (
+            processed.groupby(["driver", "track"])["driver_track_avg"].mean().to_dict()
+        ),
+        "track_team_avgs": (
+            processed.groupby(["team", "track"])["team_track_avg"].mean().to_dict()
+        ),
+        "global_means": processed[FEATURE_COLS].mean().to_dict(),
+        "drivers": sorted(processed["driver"].unique().tolist()),
+        "tracks": sorted(processed["track"].unique().tolist()),
+        "teams": sorted(processed["team"].unique().tolist()),
+    }
 
-    # Lookup tables used at inference time to fill per-driver / per-track stats
-    driver_stats = (
-        processed.groupby("driver")[
-            ["recent_form", "driver_win_rate", "dnf_rate", "quali_strength"]
-        ]
-        .mean()
-        .to_dict("index")
-    )
-    track_driver_avgs = (
-        processed.groupby(["driver", "track"])["driver_track_avg"].mean().to_dict()
-    )
-    track_team_avgs = (
-        processed.groupby(["team", "track"])["team_track_avg"].mean().to_dict()
-    )
-    global_means = processed[FEATURE_COLS].mean().to_dict()
 
+def _train_models(processed: pd.DataFrame) -> dict:
+    """Fit every model (plus the optional distilled student) on the processed data."""
     # Sort chronologically so the train/test split respects time order
     processed = processed.sort_values("race_id").reset_index(drop=True)
 
@@ -146,30 +168,148 @@ def run_training_pipeline(
         {k: round(v, 4) for k, v in model.results.items()},
     )
 
-    state = {
+    # Optional: swap a distilled student in for the (teacher) best model
+    distillation = None
+    if settings.DISTILL_ENABLED:
+        with memory_stage("distill"):
+            distillation = distill_student(model)
+    return {
         "model": model,
-        "feature_engineer": fe,
-        "driver_stats": driver_stats,
-        "track_driver_avgs": track_driver_avgs,
-        "track_team_avgs": track_team_avgs,
-        "global_means": global_means,
-        "drivers": sorted(processed["driver"].unique().tolist()),
-        "tracks": sorted(processed["track"].unique().tolist()),
-        "teams": sorted(processed["team"].unique().tolist()),
         "feature_importances": feature_importances,
+        "distillation": distillation,
+    }
+
+
+# Settings read by the train stage (model fits + distillation)
+_TRAIN_SETTINGS: list[str] = [
+    "TRAIN_MODELS", "RF_N_ESTIMATORS", "XGB_N_ESTIMATORS", "GB_N_ESTIMATORS", "TEST_SIZE", "RANDOM_STATE",
+    "DISTILL_ENABLED", "DISTILL_SERVE", "DISTILL_MAX_ACCURACY_LOSS", "DISTILL_MIN_PROB", "DISTILL_MAX_ROWS",
+]
+
+
+def _stage_keys(data_key: str) -> dict[str, str]:
+    """Content-address every stage from the data, the code and the settings it uses."""
+    features = digest(
+        "features", data_key, code_version(F1FeatureEngineer, parallel_features, _engineer_features), settings.FEATURE_DTYPE
+    )
+    lookups = digest("lookups", features, code_version(_build_lookups), FEATURE_COLS)
+    train = digest(
+        "train", features, FEATURE_COLS,
+        code_version(train_models_module, distill_module, _train_models),
+        {k: getattr(settings, k) for k in _TRAIN_SETTINGS},
+    )
+    cube = digest("cube", data_key, code_version(stats_cube_module))
+    export = digest("export", lookups, train, cube, code_version(serving_module))
+    return {
+        "load": data_key, "features": features, "lookups": lookups, "train": train, "cube": cube, "export": export,
+    }
+
+
+@timed(logger)
+def run_training_pipeline(
+    force_retrain: bool = False,
+    force_data_refresh: bool = False,
+) -> dict:
+    """
+    Build or restore the full prediction pipeline.
+
+    Runs load → features → lookups → train → cube → export, each stage keyed
+    by a content hash of its inputs, code and settings (see src/models/stages.py):
+
+    - If the registry's current version was built from the same keys, or was
+      pinned by an explicit activate / rollback, it is returned as is.
+    - Otherwise only the stages whose key changed are recomputed, and the
+      assembled pipeline is published as a new registry version.
+    - force_retrain recomputes every stage.
+
+    With MEMORY_PROFILE on, every stage's RSS / tracemalloc peaks are
+    recorded and checked against the MEMORY_* budgets (src/utils/memory.py).
+
+    With OUT_OF_CORE_DIR set, training streams the partitioned dataset
+    instead (src/models/out_of_core.py).
+    """
+    if settings.OUT_OF_CORE_DIR:
+        from src.models.out_of_core import train_out_of_core  # imports this module
+        with profile_from_settings():
+            return train_out_of_core(force_retrain=force_retrain)
+
+    registry = get_registry()
+    if not force_retrain and not force_data_refresh:
+        # Nothing to validate against (no local data) or an operator pin
+        if registry.is_pinned() or not os.path.exists(settings.HISTORICAL_DATA_PATH):
+            cached = load_cached_pipeline()
+            if cached is not None:
+                record_cache("pipeline_artifact", True)
+                return cached
+
+    t0 = time.perf_counter()
+
+    logger.info(
+        "Training pipeline (force_retrain=%s, force_data_refresh=%s)",
+        force_retrain,
+        force_data_refresh,
+    )
+    with profile_from_settings():
+        return _run_stages(force_retrain, force_data_refresh, t0)
+
+
+def _run_stages(force_retrain: bool, force_data_refresh: bool, t0: float) -> dict:
+    with memory_stage("load"):
+        loader = F1DataLoader(
+            cache_dir=settings.FASTF1_CACHE_DIR,
+            data_path=settings.HISTORICAL_DATA_PATH,
+        )
+        df = loader.load_historical_data(
+            years=settings.DATA_YEARS,
+            force_refresh=force_data_refresh,
+        )
+        keys = _stage_keys(frame_fingerprint(df))
+
+    if not force_retrain:
+        cached = load_cached_pipeline()
+        hit = cached is not None and cached.get("stage_key") == keys["export"]
+        record_cache("pipeline_artifact", hit)
+        if hit:
+            return cached
+
+    stages = get_stage_cache()
+    with memory_stage("features"):
+        fe, processed = stages.run("features", keys["features"], lambda: _engineer_features(df), force=force_retrain)
+    with memory_stage("lookups"):
+        lookups = stages.run("lookups", keys["lookups"], lambda: _build_lookups(processed), force=force_retrain)
+    with memory_stage("train"):
+        trained = stages.run("train", keys["train"], lambda: _train_models(processed), force=force_retrain)
+    with memory_stage("cube"):
+        cube = stages.run("cube", keys["cube"], lambda: build_cube(df), force=force_retrain)
+
+    state = {
+        **trained,
+        **lookups,
+        "feature_engineer": fe,
+        "stats_cube": cube,
         "is_trained": True,
         "training_rows": len(processed),
+        "feature_dtype": str(processed[FEATURE_COLS].to_numpy().dtype),
         "data_source": "FastF1" if os.path.exists(settings.HISTORICAL_DATA_PATH) else "synthetic",
+        "stage_key": keys["export"],
+        "stage_keys": keys,
     }
 
-    save_pipeline(state)
-    return state
+    with memory_stage("export"):
+        served = save_pipeline(state)
+    TRAINING_SECONDS.observe(time.perf_counter() - t0)
+    return served
 
 
 # ---------------------------------------------------------------------------
 # Inference helpers
 # ---------------------------------------------------------------------------
 
+def feature_dtype(pipeline: dict) -> np.dtype:
+    """dtype the pipeline was trained on (pipelines from before FEATURE_DTYPE are float64)."""
+    return np.dtype(pipeline.get("feature_dtype", "float64"))
+
+
 def _safe_encode(label_encoder, value: str, fallback: int = 0) -> int:
     try:
         return int(label_encoder.transform([value])[0])
@@ -212,7 +352,10 @@ def build_feature_vector(
         "weather_encoded": _safe_encode(fe.le_weather, weather),
     }
 
-    return pd.DataFrame([row], columns=FEATURE_COLS)
+    return pd.DataFrame(
+        np.array([[row[col] for col in FEATURE_COLS]], dtype=feature_dtype(pipeline)),
+        columns=FEATURE_COLS,
+    )
 
 
 def run_inference(
@@ -226,8 +369,11 @@ def run_inference(
 ) -> dict:
     """Run a single prediction. Returns position + probabilities."""
     model: F1PredictionModel = pipeline["model"]
+    t0 = time.perf_counter()
     X = build_feature_vector(driver, team, track, grid_position, weather, temperature, pipeline)
+    t1 = time.perf_counter()
     X_scaled = model.scaler.transform(X)
+    t2 = time.perf_counter()
     best = model.best_model
 
     predicted_position = int(best.predict(X_scaled)[0]) + 1  # shift back from 0-index
@@ -242,9 +388,158 @@ def run_inference(
             float(proba[classes.index(p)]) for p in [0, 1, 2] if p in classes
         )
 
+    _FEATURE_BUILD_SECONDS.observe(t1 - t0)
+    _SCALE_SECONDS.observe(t2 - t1)
+    _MODEL_SECONDS.observe(time.perf_counter() - t2)
+    INFERENCE_BATCH_SIZE.observe(1)
+
     return {
         "predicted_position": predicted_position,
         "win_probability": round(win_prob, 4),
         "podium_probability": round(podium_prob, 4),
         "model_used": model.best_model_name,
     }
+
+
+# ---------------------------------------------------------------------------
+# Vectorized inference
+# ---------------------------------------------------------------------------
+
+_DRIVER_STAT_COLS: list[str] = ["recent_form", "driver_win_rate", "dnf_rate", "quali_strength"]
+
+
+def _lookup_tables(pipeline: dict) -> dict:
+    """
+    Dense, code-indexed copies of the lookup dicts, built once per pipeline.
+
+    Rows / columns follow the label encoders' code order, plus one trailing
+    slot holding the global-mean fallback, so an unseen label (code -1) lands
+    on the fallback with plain NumPy indexing.
+    """
+    tables = pipeline.get("_lookup_tables")
+    if tables is None:
+        fe: F1FeatureEngineer = pipeline["feature_engineer"]
+        means = pipeline["global_means"]
+        dtype = feature_dtype(pipeline)
+        labels = {
+            "driver": pd.Index(fe.le_driver.classes_),
+            "team": pd.Index(fe.le_team.classes_),
+            "track": pd.Index(fe.le_track.classes_),
+            "weather": pd.Index(fe.le_weather.classes_),
+        }
+        code = {col: {label: i for i, label in enumerate(idx)} for col, idx in labels.items()}
+
+        driver_stats = np.tile(
+            np.array([means[c] for c in _DRIVER_STAT_COLS], dtype=dtype),
+            (len(labels["driver"]) + 1, 1),
+        )
+        for driver, stats in pipeline["driver_stats"].items():
+            if driver in code["driver"]:
+                driver_stats[code["driver"][driver]] = [stats[c] for c in _DRIVER_STAT_COLS]
+
+        def pair_table(pairs: dict, left: str, fallback: float) -> np.ndarray:
+            table = np.full((len(labels[left]) + 1, len(labels["track"]) + 1), fallback, dtype=dtype)
+            for (a, track), value in pairs.items():
+                if a in code[left] and track in code["track"]:
+                    table[code[left][a], code["track"][track]] = value
+            return table
+
+        tables = {
+            "labels": labels,
+            "driver_stats": driver_stats,
+            "driver_track": pair_table(pipeline["track_driver_avgs"], "driver", means["driver_track_avg"]),
+            "team_track": pair_table(pipeline["track_team_avgs"], "team", means["team_track_avg"]),
+        }
+        pipeline["_lookup_tables"] = tables
+    return tables
+
+
+def _label_codes(values: pd.Series, labels: pd.Index) -> np.ndarray:
+    """LabelEncoder codes for a column; unseen labels get -1 (logged once per call)."""
+    codes = pd.Categorical(values, categories=labels).codes.astype(np.int64)
+    unseen = codes < 0
+    if unseen.any():
+        logger.warning(
+            "Unseen labels %s — using fallback encoding 0",
+            sorted(pd.unique(np.asarray(values)[unseen]).tolist()),
+        )
+    return codes
+
+
+def build_feature_matrix(frame: pd.DataFrame, pipeline: dict) -> pd.DataFrame:
+    """
+    Vectorized build_feature_vector: one feature row per row of ``frame``.
+
+    ``frame`` needs the REQUEST_COLS columns. Labels are converted to codes
+    once and every lookup is an array index, so cost grows with rows, not
+    Python calls. Columns are written into one C-contiguous array of the
+    pipeline's feature dtype, which the scaler and model consume without a
+    conversion copy.
+    """
+    t0 = time.perf_counter()
+    tables = _lookup_tables(pipeline)
+    labels = tables["labels"]
+
+    driver = _label_codes(frame["driver"], labels["driver"])
+    team = _label_codes(frame["team"], labels["team"])
+    track = _label_codes(frame["track"], labels["track"])
+    weather = _label_codes(frame["weather"], labels["weather"])
+    stats = tables["driver_stats"][driver]
+
+    columns = {
+        "grid_position": frame["grid_position"].to_numpy(),
+        "temperature": frame["temperature"].to_numpy(),
+        "fastest_lap": 0,
+        "recent_form": stats[:, 0],
+        "driver_win_rate": stats[:, 1],
+        "dnf_rate": stats[:, 2],
+        "driver_track_avg": tables["driver_track"][driver, track],
+        "team_track_avg": tables["team_track"][team, track],
+        "quali_strength": stats[:, 3],
+        "driver_encoded": np.maximum(driver, 0),
+        "team_encoded": np.maximum(team, 0),
+        "track_encoded": np.maximum(track, 0),
+        "weather_encoded": np.maximum(weather, 0),
+    }
+    values = np.empty((len(frame), len(FEATURE_COLS)), dtype=feature_dtype(pipeline))
+    for i, col in enumerate(FEATURE_COLS):
+        values[:, i] = columns[col]
+    X = pd.DataFrame(values, columns=FEATURE_COLS, copy=False)
+    _FEATURE_BUILD_SECONDS.observe(time.perf_counter() - t0)
+    return X
+
+
+def predict_position_proba(X: pd.DataFrame, pipeline: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scale a feature matrix and score it with one model call.
+
+    Returns ``(proba, classes)``: an (n_rows, n_classes) probability matrix and
+    the 0-indexed finishing positions its columns correspond to.
+    """
+    model: F1PredictionModel = pipeline["model"]
+    best = model.best_model
+    t0 = time.perf_counter()
+    X_scaled = model.scaler.transform(X)
+    t1 = time.perf_counter()
+    proba = best.predict_proba(X_scaled)
+    _SCALE_SECONDS.observe(t1 - t0)
+    _MODEL_SECONDS.observe(time.perf_counter() - t1)
+    INFERENCE_BATCH_SIZE.observe(len(X))
+    return proba, np.asarray(best.classes_)
+
+
+def run_batch_inference(frame: pd.DataFrame, pipeline: dict) -> dict:
+    """
+    Vectorized run_inference over every row of ``frame`` (REQUEST_COLS).
+
+    Returns numpy arrays ``predicted_position`` (1-indexed argmax — what
+    ``predict`` returns), ``win_probability`` and ``podium_probability``.
+    """
+    X = build_feature_matrix(frame, pipeline)
+    proba, classes = predict_position_proba(X, pipeline)
+    return {
+        "predicted_position": classes[proba.argmax(axis=1)].astype(int) + 1,
+        "win_probability": np.round(proba[:, classes == 0].sum(axis=1), 4),
+        "podium_probability": np.round(proba[:, classes <= 2].sum(axis=1), 4),
+        "model_used": pipeline["model"].best_model_name,
+    }
@@ -0,0 +1,302 @@
+"""
+File-based model registry: immutable versioned pipeline snapshots.
+
+Layout under MODEL_REGISTRY_DIR (default ``<ARTIFACTS_DIR>/registry``):
+
+    versions/<version>/pipeline.pkl   joblib-dumped inference-only pipeline dict (never rewritten)
+    versions/<version>/training.pkl   full model + feature engineer, for diagnostics
+    versions/<version>/meta.json      summary (best model, accuracies, rows, source, sizes)
+    versions/<version>/cube.parquet   the /stats aggregate cube (zstd Parquet)
+    manifest.json                     every published version + activation history
+    CURRENT                           id of the version being served
+
+Every write lands in a temporary file or directory first and is moved into
+place with ``os.rename`` / ``os.replace``, so readers in other processes only
+ever see a complete snapshot and a complete pointer. Activating or rolling
+back a version rewrites ``CURRENT`` and nothing else; each API worker polls
+the pointer and swaps the referenced snapshot in on its own.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import joblib
+import pandas as pd
+
+from src.config import settings
+from src.models.serving import check_schema, size_report, split_pipeline
+from src.utils.helpers import get_logger
+
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:  # Windows: single-process dev use only
+    _HAS_FCNTL = False
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+ARTIFACT_NAME = "pipeline.pkl"
+TRAINING_NAME = "training.pkl"
+META_NAME = "meta.json"
+# Tabular pipeline entries kept as columnar files beside the pickle
+SIDECAR_TABLES: dict[str, str] = {"stats_cube": "cube.parquet"}
+_VERSION_RE = re.compile(r"^\d{8}T\d{6}Z-[0-9a-f]{6}$")
+
+
+class ModelRegistry:
+    """Publishes, lists, activates and loads versioned pipeline snapshots."""
+
+    def __init__(self, root: str, keep_loaded: int = 2):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.current_path = os.path.join(root, "CURRENT")
+        self._lock_path = os.path.join(root, ".lock")
+        # Recently loaded snapshots, so switching back to one is a pointer flip
+        self._loaded: OrderedDict[str, dict] = OrderedDict()
+        self._keep_loaded = max(1, keep_loaded)
+        self._mutex = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    # -- low-level helpers -------------------------------------------------
+
+    def _ensure_dirs(self) -> None:
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Serialize manifest / pointer writers across threads and processes."""
+        self._ensure_dirs()
+        with self._mutex, open(self._lock_path, "a") as fh:
+            if _HAS_FCNTL:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if _HAS_FCNTL:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _atomic_write(path: str, text: str) -> None:
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp, "w") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"versions": [], "history": []}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self._atomic_write(self.manifest_path, json.dumps(manifest, indent=2))
+
+    def _set_current(self, manifest: dict, version: str, record: bool = True, pinned: bool = False) -> None:
+        if record:
+            manifest["history"].append(version)
+        # A pin marks an operator's choice (activate / rollback) that startup
+        # revalidation must not replace with a freshly built version
+        manifest["pinned"] = pinned
+        self._write_manifest(manifest)
+        self._atomic_write(self.current_path, version + "\n")
+        logger.info("Registry: serving version %s", version)
+
+    # -- queries -----------------------------------------------------------
+
+    def current_version(self) -> str | None:
+        """Version id in the CURRENT pointer, or None for an empty registry."""
+        try:
+            with open(self.current_path) as fh:
+                return fh.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self) -> list[dict]:
+        """Manifest entries, newest first, flagged with ``current``."""
+        current = self.current_version()
+        entries = [dict(v, current=v["version"] == current) for v in self._read_manifest()["versions"]]
+        return sorted(entries, key=lambda v: v["created_at"], reverse=True)
+
+    def is_pinned(self) -> bool:
+        """True when CURRENT was set by activate() / rollback() rather than training."""
+        return bool(self._read_manifest().get("pinned")) and self.current_version() is not None
+
+    def has_version(self, version: str) -> bool:
+        if not _VERSION_RE.match(version):
+            return False
+        return os.path.exists(os.path.join(self.versions_dir, version, ARTIFACT_NAME))
+
+    # -- writes ------------------------------------------------------------
+
+    def publish(self, state: dict, activate: bool = True) -> str:
+        """
+        Write ``state`` as a new immutable version; optionally serve it.
+
+        Only the inference state goes into ``pipeline.pkl``; the full model and
+        feature engineer go to ``training.pkl`` (see src/models/serving.py).
+        """
+        self._ensure_dirs()
+        created = datetime.now(timezone.utc)
+        version = f"{created:%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:6]}"
+        serving, training = split_pipeline(state)
+        serving["version"] = version
+        model = serving["model"]
+        meta = {
+            "version": version,
+            "created_at": created.isoformat(),
+            "best_model": model.best_model_name,
+            "results": {k: round(float(v), 4) for k, v in model.results.items()},
+            "training_rows": state.get("training_rows", 0),
+            "data_source": state.get("data_source", "unknown"),
+            "schema_version": serving["schema_version"],
+        }
+
+        # Build the snapshot off to the side, then rename it into place whole
+        staging = os.path.join(self.versions_dir, f".staging-{version}")
+        os.makedirs(staging)
+        try:
+            tables = {key: serving[key] for key in SIDECAR_TABLES if serving.get(key) is not None}
+            artifact = {k: v for k, v in serving.items() if k not in tables}
+            joblib.dump(artifact, os.path.join(staging, ARTIFACT_NAME))
+            for key, table in tables.items():
+                table.to_parquet(os.path.join(staging, SIDECAR_TABLES[key]), compression="zstd", index=False)
+            if training is not None and settings.MODEL_REGISTRY_TRAINING_ARTIFACT:
+                joblib.dump(training, os.path.join(staging, TRAINING_NAME))
+            meta["artifact_bytes"] = {
+                name: os.path.getsize(os.path.join(staging, name))
+                for name in sorted(os.listdir(staging)) if name != META_NAME
+            }
+            meta["serving_bytes"] = size_report(artifact)
+            with open(os.path.join(staging, META_NAME), "w") as fh:
+                json.dump(meta, fh, indent=2)
+            os.rename(staging, os.path.join(self.versions_dir, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        with self._locked():
+            manifest = self._read_manifest()
+            manifest["versions"].append(meta)
+            if activate:
+                self._set_current(manifest, version)
+            else:
+                self._write_manifest(manifest)
+            self._prune(manifest)
+        state["version"] = version
+        self._remember(version, serving)
+        logger.info(
+            "Registry: published version %s (%s, serving artifact %.1f KB)",
+            version, meta["best_model"], meta["artifact_bytes"][ARTIFACT_NAME] / 1024,
+        )
+        return version
+
+    def activate(self, version: str) -> None:
+        """Point CURRENT at an existing version."""
+        if not self.has_version(version):
+            raise KeyError(version)
+        with self._locked():
+            manifest = self._read_manifest()
+            if self.current_version() != version:
+                self._set_current(manifest, version, pinned=True)
+            else:
+                manifest["pinned"] = True
+                self._write_manifest(manifest)
+
+    def rollback(self) -> str:
+        """Re-activate the version served before the current one."""
+        with self._locked():
+            manifest = self._read_manifest()
+            history = manifest["history"]
+            current = self.current_version()
+            # Unwind the activation stack past the current version and any
+            # versions that have since been pruned
+            while history and history[-1] == current:
+                history.pop()
+            while history and not self.has_version(history[-1]):
+                history.pop()
+            if not history:
+                raise LookupError("No earlier version to roll back to")
+            target = history[-1]
+            self._set_current(manifest, target, record=False, pinned=True)
+        return target
+
+    def _prune(self, manifest: dict) -> None:
+        """Drop the oldest versions beyond MODEL_REGISTRY_KEEP (never CURRENT)."""
+        keep = settings.MODEL_REGISTRY_KEEP
+        if keep <= 0 or len(manifest["versions"]) <= keep:
+            return
+        current = self.current_version()
+        ordered = sorted(manifest["versions"], key=lambda v: v["created_at"])
+        removable = [v for v in ordered if v["version"] != current][: len(ordered) - keep]
+        if not removable:
+            return
+        dropped = {v["version"] for v in removable}
+        manifest["versions"] = [v for v in manifest["versions"] if v["version"] not in dropped]
+        manifest["history"] = [h for h in manifest["history"] if h not in dropped]
+        self._write_manifest(manifest)
+        for version in dropped:
+            shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+            with self._cache_lock:
+                self._loaded.pop(version, None)
+        logger.info("Registry: pruned %d old version(s)", len(dropped))
+
+    # -- loading -----------------------------------------------------------
+
+    def load(self, version: str | None = None) -> dict | None:
+        """Load a snapshot (default: CURRENT). Returns None if there is none."""
+        version = version or self.current_version()
+        if version is None or not self.has_version(version):
+            return None
+        with self._cache_lock:
+            cached = self._loaded.get(version)
+            if cached is not None:
+                self._loaded.move_to_end(version)
+                return cached
+        state = joblib.load(os.path.join(self.versions_dir, version, ARTIFACT_NAME))
+        check_schema(state)
+        if state.get("schema_version") is None:
+            # Written before the serving / training split: keep only what serving reads
+            state, _ = split_pipeline(state)
+        for key, name in SIDECAR_TABLES.items():
+            path = os.path.join(self.versions_dir, version, name)
+            if os.path.exists(path):
+                state[key] = pd.read_parquet(path)
+        state["version"] = version
+        self._remember(version, state)
+        return state
+
+    def load_training(self, version: str) -> dict | None:
+        """The training half of a version (full model + feature engineer), if it was kept."""
+        path = os.path.join(self.versions_dir, version, TRAINING_NAME)
+        if not self.has_version(version) or not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+    def _remember(self, version: str, state: dict) -> None:
+        with self._cache_lock:
+            self._loaded[version] = state
+            self._loaded.move_to_end(version)
+            while len(self._loaded) > self._keep_loaded:
+                self._loaded.popitem(last=False)
+
+
+_registries: dict[str, ModelRegistry] = {}
+
+
+def get_registry() -> ModelRegistry:
+    """Registry for the configured directory (one instance per path)."""
+    root = settings.MODEL_REGISTRY_DIR or os.path.join(settings.ARTIFACTS_DIR, "registry")
+    if root not in _registries:
+        _registries[root] = ModelRegistry(root, keep_loaded=settings.MODEL_REGISTRY_KEEP_LOADED)
+    return _registries[root]
@@ -0,0 +1,100 @@
+"""
+Inference-only pipeline state.
+
+The dict that training assembles holds the whole F1FeatureEngineer, with
+its processed history, and the whole F1PredictionModel, with the feature
+matrix, the train / test splits, both scaled copies and every fitted
+candidate. Serving reads only the best model, the scaler, the label
+encoders, the lookup tables and the latest race's lineup, so the registry
+stores the two apart (``split_pipeline``):
+
+  - ``pipeline.pkl`` — the serving state. The model and feature engineer are
+    replaced by ``ServingModel`` / ``ServingFeatures``, which carry just the
+    attributes inference reads from them, and ``schema_version`` records the
+    layout (SERVING_SCHEMA_VERSION). Its size follows the model, not the
+    history.
+  - ``training.pkl`` — the full model and feature engineer, kept for
+    diagnostics (``ModelRegistry.load_training``); serving never opens it.
+
+``size_report`` gives the pickled size of every serving entry; it is stored
+in the version's meta.json next to the file sizes.
+"""
+
+import pickle
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pandas as pd
+
+# Bump when the serving dict's layout changes; newer artifacts are refused
+SERVING_SCHEMA_VERSION = 1
+
+# Entries replaced by their serving counterparts and moved to training.pkl
+TRAINING_ONLY: list[str] = ["model", "feature_engineer"]
+# Latest-race columns read by latest_lineup and the live replays
+_LATEST_RACE_COLS: list[str] = ["race_id", "year", "track", "driver", "team", "grid_position"]
+
+
+@dataclass
+class ServingModel:
+    """The inference half of an F1PredictionModel."""
+
+    best_model_name: str
+    best_model: Any
+    scaler: Any
+    results: dict[str, float]
+
+    @classmethod
+    def from_model(cls, model) -> "ServingModel":
+        return cls(model.best_model_name, model.best_model, model.scaler, dict(model.results))
+
+
+@dataclass
+class ServingFeatures:
+    """The label encoders of an F1FeatureEngineer plus its latest race (``df``)."""
+
+    le_driver: Any
+    le_team: Any
+    le_track: Any
+    le_weather: Any
+    df: pd.DataFrame
+
+    @classmethod
+    def from_engineer(cls, fe) -> "ServingFeatures":
+        df = fe.df
+        latest = df.loc[df["race_id"] == df["race_id"].max(), [c for c in _LATEST_RACE_COLS if c in df.columns]]
+        return cls(fe.le_driver, fe.le_team, fe.le_track, fe.le_weather, latest.reset_index(drop=True))
+
+
+def split_pipeline(state: dict) -> tuple[dict, Optional[dict]]:
+    """
+    ``(serving, training)`` halves of a trained pipeline.
+
+    ``training`` is None when ``state`` already is a serving state. Entries
+    starting with an underscore are per-process caches and are dropped.
+    """
+    if state.get("schema_version") is not None:
+        return {k: v for k, v in state.items() if not k.startswith("_")}, None
+    serving = {k: v for k, v in state.items() if k not in TRAINING_ONLY and not k.startswith("_")}
+    serving["model"] = ServingModel.from_model(state["model"])
+    serving["feature_engineer"] = ServingFeatures.from_engineer(state["feature_engineer"])
+    serving["schema_version"] = SERVING_SCHEMA_VERSION
+    return serving, {k: state[k] for k in TRAINING_ONLY}
+
+
+def check_schema(state: dict) -> None:
+    """Refuse serving artifacts written by a newer schema than this code reads."""
+    schema = state.get("schema_version")
+    if schema is not None and schema > SERVING_SCHEMA_VERSION:
+        raise ValueError(
+            f"Serving artifact schema v{schema} is newer than supported (v{SERVING_SCHEMA_VERSION})"
+        )
+
+
+def size_report(serving: dict, skip: tuple = ()) -> dict[str, int]:
+    """Pickled bytes of every serving entry (except ``skip``), largest first."""
+    sizes = {
+        key: len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        for key, value in serving.items() if key not in skip
+    }
+    return dict(sorted(sizes.items(), key=lambda kv: kv[1], reverse=True))
@@ -0,0 +1,123 @@
+"""
+Monte Carlo race simulation.
+
+The classifier scores every driver independently, so its per-driver outputs
+are not a consistent race result: two drivers can share a predicted position
+and win probabilities do not sum to 1 across the grid. This module turns the
+per-driver finishing-position distributions into complete finishing orders:
+
+  1. each simulated race draws a latent position for every driver from that
+     driver's own distribution (inverse-CDF sampling),
+  2. drivers are ordered by latent position, ties broken uniformly at random,
+  3. the resulting permutations are aggregated into win / podium / points and
+     expected-position estimates that are consistent across the whole grid.
+
+All draws for all races happen in one vectorized NumPy pass.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.models.pipeline import build_feature_matrix, predict_position_proba
+
+# Standard F1 points for positions 1-10 (no fastest-lap bonus)
+POINTS_BY_POSITION = np.array([25, 18, 15, 12, 10, 8, 6, 4, 2, 1], dtype=float)
+
+
+def position_distribution(proba: np.ndarray, classes: np.ndarray, n_positions: int) -> np.ndarray:
+    """
+    Spread model probabilities over ``n_positions`` finishing slots.
+
+    ``classes`` are 0-indexed positions (model labels). Classes beyond the last
+    slot are folded into it, and rows with no mass fall back to uniform.
+    """
+    dist = np.zeros((proba.shape[0], n_positions), dtype=float)
+    slots = np.minimum(np.asarray(classes, dtype=int), n_positions - 1)
+    np.add.at(dist.T, slots, proba.T)
+    totals = dist.sum(axis=1, keepdims=True)
+    empty = totals[:, 0] <= 0
+    dist[empty] = 1.0
+    totals[empty] = n_positions
+    return dist / totals
+
+
+def sample_finishing_orders(dist: np.ndarray, n_sims: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw ``n_sims`` full finishing orders.
+
+    Returns an (n_sims, n_drivers) int array of 0-indexed finishing positions;
+    every row is a permutation of ``range(n_drivers)``.
+    """
+    n_drivers, n_slots = dist.shape
+    cdf = np.cumsum(dist, axis=1)
+    cdf[:, -1] = 1.0  # guard against rounding leaving the last bin short
+
+    # Offsetting driver d's CDF by d makes all rows one sorted array, so a single
+    # searchsorted does the inverse-CDF lookup for every (race, driver) pair.
+    offsets = np.arange(n_drivers)
+    flat_cdf = (cdf + offsets[:, None]).ravel()
+    u = rng.random((n_sims, n_drivers)) + offsets[None, :]
+    latent = np.searchsorted(flat_cdf, u, side="left") - offsets[None, :] * n_slots
+    # Uniform jitter in [0, 1) only ever reorders drivers sharing a latent slot
+    order = np.argsort(latent + rng.random((n_sims, n_drivers)), axis=1)
+
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_drivers)[None, :], axis=1)
+    return positions
+
+
+def summarize_orders(positions: np.ndarray) -> dict:
+    """Aggregate sampled finishing orders into per-driver grid-consistent estimates."""
+    n_sims, n_drivers = positions.shape
+    # counts[d, p] = number of sims in which driver d finished in position p
+    flat = (np.arange(n_drivers)[None, :] * n_drivers + positions).ravel()
+    counts = np.bincount(flat, minlength=n_drivers * n_drivers).reshape(n_drivers, n_drivers)
+    position_probs = counts / n_sims
+
+    points = np.zeros(n_drivers, dtype=float)
+    k = min(n_drivers, len(POINTS_BY_POSITION))
+    points[:k] = POINTS_BY_POSITION[:k]
+
+    expected_position = position_probs @ np.arange(1, n_drivers + 1)
+    win = position_probs[:, 0]
+    podium = position_probs[:, :3].sum(axis=1)
+
+    # Final order: expected position, then win probability as tie-breaker
+    ranking = np.lexsort((-win, expected_position))
+    predicted = np.empty(n_drivers, dtype=int)
+    predicted[ranking] = np.arange(1, n_drivers + 1)
+
+    return {
+        "predicted_position": predicted,
+        "expected_position": expected_position,
+        "win_probability": win,
+        "podium_probability": podium,
+        "points_probability": position_probs[:, :k].sum(axis=1),
+        "expected_points": position_probs @ points,
+        "position_probabilities": position_probs,
+    }
+
+
+def simulate_race(
+    frame: pd.DataFrame,
+    pipeline: dict,
+    n_sims: int = 10_000,
+    seed: int | None = None,
+) -> dict:
+    """
+    Simulate one race for the grid in ``frame`` (one row per driver, REQUEST_COLS).
+
+    The whole grid is scored with a single model call, then ``n_sims`` races are
+    sampled. Returns the summarize_orders() arrays plus ``model_used``.
+    """
+    X = build_feature_matrix(frame, pipeline)
+    proba, classes = predict_position_proba(X, pipeline)
+    # Sample over the model's full label range; only relative order matters,
+    # so a short grid still ranks a likely-P15 driver behind a likely-P3 one.
+    n_slots = max(len(frame), int(classes.max()) + 1)
+    dist = position_distribution(proba, classes, n_slots)
+    positions = sample_finishing_orders(dist, n_sims, np.random.default_rng(seed))
+    summary = summarize_orders(positions)
+    summary["model_used"] = pipeline["model"].best_model_name
+    summary["simulations"] = n_sims
+    return summary
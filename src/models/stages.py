@@ -0,0 +1,103 @@
+"""
+Content-addressed cache for the training pipeline stages.
+
+run_training_pipeline is a chain of stages (load → features → lookups →
+train → cube → export). Each stage's key is a hash of its upstream keys, the source
+code it runs and the settings it reads, so a stage's output can be reused
+exactly when none of those changed:
+
+  - new or edited data changes the load key and invalidates everything,
+  - editing F1FeatureEngineer redoes features onwards,
+  - changing model code or a training setting redoes train and export only.
+
+Outputs are joblib files at ``<STAGE_CACHE_DIR>/<stage>/<key>.pkl``, written
+to a temporary name and renamed into place.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import time
+import uuid
+from typing import Callable
+
+import joblib
+import pandas as pd
+
+from src.config import settings
+from src.utils.helpers import get_logger
+from src.utils.metrics import record_cache
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+
+def digest(*parts) -> str:
+    """Stable short hash of JSON-serialisable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def code_version(*objs) -> str:
+    """Hash of the source code of functions, classes or modules."""
+    return digest(*(inspect.getsource(obj) for obj in objs))
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame (values, column names and dtypes)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([[c, str(t)] for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class StageCache:
+    """Stores one output per (stage, key); keeps the newest few per stage."""
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.pkl")
+
+    def run(self, stage: str, key: str, fn: Callable[[], object], force: bool = False):
+        """Return the cached output for ``key`` or compute, store and return it."""
+        path = self._path(stage, key)
+        if not force and os.path.exists(path):
+            try:
+                value = joblib.load(path)
+                record_cache(f"stage_{stage}", True)
+                logger.info("Stage %-8s cached  (%s)", stage, key)
+                return value
+            except Exception as exc:
+                logger.warning("Stage %s cache entry unreadable (%s) — recomputing", stage, exc)
+
+        record_cache(f"stage_{stage}", False)
+        t0 = time.perf_counter()
+        value = fn()
+        logger.info("Stage %-8s computed (%s) in %.2fs", stage, key, time.perf_counter() - t0)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        joblib.dump(value, tmp)
+        os.replace(tmp, path)
+        self._evict(stage)
+        return value
+
+    def _evict(self, stage: str) -> None:
+        if self.keep <= 0:
+            return
+        folder = os.path.join(self.root, stage)
+        entries = sorted(
+            (os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".pkl")),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for stale in entries[self.keep:]:
+            os.remove(stale)
+
+
+def get_stage_cache() -> StageCache:
+    root = settings.STAGE_CACHE_DIR or os.path.join(settings.ARTIFACTS_DIR, "stages")
+    return StageCache(root, keep=settings.STAGE_CACHE_KEEP)
@@ -0,0 +1,241 @@
+"""
+Precomputed aggregate cube behind the /stats endpoints.
+
+Training aggregates the raw race history once per grain — driver, driver ×
+season, driver × track, driver × track × season, team, team × season, team ×
+track, track, season — into one long table: the grain's dimension columns
+(the others null) and its measures (races, average / best finish, wins and
+win rate, podiums, DNFs and DNF rate, points, average grid and grid-to-finish
+gain). Measures are derived from additive partial sums, so the out-of-core
+trainer feeds the builder one chunk of seasons at a time. The registry stores
+the table next to the pipeline as zstd-compressed Parquet (``cube.parquet``).
+
+Serving never touches the historical data: ``stats_cube(pipeline)`` turns the
+table into ready-to-encode records per grain, with a position index per
+dimension value and a precomputed order per measure, once per pipeline. A
+query is then a few dict lookups, an index intersection and a slice.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Grain -> dimensions; "season" is the history's ``year``
+GRAINS: dict[str, list[str]] = {
+    "driver": ["driver"],
+    "driver_season": ["driver", "season"],
+    "driver_track": ["driver", "track"],
+    "driver_track_season": ["driver", "track", "season"],
+    "team": ["team"],
+    "team_season": ["team", "season"],
+    "team_track": ["team", "track"],
+    "track": ["track"],
+    "season": ["season"],
+}
+DIMENSIONS: list[str] = ["driver", "team", "track", "season"]
+COUNT_MEASURES: list[str] = ["races", "wins", "podiums", "dnfs", "best_finish"]
+RATE_MEASURES: list[str] = [
+    "avg_finish", "win_rate", "podium_rate", "dnf_rate", "points", "avg_points", "avg_grid", "avg_gain",
+]
+MEASURES: list[str] = COUNT_MEASURES + RATE_MEASURES
+
+# Partial sums per group; "min" for best_finish, "sum" for everything else
+_PARTIALS: dict[str, str] = {
+    "races": "sum", "finish_sum": "sum", "best_finish": "min", "wins": "sum", "podiums": "sum",
+    "dnfs": "sum", "points": "sum", "grid_sum": "sum",
+}
+_DECIMALS = 4
+
+
+class CubeBuilder:
+    """Accumulates per-grain partial sums over history chunks; ``build`` finalises the table."""
+
+    def __init__(self):
+        self._sums: dict[str, Optional[pd.DataFrame]] = {grain: None for grain in GRAINS}
+
+    def add(self, df: pd.DataFrame) -> "CubeBuilder":
+        finish = df["finish_position"]
+        frame = pd.DataFrame({
+            "driver": df["driver"],
+            "team": df["team"],
+            "track": df["track"],
+            "season": df["year"],
+            "races": 1,
+            "finish_sum": finish,
+            "best_finish": finish,
+            "wins": (finish == 1).astype(np.int64),
+            "podiums": (finish <= 3).astype(np.int64),
+            "dnfs": df["dnf"].astype(np.int64),
+            "points": df["points"].astype(np.float64),
+            "grid_sum": df["grid_position"],
+        })
+        for grain, dims in GRAINS.items():
+            part = frame.groupby(dims, sort=False)[list(_PARTIALS)].agg(_PARTIALS)
+            previous = self._sums[grain]
+            if previous is not None:
+                part = pd.concat([previous, part]).groupby(level=dims, sort=False).agg(_PARTIALS)
+            self._sums[grain] = part
+        return self
+
+    def build(self) -> pd.DataFrame:
+        tables = []
+        for grain, dims in GRAINS.items():
+            sums = self._sums[grain]
+            if sums is None:
+                continue
+            sums = sums.sort_index()
+            races = sums["races"]
+            table = pd.DataFrame({
+                "races": races,
+                "wins": sums["wins"],
+                "podiums": sums["podiums"],
+                "dnfs": sums["dnfs"],
+                "best_finish": sums["best_finish"],
+                "avg_finish": sums["finish_sum"] / races,
+                "win_rate": sums["wins"] / races,
+                "podium_rate": sums["podiums"] / races,
+                "dnf_rate": sums["dnfs"] / races,
+                "points": sums["points"],
+                "avg_points": sums["points"] / races,
+                "avg_grid": sums["grid_sum"] / races,
+                "avg_gain": (sums["grid_sum"] - sums["finish_sum"]) / races,
+            }).reset_index()
+            table.insert(0, "grain", grain)
+            tables.append(table)
+        if not tables:
+            raise ValueError("Stats cube has no rows")
+
+        cube = pd.concat(tables, ignore_index=True)
+        for dim in ("driver", "team", "track"):
+            cube[dim] = cube[dim].astype("string")
+        cube["season"] = cube["season"].astype("Int16")
+        cube[COUNT_MEASURES] = cube[COUNT_MEASURES].astype(np.int32)
+        cube[RATE_MEASURES] = cube[RATE_MEASURES].astype(np.float32)
+        return cube[["grain", *DIMENSIONS, *MEASURES]]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """The aggregate cube of an in-memory history."""
+    return CubeBuilder().add(df).build()
+
+
+# ---------------------------------------------------------------------------
+# Serving index
+# ---------------------------------------------------------------------------
+
+class _GrainIndex:
+    """Records of one grain plus the indexes a query needs."""
+
+    def __init__(self, dims: list[str], table: pd.DataFrame):
+        self.dims = dims
+        columns = {dim: table[dim].tolist() for dim in dims}
+        if "season" in columns:
+            columns["season"] = [int(v) for v in columns["season"]]
+        for col in COUNT_MEASURES:
+            columns[col] = table[col].astype(int).tolist()
+        for col in RATE_MEASURES:
+            # float32 storage; round so the float64 JSON encoding stays short
+            columns[col] = table[col].astype(np.float64).round(_DECIMALS).tolist()
+        names = [*dims, *MEASURES]
+        self.records: list[dict] = [dict(zip(names, values)) for values in zip(*(columns[n] for n in names))]
+        self.by_key: dict[tuple, int] = {tuple(r[d] for d in dims): i for i, r in enumerate(self.records)}
+        self.positions: dict[str, dict] = {}
+        for dim in dims:
+            groups: dict = {}
+            for i, value in enumerate(columns[dim]):
+                groups.setdefault(value, []).append(i)
+            self.positions[dim] = {value: np.array(pos, dtype=np.int64) for value, pos in groups.items()}
+        # Order and rank per (measure, descending); ties keep the natural (dimension) order
+        self.order: dict[tuple[str, bool], np.ndarray] = {}
+        self.rank: dict[tuple[str, bool], np.ndarray] = {}
+        for col in MEASURES:
+            values = np.asarray(columns[col])
+            for descending, keys in ((False, values), (True, -values)):
+                order = np.argsort(keys, kind="stable")
+                rank = np.empty_like(order)
+                rank[order] = np.arange(len(order))
+                self.order[col, descending], self.rank[col, descending] = order, rank
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def query(self, filters: dict, sort: Optional[str], descending: bool, limit: int, offset: int) -> tuple[int, list[dict]]:
+        """``(matches, records)`` for equality ``filters`` on this grain's dimensions."""
+        if filters and len(filters) == len(self.dims):
+            i = self.by_key.get(tuple(filters[d] for d in self.dims))
+            hits = [] if i is None else [self.records[i]]
+            return len(hits), hits[offset: offset + limit]
+
+        if filters:
+            pos = None
+            for dim, value in filters.items():
+                match = self.positions[dim].get(value)
+                if match is None:
+                    return 0, []
+                pos = match if pos is None else np.intersect1d(pos, match, assume_unique=True)
+            if sort is not None:
+                pos = pos[np.argsort(self.rank[sort, descending][pos])]
+        elif sort is not None:
+            pos = self.order[sort, descending]
+        else:
+            return len(self.records), self.records[offset: offset + limit]
+        return len(pos), [self.records[i] for i in pos[offset: offset + limit].tolist()]
+
+
+class StatsCube:
+    """Query interface over a cube table (see ``stats_cube``)."""
+
+    def __init__(self, table: pd.DataFrame):
+        self.rows = len(table)
+        self.grains: dict[str, _GrainIndex] = {}
+        for grain, part in table.groupby("grain", sort=False):
+            self.grains[grain] = _GrainIndex(GRAINS[grain], part)
+
+    def info(self) -> dict:
+        return {
+            "rows": self.rows,
+            "grains": {grain: {"dimensions": index.dims, "rows": len(index)} for grain, index in self.grains.items()},
+            "measures": MEASURES,
+        }
+
+    def query(
+        self,
+        grain: str,
+        filters: Optional[dict] = None,
+        sort: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple[int, list[dict]]:
+        """
+        Records of ``grain`` matching ``filters`` ({dimension: value}).
+
+        ``sort`` is a measure, ``-measure`` for descending; without it records
+        come in dimension order. Raises KeyError for an unknown grain and
+        ValueError for a filter or sort the grain does not have.
+        """
+        index = self.grains[grain]
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        invalid = sorted(set(filters) - set(index.dims))
+        if invalid:
+            raise ValueError(f"Grain '{grain}' cannot be filtered by {', '.join(invalid)} "
+                             f"(dimensions: {', '.join(index.dims)})")
+        descending = False
+        if sort is not None:
+            descending = sort.startswith("-")
+            sort = sort.lstrip("-")
+            if sort not in MEASURES:
+                raise ValueError(f"Unknown sort measure '{sort}' (measures: {', '.join(MEASURES)})")
+        return index.query(filters, sort, descending, limit, offset)
+
+
+def stats_cube(pipeline: dict) -> Optional[StatsCube]:
+    """The pipeline's query index, built once per pipeline; None if it has no cube."""
+    cube = pipeline.get("_stats_cube")
+    if cube is None:
+        table = pipeline.get("stats_cube")
+        if table is None:
+            return None
+        cube = StatsCube(table)
+        pipeline["_stats_cube"] = cube
+    return cube
@@ -7,11 +7,108 @@ import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import xgboost as xgb
 import joblib
 
+from src.config import settings
+from src.utils.memory import memory_stage
+
+
+# ---------------------------------------------------------------------------
+# Model factories (shared by F1PredictionModel and the walk-forward backtest)
+# ---------------------------------------------------------------------------
+# Every factory takes (n_jobs, categorical_features) for a uniform signature;
+# categorical_features is a boolean column mask only the hist engine uses.
+
+def make_random_forest(n_jobs=-1, categorical_features=None):
+    return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+
+
+def make_xgboost(n_jobs=-1, categorical_features=None):
+    return xgb.XGBClassifier(
+        n_estimators=200,
+        learning_rate=0.05,
+        max_depth=3,
+        min_child_weight=5,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        reg_alpha=0.5,
+        reg_lambda=2.0,
+        random_state=42,
+        n_jobs=n_jobs,
+    )
+
+
+def make_gradient_boosting(n_jobs=-1, categorical_features=None):
+    # Single-threaded by design; n_jobs kept for a uniform factory signature
+    return GradientBoostingClassifier(
+        n_estimators=200,
+        learning_rate=0.05,
+        max_depth=3,
+        min_samples_leaf=10,
+        subsample=0.8,
+        random_state=42,
+    )
+
+
+def make_hist_gradient_boosting(n_jobs=-1, categorical_features=None):
+    # Binned features and OpenMP threads (n_jobs unused); the encoded columns
+    # are split on as categories rather than as ordered codes
+    return HistGradientBoostingClassifier(
+        max_iter=200,
+        learning_rate=0.05,
+        max_depth=3,
+        min_samples_leaf=10,
+        l2_regularization=1.0,
+        categorical_features=categorical_features,
+        early_stopping=False,
+        random_state=42,
+    )
+
+
+MODEL_FACTORIES = {
+    'Random Forest': make_random_forest,
+    'XGBoost': make_xgboost,
+    'Gradient Boosting': make_gradient_boosting,
+    'Hist Gradient Boosting': make_hist_gradient_boosting,
+}
+
+# HistGradientBoosting bins each categorical into at most 255 categories
+_MAX_CATEGORIES = 255
+
+
+def categorical_mask(columns, X) -> np.ndarray:
+    """Label-encoded (``*_encoded``) columns with few enough codes to treat as categories."""
+    X = np.asarray(X)
+    return np.array([
+        str(col).endswith('_encoded') and int(X[:, i].max(initial=0)) < _MAX_CATEGORIES
+        for i, col in enumerate(columns)
+    ])
+
+
+def exclude_from_scaling(scaler, mask):
+    """Make a fitted StandardScaler pass the masked columns through unchanged."""
+    mask = np.asarray(mask, dtype=bool)
+    scaler.mean_[mask] = 0.0
+    scaler.var_[mask] = 1.0
+    scaler.scale_[mask] = 1.0
+    return scaler
+
+
+def fit_scaler(X, columns):
+    """
+    StandardScaler over the numeric features only.
+
+    Label-encoded columns keep their integer codes: every model here is
+    tree-based, so scaling them changes nothing but makes them unusable as
+    categories for the hist engine.
+    """
+    encoded = [str(col).endswith('_encoded') for col in columns]
+    return exclude_from_scaling(StandardScaler().fit(X), encoded)
+
+
 class F1PredictionModel:
     """Multi-model ensemble for F1 race predictions"""
     
@@ -30,16 +127,17 @@ class F1PredictionModel:
         self.y_train = self.y.iloc[:split_idx]
         self.y_test  = self.y.iloc[split_idx:]
 
-        self.scaler = StandardScaler()
-        self.X_train_scaled = self.scaler.fit_transform(self.X_train)
-        self.X_test_scaled  = self.scaler.transform(self.X_test)
+        # The scaler keeps float32 input in float32; C order is what the models read
+        self.scaler = fit_scaler(self.X_train, self.X.columns)
+        self.X_train_scaled = np.ascontiguousarray(self.scaler.transform(self.X_train))
+        self.X_test_scaled  = np.ascontiguousarray(self.scaler.transform(self.X_test))
 
         print(f"[OK] Train set: {len(self.X_train)}, Test set: {len(self.X_test)}")
         
     def train_random_forest(self):
         """Train Random Forest classifier"""
         print("\nTraining Random Forest...")
-        rf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+        rf = make_random_forest()
         rf.fit(self.X_train_scaled, self.y_train)
         
         y_pred = rf.predict(self.X_test_scaled)
@@ -54,18 +152,7 @@ class F1PredictionModel:
     def train_xgboost(self):
         """Train XGBoost classifier"""
         print("\nTraining XGBoost...")
-        xgb_model = xgb.XGBClassifier(
-            n_estimators=200,
-            learning_rate=0.05,
-            max_depth=3,
-            min_child_weight=5,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            reg_alpha=0.5,
-            reg_lambda=2.0,
-            random_state=42,
-            n_jobs=-1,
-        )
+        xgb_model = make_xgboost()
         xgb_model.fit(self.X_train_scaled, self.y_train)
         
         y_pred = xgb_model.predict(self.X_test_scaled)
@@ -80,14 +167,7 @@ class F1PredictionModel:
     def train_gradient_boosting(self):
         """Train Gradient Boosting classifier"""
         print("\nTraining Gradient Boosting...")
-        gb = GradientBoostingClassifier(
-            n_estimators=200,
-            learning_rate=0.05,
-            max_depth=3,
-            min_samples_leaf=10,
-            subsample=0.8,
-            random_state=42,
-        )
+        gb = make_gradient_boosting()
         gb.fit(self.X_train_scaled, self.y_train)
         
         y_pred = gb.predict(self.X_test_scaled)
@@ -98,17 +178,41 @@ class F1PredictionModel:
         
         print(f"[OK] Gradient Boosting Accuracy: {accuracy:.4f}")
         return gb
+
+    def train_hist_gradient_boosting(self):
+        """Train histogram-based Gradient Boosting with categorical splits"""
+        print("\nTraining Hist Gradient Boosting...")
+        hgb = make_hist_gradient_boosting(
+            categorical_features=categorical_mask(self.X.columns, self.X_train_scaled)
+        )
+        hgb.fit(self.X_train_scaled, self.y_train)
+
+        y_pred = hgb.predict(self.X_test_scaled)
+        accuracy = accuracy_score(self.y_test, y_pred)
+
+        self.models['Hist Gradient Boosting'] = hgb
+        self.results['Hist Gradient Boosting'] = accuracy
+
+        print(f"[OK] Hist Gradient Boosting Accuracy: {accuracy:.4f}")
+        return hgb
     
-    def train_all_models(self):
-        """Train all models and compare"""
+    def train_all_models(self, families=None):
+        """Train the selected model families (settings.TRAIN_MODELS) and compare"""
+        families = families or settings.TRAIN_MODELS
+        unknown = [name for name in families if name not in MODEL_FACTORIES]
+        if unknown:
+            raise ValueError(f"Unknown model family {unknown} (choose from {', '.join(MODEL_FACTORIES)})")
+
         print("\n" + "="*80)
         print("TRAINING MULTIPLE MODELS")
         print("="*80)
         
-        self.prepare_data()
-        self.train_random_forest()
-        self.train_xgboost()
-        self.train_gradient_boosting()
+        with memory_stage("prepare"):
+            self.prepare_data()
+        for name in families:
+            stage = name.lower().replace(' ', '_')
+            with memory_stage(stage):
+                getattr(self, f"train_{stage}")()
         
         # Select best model
         self.best_model_name = max(self.results, key=self.results.get)
@@ -0,0 +1,366 @@
+"""
+Memory profiling and peak-memory budgets for ingestion and training.
+
+Code marks its phases with ``memory_stage(name)``; outside a profiling run
+that is a no-op. Inside ``profile_memory(...)`` every stage records:
+
+  - RSS before / after and the stage's peak RSS (Linux: the kernel's
+    high-water mark, reset at each stage boundary through
+    /proc/self/clear_refs; elsewhere the process-lifetime peak),
+  - the peak of Python / NumPy allocations traced by tracemalloc,
+  - the source lines that allocated the most memory still alive at the end
+    of the stage.
+
+Stages nest ("load/read_parquet"); a parent's peaks include its children.
+When a stage's peak RSS exceeds its budget, or the run's exceeds the
+overall budget, the stage raises MemoryBudgetExceeded carrying the full
+report so far.
+
+    python -m src.utils.memory --budget-mb 1500 --stage-budget train=1200 --output memory.json
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from src.config import settings
+from src.utils.helpers import get_logger
+
+logger = get_logger(__name__, settings.LOG_LEVEL)
+
+_MB = 1024 * 1024
+_STATUS = "/proc/self/status"
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """A stage (or the whole run) went over its peak-RSS budget."""
+
+    def __init__(self, message: str, report: dict):
+        super().__init__(message)
+        self.report = report
+
+
+# ---------------------------------------------------------------------------
+# Process memory readings
+# ---------------------------------------------------------------------------
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        with open(_STATUS) as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb() -> float:
+    kb = _status_kb("VmRSS")
+    if kb is not None:
+        return kb / 1024
+    if resource is not None:  # no /proc: best available figure is the peak
+        return _lifetime_peak_mb()
+    return 0.0
+
+
+def _lifetime_peak_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / _MB if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (VmHWM); False where unsupported."""
+    try:
+        with open(_CLEAR_REFS, "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    kb = _status_kb("VmHWM")
+    return kb / 1024 if kb is not None else _lifetime_peak_mb()
+
+
+def parse_stage_budgets(raw: str) -> dict[str, float]:
+    """``"features=800,train=1500"`` → ``{"features": 800.0, "train": 1500.0}``."""
+    budgets = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        name, _, value = part.partition("=")
+        budgets[name.strip()] = float(value)
+    return budgets
+
+
+# ---------------------------------------------------------------------------
+# Profiler
+# ---------------------------------------------------------------------------
+
+class _Frame:
+    """Bookkeeping for one open stage."""
+
+    def __init__(self, name: str, snapshot):
+        self.name = name
+        self.snapshot = snapshot
+        self.t0 = time.perf_counter()
+        self.rss_before = current_rss_mb()
+        self.child_peak_rss = 0.0
+        self.child_peak_traced = 0.0
+
+
+class MemoryProfiler:
+    """Collects per-stage memory readings and enforces budgets."""
+
+    def __init__(
+        self,
+        budget_mb: float = 0,
+        stage_budgets: Optional[dict[str, float]] = None,
+        top_n: int = 10,
+    ):
+        self.budget_mb = budget_mb
+        self.stage_budgets = stage_budgets or {}
+        self.top_n = top_n
+        self.stages: list[dict] = []
+        self.peak_rss_mb = 0.0
+        self.peak_traced_mb = 0.0
+        self._stack: list[_Frame] = []
+        self._hwm_resettable = False
+        self._started_tracing = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            self._started_tracing = True
+        self._hwm_resettable = _reset_peak_rss()
+        tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        self.peak_rss_mb = max(self.peak_rss_mb, _peak_rss_mb())
+        self.peak_traced_mb = max(self.peak_traced_mb, tracemalloc.get_traced_memory()[1] / _MB)
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def _checkpoint_parent(self) -> None:
+        """Fold the running peaks into the enclosing stage before a child resets them."""
+        if self._stack:
+            parent = self._stack[-1]
+            parent.child_peak_rss = max(parent.child_peak_rss, _peak_rss_mb())
+            parent.child_peak_traced = max(parent.child_peak_traced, tracemalloc.get_traced_memory()[1] / _MB)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._checkpoint_parent()
+        path = "/".join([f.name for f in self._stack] + [name])
+        frame = _Frame(name, tracemalloc.take_snapshot())
+        self._stack.append(frame)
+        if self._hwm_resettable:
+            _reset_peak_rss()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            rss_after = current_rss_mb()
+            peak_rss = max(_peak_rss_mb(), frame.child_peak_rss, rss_after)
+            peak_traced = max(tracemalloc.get_traced_memory()[1] / _MB, frame.child_peak_traced)
+            end = tracemalloc.take_snapshot()
+            record = {
+                "stage": path,
+                "seconds": round(time.perf_counter() - frame.t0, 3),
+                "rss_before_mb": round(frame.rss_before, 1),
+                "rss_after_mb": round(rss_after, 1),
+                "peak_rss_mb": round(peak_rss, 1),
+                "peak_traced_mb": round(peak_traced, 1),
+                "top_allocators": self._top_allocators(end, frame.snapshot),
+            }
+            self.stages.append(record)
+            self.peak_rss_mb = max(self.peak_rss_mb, peak_rss)
+            self.peak_traced_mb = max(self.peak_traced_mb, peak_traced)
+            # The enclosing stage's peak covers this one
+            if self._stack:
+                parent = self._stack[-1]
+                parent.child_peak_rss = max(parent.child_peak_rss, peak_rss)
+                parent.child_peak_traced = max(parent.child_peak_traced, peak_traced)
+            if self._hwm_resettable:
+                _reset_peak_rss()
+            tracemalloc.reset_peak()
+        self._enforce(record)
+
+    def _top_allocators(self, end, start) -> list[dict]:
+        """Source lines that allocated the most memory still held at the end of the stage."""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+        diff = end.filter_traces(filters).compare_to(start.filter_traces(filters), "lineno")
+        top = sorted((d for d in diff if d.size_diff > 0), key=lambda d: d.size_diff, reverse=True)
+        return [
+            {
+                "location": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                "size_mb": round(d.size_diff / _MB, 2),
+                "blocks": d.count_diff,
+            }
+            for d in top[: self.top_n]
+        ]
+
+    def _enforce(self, record: dict) -> None:
+        stage, peak = record["stage"], record["peak_rss_mb"]
+        limit = self.stage_budgets.get(stage) or self.stage_budgets.get(stage.rsplit("/", 1)[-1])
+        if limit and peak > limit:
+            self._fail(f"stage '{stage}' peaked at {peak:.0f} MB RSS, budget {limit:.0f} MB", record)
+        if self.budget_mb and self.peak_rss_mb > self.budget_mb:
+            self._fail(f"peak RSS {self.peak_rss_mb:.0f} MB exceeds the {self.budget_mb:.0f} MB budget "
+                       f"(during stage '{stage}')", record)
+
+    def _fail(self, reason: str, record: dict) -> None:
+        report = self.report(failed=reason)
+        lines = [f"Memory budget exceeded: {reason}", format_report(report)]
+        raise MemoryBudgetExceeded("\n".join(lines), report)
+
+    def report(self, failed: Optional[str] = None) -> dict:
+        return {
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "peak_traced_mb": round(self.peak_traced_mb, 1),
+            "budget_mb": self.budget_mb or None,
+            "stage_budgets": self.stage_budgets,
+            "rss_peak_per_stage": self._hwm_resettable,
+            "failed": failed,
+            "stages": self.stages,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+
+_active: contextvars.ContextVar[Optional[MemoryProfiler]] = contextvars.ContextVar("memory_profiler", default=None)
+
+
+def active_profiler() -> Optional[MemoryProfiler]:
+    return _active.get()
+
+
+@contextmanager
+def memory_stage(name: str) -> Iterator[None]:
+    """Profile a block as stage ``name`` when a profiling run is active; otherwise free."""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+@contextmanager
+def profile_memory(
+    budget_mb: float = 0,
+    stage_budgets: Optional[dict[str, float]] = None,
+    top_n: int = 10,
+    report_path: Optional[str] = None,
+) -> Iterator[MemoryProfiler]:
+    """
+    Profile every memory_stage() inside the block; the report is logged and,
+    with ``report_path``, written as JSON — also when a budget is exceeded.
+    """
+    profiler = MemoryProfiler(budget_mb, stage_budgets, top_n)
+    token = _active.set(profiler)
+    profiler.start()
+    failed: Optional[MemoryBudgetExceeded] = None
+    try:
+        yield profiler
+    except MemoryBudgetExceeded as exc:
+        failed = exc
+        raise
+    finally:
+        _active.reset(token)
+        profiler.stop()
+        report = failed.report if failed is not None else profiler.report()
+        if report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+            with open(report_path, "w") as fh:
+                json.dump(report, fh, indent=2)
+        if failed is None:
+            logger.info("Memory profile:\n%s", format_report(report))
+        else:
+            logger.error("%s", failed)
+
+
+def profile_from_settings():
+    """profile_memory() configured from MEMORY_* settings (a no-op context when disabled)."""
+    if not settings.MEMORY_PROFILE or active_profiler() is not None:
+        return _noop()
+    return profile_memory(
+        budget_mb=settings.MEMORY_BUDGET_MB,
+        stage_budgets=parse_stage_budgets(settings.MEMORY_STAGE_BUDGETS),
+        top_n=settings.MEMORY_TOP_ALLOCATORS,
+        report_path=settings.MEMORY_REPORT_PATH or os.path.join(settings.ARTIFACTS_DIR, "memory_report.json"),
+    )
+
+
+@contextmanager
+def _noop() -> Iterator[None]:
+    yield None
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{'stage':<28}{'seconds':>9}{'rss before':>12}{'rss after':>11}{'peak rss':>10}{'peak traced':>13}"]
+    for s in report["stages"]:
+        lines.append(
+            f"{s['stage']:<28}{s['seconds']:>9.2f}{s['rss_before_mb']:>12.1f}"
+            f"{s['rss_after_mb']:>11.1f}{s['peak_rss_mb']:>10.1f}{s['peak_traced_mb']:>13.1f}"
+        )
+    lines.append(f"peak RSS {report['peak_rss_mb']:.1f} MB · peak traced {report['peak_traced_mb']:.1f} MB")
+    # The stage that grew memory the most is the one worth looking into
+    worst = max(report["stages"], key=lambda s: s["peak_rss_mb"] - s["rss_before_mb"], default=None)
+    if worst and worst["top_allocators"]:
+        lines.append(f"top allocators in '{worst['stage']}' (retained at stage end):")
+        lines.extend(f"  {a['size_mb']:>8.2f} MB  {a['location']}" for a in worst["top_allocators"])
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-mb", type=float, default=settings.MEMORY_BUDGET_MB,
+                        help="Fail when the run's peak RSS exceeds this (0 = no budget)")
+    parser.add_argument("--stage-budget", action="append", default=[],
+                        help="Per-stage peak RSS budget, e.g. train=1500 (repeatable)")
+    parser.add_argument("--top", type=int, default=settings.MEMORY_TOP_ALLOCATORS, help="Allocators listed per stage")
+    parser.add_argument("--force-retrain", action="store_true", help="Recompute every stage instead of using caches")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    from src.models.pipeline import run_training_pipeline
+    # Under ``python -m`` this file is __main__: profile through the module the pipeline imports
+    from src.utils import memory
+
+    budgets = parse_stage_budgets(settings.MEMORY_STAGE_BUDGETS)
+    budgets.update(parse_stage_budgets(",".join(args.stage_budget)))
+    try:
+        with memory.profile_memory(args.budget_mb, budgets, args.top, args.output):
+            run_training_pipeline(force_retrain=args.force_retrain)
+    except memory.MemoryBudgetExceeded:
+        return 1
+    if args.output:
+        print(f"[OK] Memory report written -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+In-process Prometheus-style metrics.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock, so
+recording a sample costs a dict lookup plus a few arithmetic operations.
+GET /metrics renders the registry in the text exposition format (v0.0.4).
+Each uvicorn worker keeps its own registry.
+
+Histogram observations made inside ``captured()`` are collected instead of
+recorded. The readiness warm-up discards them so that synthetic calls stay
+out of the served distributions. Inference worker processes send theirs
+back (``export_samples``), and the API process records them
+(``record_samples``).
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds) — sub-millisecond resolution for inference stages
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 5000, 10000)
+TRAINING_BUCKETS: tuple[float, ...] = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+# Set by captured(): histogram observations are appended here instead of recorded
+_captured: ContextVar[list | None] = ContextVar("metrics_captured", default=None)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them in registration order."""
+
+    def __init__(self):
+        self._metrics: list["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Metric(ABC):
+    """Base of every metric type: one child per label combination."""
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: MetricsRegistry | None = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values) -> object:
+        """Return the child for one label combination (created on first use)."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding one label combination's samples."""
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+# ---------------------------------------------------------------------------
+# Counter / Gauge
+# ---------------------------------------------------------------------------
+
+class _ValueChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def render(self, name, labelnames, key) -> list[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    @property
+    def value(self) -> float:
+        return self._default().value
+
+
+# ---------------------------------------------------------------------------
+# Histogram
+# ---------------------------------------------------------------------------
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "_counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        captured = _captured.get()
+        if captured is not None:
+            captured.append((self, value))
+            return
+        idx = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        """Context manager that observes the elapsed wall time in seconds."""
+        return _Timer(self)
+
+    def render(self, name, labelnames, key) -> list[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self.sum, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self._bounds + (math.inf,), counts):
+            cumulative += n
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_child", "_t0")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._t0)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed upper-bound buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self) -> _Timer:
+        return self._default().time()
+
+
+@contextmanager
+def captured():
+    """Collect the histogram observations made in this context; yields ``[(child, value), ...]``."""
+    samples: list = []
+    token = _captured.set(samples)
+    try:
+        yield samples
+    finally:
+        _captured.reset(token)
+
+
+def export_samples(samples: list, registry: MetricsRegistry = REGISTRY) -> list[tuple[str, tuple, float]]:
+    """Captured samples as picklable ``(metric name, label values, value)`` triples."""
+    owners = {
+        id(child): (metric.name, key)
+        for metric in list(registry._metrics) for key, child in list(metric._children.items())
+    }
+    return [(*owners[id(child)], value) for child, value in samples if id(child) in owners]
+
+
+def record_samples(samples: list[tuple[str, tuple, float]], registry: MetricsRegistry = REGISTRY) -> None:
+    """Record samples exported by another process into this process's histograms."""
+    metrics = {metric.name: metric for metric in list(registry._metrics)}
+    for name, key, value in samples:
+        metric = metrics.get(name)
+        if metric is not None:
+            metric.labels(*key).observe(value)
+
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "f1_http_requests_total",
+    "HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "f1_http_request_duration_seconds",
+    "HTTP request latency by method and route template.",
+    ("method", "route"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "f1_http_requests_in_flight",
+    "HTTP requests currently being served.",
+)
+INFERENCE_STAGE_SECONDS = Histogram(
+    "f1_inference_stage_duration_seconds",
+    "Inference latency split by stage (feature_build, scale, model).",
+    ("stage",),
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "f1_inference_batch_size",
+    "Number of rows scored per inference call.",
+    buckets=SIZE_BUCKETS,
+)
+COALESCER_BATCH_SIZE = Histogram(
+    "f1_coalescer_batch_size",
+    "Single /predict requests merged into one model call by the coalescer.",
+    buckets=SIZE_BUCKETS,
+)
+COALESCER_QUEUE_SECONDS = Histogram(
+    "f1_coalescer_queue_seconds",
+    "Time a /predict request waited in the coalescer before its batch was dispatched.",
+)
+CACHE_REQUESTS = Counter(
+    "f1_cache_requests_total",
+    "Cache lookups by cache name and result (hit / miss).",
+    ("cache", "result"),
+)
+CACHE_HIT_RATIO = Gauge(
+    "f1_cache_hit_ratio",
+    "Fraction of lookups served from cache since process start.",
+    ("cache",),
+)
+MODEL_GENERATION = Gauge(
+    "f1_model_generation",
+    "Incremented every time a new pipeline is swapped into service.",
+)
+MODEL_READY = Gauge(
+    "f1_model_ready",
+    "1 once the served pipeline has passed its warm-up and latency SLO check, else 0.",
+)
+FASTF1_CACHE_BYTES = Gauge(
+    "f1_fastf1_cache_bytes",
+    "FastF1 cache size on disk by kind (sessions / http).",
+    ("kind",),
+)
+FASTF1_CACHE_EVICTIONS = Counter(
+    "f1_fastf1_cache_evictions_total",
+    "FastF1 cache sessions evicted by reason (captured / lru).",
+    ("reason",),
+)
+TRAINING_SECONDS = Histogram(
+    "f1_training_duration_seconds",
+    "Wall time of full training pipeline runs (cache hits excluded).",
+    buckets=TRAINING_BUCKETS,
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup and refresh that cache's hit ratio gauge."""
+    hits = CACHE_REQUESTS.labels(cache, "hit")
+    misses = CACHE_REQUESTS.labels(cache, "miss")
+    (hits if hit else misses).inc()
+    total = hits.value + misses.value
+    CACHE_HIT_RATIO.labels(cache).set(hits.value / total if total else 0.0)
@@ -0,0 +1,286 @@
+"""
+On-demand profiling of single API requests.
+
+A ``RequestProfile`` is activated by the API's ProfilingMiddleware for a
+request that presents PROFILING_TOKEN. It records a tree of wall / CPU times
+per section, nested across the threadpool hop (``run_in_threadpool`` carries
+the request's context along), and runs the scoring call under cProfile
+(``RequestProfile.run``). Its summary lists the functions that dominate that
+call, and the middleware adds the spans around the endpoint: body read +
+pydantic validation before it, response serialization after it. Summaries are
+written to PROFILING_DIR as ``<id>.json``.
+
+The inference code itself carries no profiling hooks. When PROFILING_TOKEN is
+set, the API wraps the phases it reports (get_next_race, build_feature_vector
+/ build_feature_matrix, label_encoding, response_encoding) with ``sectioned``
+at startup, and a profiled call scores against a pipeline whose scaler and
+model are ``SectionProxy`` objects (scale, model). Without the token none of
+this is installed and the hot path is unchanged.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import nullcontext, suppress
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+_section: contextvars.ContextVar[Optional["Section"]] = contextvars.ContextVar("profile_section", default=None)
+_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_NULL = nullcontext()
+_PROFILE_ID = re.compile(r"^[0-9a-f]{16}$")
+
+
+class Section:
+    """One node of the section tree; repeated entries accumulate."""
+
+    __slots__ = ("name", "calls", "wall", "cpu", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.start: Optional[float] = None   # first entry (perf_counter)
+        self.end: Optional[float] = None     # last exit
+        self.children: dict[str, Section] = {}
+
+    def child(self, name: str) -> "Section":
+        node = self.children.get(name)
+        if node is None:
+            node = self.children.setdefault(name, Section(name))
+        return node
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "children": [c.to_dict() for c in self.children.values()],
+        }
+
+
+class _Timed:
+    __slots__ = ("node", "token", "t0", "c0")
+
+    def __init__(self, node: Section):
+        self.node = node
+
+    def __enter__(self):
+        self.token = _section.set(self.node)
+        self.c0 = time.thread_time()
+        self.t0 = time.perf_counter()
+        if self.node.start is None:
+            self.node.start = self.t0
+
+    def __exit__(self, *exc):
+        now = time.perf_counter()
+        node = self.node
+        node.wall += now - self.t0
+        node.cpu += time.thread_time() - self.c0
+        node.calls += 1
+        node.end = now
+        _section.reset(self.token)
+        return False
+
+
+def profile_section(name: str):
+    """Time a block as section ``name`` of the active request profile (a null context outside one)."""
+    parent = _section.get()
+    if parent is None:
+        return _NULL
+    return _Timed(parent.child(name))
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _profile.get()
+
+
+def sectioned(fn: Callable, name: str) -> Callable:
+    """``fn`` timed as section ``name`` on every call (repeated calls accumulate)."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return await fn(*args, **kwargs)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return fn(*args, **kwargs)
+    return wrapper
+
+
+class SectionProxy:
+    """Proxy for ``target`` whose ``methods`` are timed as section ``name``."""
+
+    def __init__(self, target: Any, name: str, methods: tuple[str, ...]):
+        self._target = target
+        self._name = name
+        self._methods = methods
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self._target, attr)
+        if attr in self._methods:
+            return sectioned(value, self._name)
+        return value
+
+
+def _function_name(key: tuple) -> str:
+    filename, line, func = key
+    if filename == "~":
+        return func  # built-in
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{filename}:{line}({func})"
+
+
+class RequestProfile:
+    """Section tree plus cProfile statistics for one request."""
+
+    def __init__(self, label: str, top_n: int = 25):
+        self.id = uuid.uuid4().hex[:16]
+        self.label = label
+        self.top_n = top_n
+        self.root = Section("request")
+        self.started_at = datetime.now().isoformat()
+        self.response_start: Optional[float] = None
+        self.status: Optional[int] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+        self._tokens: tuple = ()
+
+    def __enter__(self) -> "RequestProfile":
+        self._tokens = (_profile.set(self), _section.set(self.root))
+        self.root.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.root.end = time.perf_counter()
+        self.root.wall = self.root.end - self.root.start
+        self.root.calls = 1
+        profile_token, section_token = self._tokens
+        _section.reset(section_token)
+        _profile.reset(profile_token)
+        return False
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call ``fn`` under cProfile (this thread only) as a section named after it."""
+        profiler = cProfile.Profile()
+        try:
+            with profile_section(getattr(fn, "__name__", "call")):
+                return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def spans(self) -> dict[str, float]:
+        """Milliseconds before the endpoint, in it and after it until the response started."""
+        handler = self.root.children.get("handler")
+        if handler is None or handler.start is None:
+            return {}
+        spans = {"validation": handler.start - self.root.start, "handler": handler.wall}
+        if self.response_start is not None and handler.end is not None:
+            spans["serialization"] = self.response_start - handler.end
+            spans["total"] = self.response_start - self.root.start
+        return {k: round(v * 1000, 3) for k, v in spans.items()}
+
+    def hotspots(self) -> list[dict]:
+        if self._stats is None:
+            return []
+        rows = sorted(self._stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)
+        return [
+            {
+                "function": _function_name(key),
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+            for key, (cc, nc, tt, ct, callers) in rows[: self.top_n]
+        ]
+
+    def summary(self) -> dict:
+        tree = self.root.to_dict()
+        tree["cpu_ms"] = None  # the request spans threads; CPU time is per section
+        spans = self.spans()
+        # Spans outside any section: ahead of the endpoint and after it returned
+        if "validation" in spans:
+            tree["children"].insert(0, {"name": "request_validation", "calls": 1, "wall_ms": spans["validation"],
+                                        "cpu_ms": None, "children": []})
+        if "serialization" in spans:
+            tree["children"].append({"name": "response_serialization", "calls": 1,
+                                     "wall_ms": spans["serialization"], "cpu_ms": None, "children": []})
+        return {
+            "id": self.id,
+            "request": self.label,
+            "started_at": self.started_at,
+            "status": self.status,
+            "total_ms": tree["wall_ms"],
+            "spans_ms": spans,
+            "tree": tree,
+            "hotspots": self.hotspots(),
+        }
+
+
+def save_profile(summary: dict, directory: str, keep: int = 100) -> str:
+    """Write ``summary`` as ``<id>.json``; only the newest ``keep`` profiles are kept."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{summary['id']}.json")
+    # Renamed into place so a concurrent listing never reads a partial file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(summary, fh, indent=2)
+    os.replace(tmp, path)
+    if keep > 0:
+        for old in _stored(directory)[:-keep]:
+            # A concurrent save may have pruned it already
+            with suppress(FileNotFoundError):
+                os.remove(old)
+    return path
+
+
+def _stored(directory: str) -> list[str]:
+    """Profile paths in ``directory``, oldest first, skipping files removed while listing."""
+    stamped = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            path = os.path.join(directory, name)
+            with suppress(FileNotFoundError):
+                stamped.append((os.path.getmtime(path), path))
+    return [path for _, path in sorted(stamped)]
+
+
+def load_profile(profile_id: str, directory: str) -> Optional[dict]:
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json")) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def list_profiles(directory: str) -> list[dict]:
+    """Stored profiles, newest first: id, request, status and total time."""
+    if not os.path.isdir(directory):
+        return []
+    listed = []
+    for path in reversed(_stored(directory)):
+        summary = load_profile(os.path.basename(path)[:-5], directory)
+        if summary is not None:
+            listed.append({k: summary.get(k) for k in ("id", "request", "started_at", "status", "total_ms")})
+    return listed